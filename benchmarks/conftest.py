@@ -0,0 +1,10 @@
+"""Puts the add-in's lib folder and the fake adsk on the path for the tests of the plain python modules."""
+
+import os
+import sys
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+ADDIN_DIR = os.path.dirname(BENCHMARK_DIR)
+
+sys.path.insert(0, os.path.join(BENCHMARK_DIR, 'fake_adsk'))
+sys.path.insert(0, os.path.join(ADDIN_DIR, 'lib'))
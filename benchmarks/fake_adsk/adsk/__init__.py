@@ -0,0 +1,13 @@
+"""Recording stand-in for the Fusion 360 API.
+
+Only what the add-in uses is modelled. Sketch points, bodies, the timeline and
+user parameters keep enough real state for the add-in code to run unchanged,
+and every API call is counted in recording.calls as "Class.method". Anything
+not modelled resolves to a Stub, which only records that it was called.
+
+Put benchmarks/fake_adsk on sys.path before importing the add-in.
+"""
+
+from . import recording
+from . import core
+from . import fusion
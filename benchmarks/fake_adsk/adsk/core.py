@@ -0,0 +1,181 @@
+import math
+
+from .recording import Base, Collection, Stub, api, record
+
+
+class LogLevels:
+    InfoLogLevel = 0
+    WarningLogLevel = 1
+    ErrorLogLevel = 2
+
+
+class LogTypes:
+    ConsoleLogType = 0
+    FileLogType = 1
+
+
+class Point3D(Base):
+    def __init__(self, x=0.0, y=0.0, z=0.0):
+        self.x = x
+        self.y = y
+        self.z = z
+
+    @staticmethod
+    def create(x=0.0, y=0.0, z=0.0):
+        record('Point3D.create')
+        return Point3D(x, y, z)
+
+    def copy(self):
+        return Point3D(self.x, self.y, self.z)
+
+    def distanceTo(self, other) -> float:
+        return math.sqrt((self.x - other.x) ** 2 + (self.y - other.y) ** 2 + (self.z - other.z) ** 2)
+
+
+class Vector3D(Base):
+    def __init__(self, x=0.0, y=0.0, z=0.0):
+        self.x = x
+        self.y = y
+        self.z = z
+
+    @staticmethod
+    def create(x=0.0, y=0.0, z=0.0):
+        record('Vector3D.create')
+        return Vector3D(x, y, z)
+
+
+class Plane(Base):
+    def __init__(self, origin, normal):
+        self.origin = origin
+        self.normal = normal
+
+    @staticmethod
+    def cast(obj):
+        return obj if isinstance(obj, Plane) else None
+
+
+class Matrix3D(Base):
+    def __init__(self):
+        self._cells = [[1.0 if row == column else 0.0 for column in range(4)] for row in range(4)]
+
+    @staticmethod
+    def create():
+        record('Matrix3D.create')
+        return Matrix3D()
+
+    @api
+    def setCell(self, row: int, column: int, value: float):
+        self._cells[row][column] = value
+        return True
+
+    @api
+    def getCell(self, row: int, column: int) -> float:
+        return self._cells[row][column]
+
+    @api
+    def setToRotation(self, angle: float, axis, origin):
+        # rotation about z through origin, which is all the add-in uses
+        cos, sin = math.cos(angle), math.sin(angle)
+        self.__init__()
+        self._cells[0][0], self._cells[0][1] = cos, -sin
+        self._cells[1][0], self._cells[1][1] = sin, cos
+        self._cells[0][3] = origin.x - cos * origin.x + sin * origin.y
+        self._cells[1][3] = origin.y - sin * origin.x - cos * origin.y
+        return True
+
+    @api
+    def transformBy(self, matrix):
+        # self = matrix * self, as in Fusion
+        other = matrix._cells
+        self._cells = [[sum(other[row][k] * self._cells[k][column] for k in range(4)) for column in range(4)]
+                       for row in range(4)]
+        return True
+
+    @property
+    def translation(self):
+        return Vector3D(self._cells[0][3], self._cells[1][3], self._cells[2][3])
+
+    @translation.setter
+    def translation(self, vector):
+        record('Matrix3D.translation')
+        self._cells[0][3], self._cells[1][3], self._cells[2][3] = vector.x, vector.y, vector.z
+
+    def apply(self, x: float, y: float):
+        cells = self._cells
+        return (cells[0][0] * x + cells[0][1] * y + cells[0][3],
+                cells[1][0] * x + cells[1][1] * y + cells[1][3])
+
+
+class ObjectCollection(Collection):
+    @staticmethod
+    def create():
+        record('ObjectCollection.create')
+        return ObjectCollection()
+
+    @api
+    def add(self, item):
+        self._items.append(item)
+        return True
+
+    @api
+    def clear(self):
+        self._items = []
+        return True
+
+
+class ValueInput(Base):
+    def __init__(self, realValue=None, stringValue=None):
+        self.realValue = realValue
+        self.stringValue = stringValue
+
+    @staticmethod
+    def createByReal(value: float):
+        record('ValueInput.createByReal')
+        return ValueInput(realValue=value)
+
+    @staticmethod
+    def createByString(expression: str):
+        record('ValueInput.createByString')
+        return ValueInput(stringValue=expression)
+
+
+class Color(Base):
+    def __init__(self, red, green, blue, opacity):
+        self.red, self.green, self.blue, self.opacity = red, green, blue, opacity
+
+    @staticmethod
+    def create(red, green, blue, opacity):
+        record('Color.create')
+        return Color(red, green, blue, opacity)
+
+
+class UserInterface(Base):
+    def __init__(self):
+        self.messages = []
+
+    @api
+    def messageBox(self, text, *args):
+        self.messages.append(text)
+        return 0
+
+
+class Application(Base):
+    _instance = None
+
+    def __init__(self):
+        self.userInterface = UserInterface()
+        self.activeProduct = None
+        self.logged = []
+
+    @staticmethod
+    def get():
+        if Application._instance is None:
+            Application._instance = Application()
+        return Application._instance
+
+    def log(self, message, level=LogLevels.InfoLogLevel, type=LogTypes.ConsoleLogType):
+        self.logged.append(message)
+
+
+def __getattr__(name):
+    return Stub(name)
@@ -0,0 +1,932 @@
+import json
+import math
+import re
+
+from . import core
+from .recording import Base, Collection, Entity, Stub, api, record
+
+
+class DesignTypes:
+    DirectDesignType = 0
+    ParametricDesignType = 1
+
+
+class FeatureOperations:
+    JoinFeatureOperation = 0
+    CutFeatureOperation = 1
+    IntersectFeatureOperation = 2
+    NewBodyFeatureOperation = 3
+    NewComponentFeatureOperation = 4
+
+
+class BooleanTypes:
+    DifferenceBooleanType = 0
+    IntersectionBooleanType = 1
+    UnionBooleanType = 2
+
+
+class PatternDistanceType:
+    ExtentPatternDistanceType = 0
+    SpacingPatternDistanceType = 1
+
+
+# ----- design and timeline -----
+
+class TimelineObject(Base):
+    def __init__(self, timeline, entity):
+        self._timeline = timeline
+        self.entity = entity
+        self.parentGroup = None
+
+    @property
+    def index(self) -> int:
+        return self._timeline._items.index(self)
+
+    @api
+    def rollTo(self, rollBefore: bool):
+        index = self._timeline._items.index(self)
+        self._timeline.markerPosition = index if rollBefore else index + 1
+        return True
+
+
+class TimelineGroup(Collection):
+    def __init__(self, timeline, items):
+        super().__init__(items)
+        self._timeline = timeline
+        self.name = ''
+        for item in items:
+            item.parentGroup = self
+
+    @api
+    def rollTo(self, rollBefore: bool):
+        indices = [item.index for item in self._items]
+        self._timeline.markerPosition = min(indices) if rollBefore else max(indices) + 1
+        return True
+
+    @api
+    def deleteMe(self, deleteGroupAndContents: bool = True):
+        for item in list(self._items):
+            item.parentGroup = None
+            if deleteGroupAndContents:
+                item.entity.deleteMe()
+        self._items = []
+        self._timeline.timelineGroups._remove(self)
+        return True
+
+
+class TimelineGroups(Collection):
+    def __init__(self, timeline):
+        super().__init__()
+        self._timeline = timeline
+
+    def _remove(self, group):
+        if group in self._items:
+            self._items.remove(group)
+
+    @api
+    def add(self, startIndex: int, endIndex: int):
+        group = TimelineGroup(self._timeline, self._timeline._items[startIndex:endIndex + 1])
+        self._items.append(group)
+        return group
+
+
+class Timeline(Collection):
+    def __init__(self):
+        super().__init__()
+        self.markerPosition = 0
+        self.timelineGroups = TimelineGroups(self)
+
+    def _add(self, entity):
+        self._items.insert(self.markerPosition, TimelineObject(self, entity))
+        self.markerPosition += 1
+
+    def _remove(self, entity):
+        for index, item in enumerate(self._items):
+            if item.entity is entity:
+                del self._items[index]
+                group = item.parentGroup
+                if group is not None:
+                    group._items.remove(item)
+                    # a group goes away with the last of its features
+                    if not group._items:
+                        self.timelineGroups._remove(group)
+                if index < self.markerPosition:
+                    self.markerPosition -= 1
+                return
+
+    @api
+    def deleteAllAfterMarker(self):
+        for item in reversed(self._items[self.markerPosition:]):
+            item.entity.deleteMe()
+        return True
+
+    @api
+    def moveToEnd(self):
+        self.markerPosition = len(self._items)
+        return True
+
+
+class Design(Entity):
+    def __init__(self, parametric: bool = True):
+        super().__init__()
+        self.designType = DesignTypes.ParametricDesignType if parametric else DesignTypes.DirectDesignType
+        self.timeline = Timeline()
+        self.userParameters = UserParameters()
+        self._components = []
+        # base feature being edited, nothing made meanwhile is captured in the timeline
+        self._editedBaseFeature = None
+        self.rootComponent = Component(self)
+
+    @property
+    def isParametric(self) -> bool:
+        return self.designType == DesignTypes.ParametricDesignType
+
+    def _add_to_timeline(self, entity):
+        if self.isParametric and self._editedBaseFeature is None:
+            self.timeline._add(entity)
+
+    @property
+    def allComponents(self):
+        return Collection(self._components)
+
+    @api
+    def findEntityByToken(self, token: str):
+        from .recording import entities
+        entity = entities.get(token)
+        return [entity] if entity is not None and entity.isValid else []
+
+    @api
+    def findAttributes(self, groupName: str, attributeName: str):
+        found = []
+        for component in self._components:
+            for plane in component.constructionPlanes:
+                attribute = plane.attributes.itemByName(groupName, attributeName)
+                if attribute is not None:
+                    found.append(attribute)
+        return found
+
+
+class Attribute(Base):
+    def __init__(self, parent, groupName, name, value):
+        self.parent = parent
+        self.groupName = groupName
+        self.name = name
+        self.value = value
+
+
+class Attributes(Base):
+    def __init__(self, parent):
+        self._parent = parent
+        self._items = {}
+
+    @api
+    def add(self, groupName, name, value):
+        attribute = self._items[(groupName, name)] = Attribute(self._parent, groupName, name, value)
+        return attribute
+
+    @api
+    def itemByName(self, groupName, name):
+        return self._items.get((groupName, name))
+
+
+# ----- parameters -----
+
+_UNITS = re.compile(r'(?<=[\d.\s)])\s*(cm|mm|in)\b')
+
+
+class UserParameter(Base):
+    def __init__(self, parameters, name, expression, unit, comment):
+        self._parameters = parameters
+        self.name = name
+        self.expression = expression
+        self.unit = unit
+        self.comment = comment
+
+    @property
+    def value(self) -> float:
+        return self._parameters._evaluate(self.expression)
+
+    @api
+    def deleteMe(self):
+        self._parameters._items.remove(self)
+        return True
+
+
+class UserParameters(Collection):
+    @api
+    def add(self, name, value, units, comment):
+        expression = value.stringValue if value.stringValue is not None else str(value.realValue)
+        parameter = UserParameter(self, name, expression, units, comment)
+        self._items.append(parameter)
+        return parameter
+
+    @api
+    def itemByName(self, name):
+        for parameter in self._items:
+            if parameter.name == name:
+                return parameter
+        return None
+
+    def _evaluate(self, expression: str) -> float:
+        # centimeters are the internal unit, like in Fusion; mm and inches are not used by the add-in
+        namespace = {parameter.name: parameter.value for parameter in self._items if parameter.name in expression}
+        namespace['floor'] = math.floor
+        return eval(_UNITS.sub('', expression), {'__builtins__': {}}, namespace)
+
+
+class ModelParameter(Base):
+    def __init__(self, design, value):
+        self._design = design
+        self.value = value
+
+    @property
+    def expression(self) -> str:
+        return str(self.value)
+
+    @expression.setter
+    def expression(self, expression: str):
+        record('ModelParameter.expression')
+        self.value = self._design.userParameters._evaluate(expression)
+
+
+def _evaluate(design, value) -> float:
+    if value.stringValue is not None:
+        return design.userParameters._evaluate(value.stringValue)
+    return value.realValue
+
+
+# ----- bodies -----
+
+class BoundingBox3D(Base):
+    def __init__(self, minPoint, maxPoint):
+        self.minPoint = minPoint
+        self.maxPoint = maxPoint
+
+
+class BRepVertex(Base):
+    def __init__(self, x, y, z):
+        self.geometry = core.Point3D(x, y, z)
+
+
+class BRepEdge(Base):
+    def __init__(self, start=None, end=None):
+        self.startVertex = start or BRepVertex(0, 0, 0)
+        self.endVertex = end or BRepVertex(0, 0, 0)
+
+
+class BRepFace(Base):
+    def __init__(self, geometry=None, minZ=0.0, maxZ=0.0, edges=None):
+        self.geometry = geometry
+        self.boundingBox = BoundingBox3D(core.Point3D(0, 0, minZ), core.Point3D(0, 0, maxZ))
+        self.edges = Collection(edges if edges is not None else [BRepEdge() for _ in range(8)])
+
+
+# Apothems of the hole and of the outside of a tile, its height and the height of the lip floor.
+TILE_HOLE = 1.0
+TILE_OUTSIDE = 1.18
+TILE_TOP = 0.8
+TILE_LIP_FLOOR = 0.51
+
+
+def _tile_wall(x, y, angle, apothem, top):
+    """Vertical face of a hex side facing angle, with its bottom, top and side edges."""
+    normalX, normalY = math.cos(angle), math.sin(angle)
+    edges = []
+    for z in (0.0, top):
+        edges.append(BRepEdge(BRepVertex(x, y, z), BRepVertex(x, y, z)))
+    edges += [BRepEdge(BRepVertex(x, y, 0.0), BRepVertex(x, y, top)) for _ in range(2)]
+    plane = core.Plane(core.Point3D(x + normalX * apothem, y + normalY * apothem, 0), core.Vector3D(normalX, normalY, 0))
+    return BRepFace(plane, 0.0, top, edges)
+
+
+def _tile_faces(x, y):
+    """Faces of a cell around (x, y) like a modelled tile has them, plus the cut faces of a quarter."""
+    faces = []
+    for side in range(6):
+        angle = math.pi / 6 + side * math.pi / 3
+        faces.append(_tile_wall(x, y, angle, TILE_HOLE, TILE_LIP_FLOOR))
+        faces.append(_tile_wall(x, y, angle, TILE_OUTSIDE, TILE_TOP))
+    for normal in ((1, 0, 0), (0, 1, 0)):
+        faces.append(BRepFace(core.Plane(core.Point3D(x, y, 0), core.Vector3D(*normal)), 0.0, TILE_TOP))
+    for z in (0.0, TILE_LIP_FLOOR, TILE_TOP):
+        faces.append(BRepFace(core.Plane(core.Point3D(x, y, z), core.Vector3D(0, 0, 1)), z, z))
+    return faces
+
+
+class BRepBody(Entity):
+    EDGE_COUNT = 48
+
+    def __init__(self, x: float = 0.0, y: float = 0.0, component=None):
+        super().__init__()
+        self.x = x
+        self.y = y
+        self.parentComponent = component
+        self.isLightBulbOn = True
+        self._edges = None
+        self._faces = None
+
+    @property
+    def edges(self):
+        if self._edges is None:
+            self._edges = Collection([BRepEdge() for _ in range(self.EDGE_COUNT)])
+        return self._edges
+
+    @property
+    def faces(self):
+        if self._faces is None:
+            self._faces = Collection(_tile_faces(self.x, self.y))
+        return self._faces
+
+    @property
+    def boundingBox(self):
+        return BoundingBox3D(core.Point3D(self.x - 1, self.y - 1, 0), core.Point3D(self.x + 1, self.y + 1, 1))
+
+    @api
+    def deleteMe(self):
+        if self.parentComponent is not None:
+            self.parentComponent.bRepBodies._remove(self)
+        self.isValid = False
+        return True
+
+
+class BRepBodies(Collection):
+    def __init__(self, component):
+        super().__init__()
+        self._component = component
+
+    def _new(self, x, y, feature=None):
+        body = BRepBody(x, y, self._component)
+        self._items.append(body)
+        if feature is not None:
+            feature._created.append(body)
+        return body
+
+    def _remove(self, body):
+        if body in self._items:
+            self._items.remove(body)
+
+    def _restore(self, body):
+        if body not in self._items:
+            self._items.append(body)
+            body.isValid = True
+
+    @api
+    def add(self, body, baseFeature=None):
+        added = self._new(body.x, body.y, baseFeature)
+        if baseFeature is not None:
+            baseFeature.bodies._items.append(added)
+        return added
+
+
+class TemporaryBRepManager(Base):
+    _instance = None
+
+    @staticmethod
+    def get():
+        if TemporaryBRepManager._instance is None:
+            TemporaryBRepManager._instance = TemporaryBRepManager()
+        return TemporaryBRepManager._instance
+
+    @api
+    def copy(self, body):
+        return BRepBody(body.x, body.y)
+
+    @api
+    def transform(self, body, matrix):
+        body.x, body.y = matrix.apply(body.x, body.y)
+        return True
+
+    @api
+    def booleanOperation(self, targetBody, toolBody, booleanType):
+        return True
+
+    @api
+    def exportToFile(self, bodies, filename):
+        with open(filename, 'w') as file:
+            json.dump([[body.x, body.y] for body in bodies], file)
+        return True
+
+    @api
+    def createFromFile(self, filename):
+        with open(filename) as file:
+            return Collection([BRepBody(x, y) for x, y in json.load(file)])
+
+
+# ----- sketches -----
+
+class SketchPoint(Entity):
+    def __init__(self, geometry):
+        super().__init__()
+        self.geometry = geometry
+
+
+class Line3D(Base):
+    def __init__(self, startPoint, endPoint):
+        self.startPoint = startPoint
+        self.endPoint = endPoint
+
+
+class SketchLine(Entity):
+    def __init__(self, start, end):
+        super().__init__()
+        self.startSketchPoint = start
+        self.endSketchPoint = end
+        self.isConstruction = False
+
+    @property
+    def geometry(self):
+        return Line3D(self.startSketchPoint.geometry, self.endSketchPoint.geometry)
+
+
+def _sketch_point(point):
+    return point if isinstance(point, SketchPoint) else SketchPoint(point)
+
+
+class SketchLines(Collection):
+    def __init__(self, sketch):
+        super().__init__()
+        self._sketch = sketch
+
+    def _add(self, start, end):
+        line = SketchLine(_sketch_point(start), _sketch_point(end))
+        self._items.append(line)
+        self._sketch._touch(line.startSketchPoint.geometry)
+        return line
+
+    @api
+    def addByTwoPoints(self, startPoint, endPoint):
+        return self._add(startPoint, endPoint)
+
+    @api
+    def addTwoPointRectangle(self, pointOne, pointTwo):
+        corners = [
+            core.Point3D(pointOne.x, pointOne.y, 0), core.Point3D(pointTwo.x, pointOne.y, 0),
+            core.Point3D(pointTwo.x, pointTwo.y, 0), core.Point3D(pointOne.x, pointTwo.y, 0),
+        ]
+        points = [SketchPoint(corner) for corner in corners]
+        return Collection([self._add(points[index], points[(index + 1) % 4]) for index in range(4)])
+
+    @api
+    def addScribedPolygon(self, centerPoint, edgeCount, angle, radius, isInscribed):
+        self._sketch._touch(centerPoint)
+        circumradius = radius if isInscribed else radius / math.cos(math.pi / edgeCount)
+        points = []
+        for index in range(edgeCount):
+            vertexAngle = angle + math.pi / edgeCount + 2 * math.pi * index / edgeCount
+            points.append(SketchPoint(core.Point3D(centerPoint.x + circumradius * math.cos(vertexAngle),
+                                                   centerPoint.y + circumradius * math.sin(vertexAngle), 0)))
+        return Collection([self._add(points[index], points[(index + 1) % edgeCount]) for index in range(edgeCount)])
+
+
+class SketchPoints(Collection):
+    @api
+    def add(self, point):
+        sketchPoint = SketchPoint(point)
+        self._items.append(sketchPoint)
+        return sketchPoint
+
+
+class SketchCurves(Base):
+    def __init__(self, sketch):
+        self.sketchLines = SketchLines(sketch)
+
+
+class Profile(Base):
+    def __init__(self, sketch, loops):
+        self._sketch = sketch
+        self.profileLoops = Collection([Base() for _ in range(loops)])
+
+
+class Sketch(Entity):
+    # every sketch of the add-in has a ring (two loops) among its first profiles
+    PROFILE_COUNT = 6
+
+    def __init__(self, component, plane):
+        super().__init__()
+        self.parentComponent = component
+        self.referencePlane = plane
+        self.isComputeDeferred = False
+        self.isVisible = True
+        self.sketchCurves = SketchCurves(self)
+        self.sketchPoints = SketchPoints()
+        self.profiles = Collection([Profile(self, 2 if index == 1 else 1) for index in range(self.PROFILE_COUNT)])
+        self._center = None
+
+    def _touch(self, point):
+        if self._center is None:
+            self._center = (point.x, point.y)
+
+    @property
+    def center(self):
+        return self._center or (0.0, 0.0)
+
+    @api
+    def deleteMe(self):
+        self.parentComponent.sketches._remove(self)
+        self.parentComponent.parentDesign.timeline._remove(self)
+        self.isValid = False
+        return True
+
+
+class Sketches(Collection):
+    def __init__(self, component):
+        super().__init__()
+        self._component = component
+
+    @api
+    def add(self, plane):
+        sketch = Sketch(self._component, plane)
+        self._items.append(sketch)
+        self._component.parentDesign._add_to_timeline(sketch)
+        return sketch
+
+    def _remove(self, sketch):
+        if sketch in self._items:
+            self._items.remove(sketch)
+
+
+# ----- features -----
+
+class Feature(Entity):
+    """Any timeline feature. Deleting it removes the bodies it made and brings back the ones it consumed."""
+
+    def __init__(self, component, bodies=None):
+        super().__init__()
+        self._component = component
+        self._created = []
+        self._consumed = []
+        self.bodies = Collection(bodies or [])
+        component.parentDesign._add_to_timeline(self)
+
+    @property
+    def timelineObject(self):
+        for item in self._component.parentDesign.timeline._items:
+            if item.entity is self:
+                return item
+        return None
+
+    @api
+    def deleteMe(self):
+        for body in self._created:
+            self._component.bRepBodies._remove(body)
+            body.isValid = False
+        for body in self._consumed:
+            self._component.bRepBodies._restore(body)
+        self._component.parentDesign.timeline._remove(self)
+        self.isValid = False
+        return True
+
+
+class FeatureInput(Base):
+    def __init__(self, *args):
+        self.args = args
+
+
+class ExtrudeFeatureInput(FeatureInput):
+    @api
+    def setOneSideExtent(self, extent, direction, taperAngle=None):
+        return True
+
+
+class ExtrudeFeatures(Base):
+    def __init__(self, component):
+        self._component = component
+
+    def _extrude(self, profiles, operation):
+        profile = profiles if isinstance(profiles, Profile) else next(iter(profiles), None)
+        feature = Feature(self._component)
+        if operation == FeatureOperations.NewBodyFeatureOperation:
+            x, y = profile._sketch.center if profile is not None else (0.0, 0.0)
+            feature.bodies._items.append(self._component.bRepBodies._new(x, y, feature))
+        return feature
+
+    @api
+    def createInput(self, profiles, operation):
+        return ExtrudeFeatureInput(profiles, operation)
+
+    @api
+    def add(self, input):
+        return self._extrude(input.args[0], input.args[1])
+
+    @api
+    def addSimple(self, profile, distance, operation):
+        return self._extrude(profile, operation)
+
+
+class ChamferFeatureInput(FeatureInput):
+    pass
+
+
+class ChamferFeatures(Base):
+    def __init__(self, component):
+        self._component = component
+
+    @api
+    def createInput2(self):
+        return ChamferFeatureInput()
+
+    @api
+    def add(self, input):
+        return Feature(self._component)
+
+
+class MirrorFeatureInput(FeatureInput):
+    def __init__(self, entities, plane):
+        super().__init__(entities, plane)
+        self.isCombine = False
+
+
+class MirrorFeatures(Base):
+    def __init__(self, component):
+        self._component = component
+
+    @api
+    def createInput(self, inputEntities, mirrorPlane):
+        return MirrorFeatureInput(inputEntities, mirrorPlane)
+
+    @api
+    def add(self, input):
+        feature = Feature(self._component)
+        for body in input.args[0]:
+            feature.bodies._items.append(self._component.bRepBodies._new(body.x, body.y, feature))
+        return feature
+
+
+class RectangularPatternFeatureInput(FeatureInput):
+    def __init__(self, entities, axis, quantity, distance):
+        super().__init__(entities)
+        self.directionOne = (axis, quantity, distance)
+        self.directionTwo = None
+
+    @api
+    def setDirectionTwo(self, directionTwoEntity, quantityTwo, distanceTwo):
+        self.directionTwo = (directionTwoEntity, quantityTwo, distanceTwo)
+        return True
+
+
+class PatternElement(Base):
+    """One copy of a pattern. The first element is the seed body, it has no body of its own here."""
+
+    def __init__(self, component, dx, dy, body=None):
+        self._component = component
+        self._body = body
+        self._suppressed = False
+        self.transform = core.Matrix3D()
+        self.transform._cells[0][3], self.transform._cells[1][3] = dx, dy
+
+    @property
+    def isSuppressed(self) -> bool:
+        return self._suppressed
+
+    @isSuppressed.setter
+    def isSuppressed(self, value: bool):
+        record('PatternElement.isSuppressed')
+        self._suppressed = value
+        if self._body is not None:
+            if value:
+                self._component.bRepBodies._remove(self._body)
+            else:
+                self._component.bRepBodies._restore(self._body)
+
+
+class RectangularPatternFeature(Feature):
+    def __init__(self, component, input):
+        super().__init__(component)
+        design = component.parentDesign
+        axisOne, quantityOne, distanceOne = input.directionOne
+        axisTwo, quantityTwo, distanceTwo = input.directionTwo or (axisOne, core.ValueInput(realValue=1), distanceOne)
+
+        self.quantityOne = ModelParameter(design, _evaluate(design, quantityOne))
+        self.quantityTwo = ModelParameter(design, _evaluate(design, quantityTwo))
+        stepOne = _evaluate(design, distanceOne)
+        stepTwo = _evaluate(design, distanceTwo)
+
+        self.inputEntities = core.ObjectCollection(input.args[0])
+        self.patternElements = Collection()
+        for body in input.args[0]:
+            for one in range(int(self.quantityOne.value)):
+                for two in range(int(self.quantityTwo.value)):
+                    dx = axisOne.direction[0] * stepOne * one + axisTwo.direction[0] * stepTwo * two
+                    dy = axisOne.direction[1] * stepOne * one + axisTwo.direction[1] * stepTwo * two
+                    if one == 0 and two == 0:
+                        self.patternElements._items.append(PatternElement(component, dx, dy))
+                        continue
+                    copy = component.bRepBodies._new(body.x + dx, body.y + dy, self)
+                    self.bodies._items.append(copy)
+                    self.patternElements._items.append(PatternElement(component, dx, dy, copy))
+
+
+class RectangularPatternFeatures(Base):
+    def __init__(self, component):
+        self._component = component
+
+    @api
+    def createInput(self, inputEntities, directionOneEntity, quantityOne, distanceOne, patternDistanceType):
+        return RectangularPatternFeatureInput(inputEntities, directionOneEntity, quantityOne, distanceOne)
+
+    @api
+    def add(self, input):
+        return RectangularPatternFeature(self._component, input)
+
+
+class CombineFeatureInput(FeatureInput):
+    def __init__(self, targetBody, toolBodies):
+        super().__init__(targetBody, toolBodies)
+        self.isKeepToolBodies = False
+        self.operation = FeatureOperations.JoinFeatureOperation
+
+
+class CombineFeatures(Base):
+    def __init__(self, component):
+        self._component = component
+
+    @api
+    def createInput(self, targetBody, toolBodies):
+        return CombineFeatureInput(targetBody, toolBodies)
+
+    @api
+    def add(self, input):
+        targetBody, toolBodies = input.args
+        feature = Feature(self._component, [targetBody])
+        if not input.isKeepToolBodies:
+            for body in toolBodies:
+                self._component.bRepBodies._remove(body)
+                feature._consumed.append(body)
+        return feature
+
+
+class MoveFeatureInput(FeatureInput):
+    def __init__(self, entities, transform=None):
+        super().__init__(entities)
+        self.transform = transform
+
+    @api
+    def defineAsTranslateXYZ(self, xDistance, yDistance, zDistance, isDesignSpace):
+        return True
+
+
+class MoveFeatures(Base):
+    def __init__(self, component):
+        self._component = component
+
+    @api
+    def createInput(self, inputEntities, transform):
+        return MoveFeatureInput(inputEntities, transform)
+
+    @api
+    def createInput2(self, inputEntities):
+        return MoveFeatureInput(inputEntities)
+
+    @api
+    def add(self, input):
+        if input.transform is not None:
+            for body in input.args[0]:
+                body.x, body.y = input.transform.apply(body.x, body.y)
+        return Feature(self._component)
+
+
+class RemoveFeatures(Base):
+    def __init__(self, component):
+        self._component = component
+
+    @api
+    def add(self, entity):
+        feature = Feature(self._component)
+        self._component.bRepBodies._remove(entity)
+        feature._consumed.append(entity)
+        return feature
+
+
+class BaseFeature(Feature):
+    @api
+    def startEdit(self):
+        self._component.parentDesign._editedBaseFeature = self
+        return True
+
+    @api
+    def finishEdit(self):
+        self._component.parentDesign._editedBaseFeature = None
+        return True
+
+
+class BaseFeatures(Base):
+    def __init__(self, component):
+        self._component = component
+
+    @api
+    def add(self):
+        return BaseFeature(self._component)
+
+
+class Features(Base):
+    def __init__(self, component):
+        self.extrudeFeatures = ExtrudeFeatures(component)
+        self.chamferFeatures = ChamferFeatures(component)
+        self.mirrorFeatures = MirrorFeatures(component)
+        self.rectangularPatternFeatures = RectangularPatternFeatures(component)
+        self.combineFeatures = CombineFeatures(component)
+        self.moveFeatures = MoveFeatures(component)
+        self.removeFeatures = RemoveFeatures(component)
+        self.baseFeatures = BaseFeatures(component)
+
+
+# ----- components -----
+
+class ConstructionAxis(Entity):
+    def __init__(self, direction):
+        super().__init__()
+        self.direction = direction
+
+
+class ConstructionPlane(Entity):
+    def __init__(self, component):
+        super().__init__()
+        self.parent = component
+        self.attributes = Attributes(self)
+
+    @api
+    def deleteMe(self):
+        self.parent.constructionPlanes._remove(self)
+        self.parent.parentDesign.timeline._remove(self)
+        self.isValid = False
+        return True
+
+
+class ConstructionPlaneInput(FeatureInput):
+    @api
+    def setByOffset(self, planarEntity, offset):
+        return True
+
+
+class ConstructionPlanes(Collection):
+    def __init__(self, component):
+        super().__init__()
+        self._component = component
+
+    @api
+    def createInput(self, occurrenceForCreation=None):
+        return ConstructionPlaneInput()
+
+    @api
+    def add(self, input):
+        plane = ConstructionPlane(self._component)
+        self._items.append(plane)
+        self._component.parentDesign._add_to_timeline(plane)
+        return plane
+
+    def _remove(self, plane):
+        if plane in self._items:
+            self._items.remove(plane)
+
+
+class Occurrence(Entity):
+    def __init__(self, component, transform, occurrences=None):
+        super().__init__()
+        self.component = component
+        self.transform = transform
+        self.isLightBulbOn = True
+        self._occurrences = occurrences
+
+    @api
+    def deleteMe(self):
+        if self._occurrences is not None and self in self._occurrences._items:
+            self._occurrences._items.remove(self)
+        self.isValid = False
+        return True
+
+
+class Occurrences(Collection):
+    def __init__(self, component):
+        super().__init__()
+        self._component = component
+
+    @api
+    def addNewComponent(self, transform):
+        occurrence = Occurrence(Component(self._component.parentDesign), transform, self)
+        self._items.append(occurrence)
+        return occurrence
+
+    @api
+    def addExistingComponent(self, component, transform):
+        occurrence = Occurrence(component, transform, self)
+        self._items.append(occurrence)
+        return occurrence
+
+
+class Component(Entity):
+    def __init__(self, design):
+        super().__init__()
+        self.parentDesign = design
+        self.sketches = Sketches(self)
+        self.features = Features(self)
+        self.bRepBodies = BRepBodies(self)
+        self.constructionPlanes = ConstructionPlanes(self)
+        self.occurrences = Occurrences(self)
+        self.xYConstructionPlane = ConstructionPlane(self)
+        self.xConstructionAxis = ConstructionAxis((1.0, 0.0))
+        self.yConstructionAxis = ConstructionAxis((0.0, 1.0))
+        design._components.append(self)
+
+
+def __getattr__(name):
+    return Stub(name)
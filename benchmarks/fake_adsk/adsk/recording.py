@@ -0,0 +1,114 @@
+import collections
+import itertools
+
+# Number of calls per "Class.method" since the last reset().
+calls = collections.Counter()
+
+# Every object with an entity token, so Design.findEntityByToken works.
+entities = {}
+
+_tokens = itertools.count(1)
+
+
+def reset():
+    calls.clear()
+
+
+def record(name: str):
+    calls[name] += 1
+
+
+def total() -> int:
+    return sum(calls.values())
+
+
+def new_token(entity) -> str:
+    token = f'token{next(_tokens)}'
+    entities[token] = entity
+    return token
+
+
+def api(method):
+    """Counts every call of a fake API method under its class name."""
+    def wrapper(self, *args, **kwargs):
+        record(f'{type(self).__name__}.{method.__name__}')
+        return method(self, *args, **kwargs)
+
+    wrapper.__name__ = method.__name__
+    return wrapper
+
+
+class Stub:
+    """Any API object that is not modelled. Calls are recorded, attributes are more stubs."""
+
+    def __init__(self, path: str):
+        object.__setattr__(self, '_path', path)
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        if name == 'cast':
+            return lambda obj: obj
+        child = Stub(f'{self._path}.{name}')
+        object.__setattr__(self, name, child)
+        return child
+
+    def __call__(self, *args, **kwargs):
+        record(self._path)
+        return Stub(self._path.rsplit('.', 1)[-1])
+
+    def __iter__(self):
+        return iter(())
+
+
+class Base:
+    """Fake API object. Unknown attributes fall back to stubs named after the class."""
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        child = Stub(f'{type(self).__name__}.{name}')
+        object.__setattr__(self, name, child)
+        return child
+
+    @classmethod
+    def cast(cls, obj):
+        return obj
+
+
+class Entity(Base):
+    """Fake object that can be found again by its entity token and deleted."""
+
+    def __init__(self):
+        self.entityToken = new_token(self)
+        self.isValid = True
+        self.name = ''
+
+    @api
+    def deleteMe(self):
+        self.isValid = False
+        return True
+
+
+class Collection(Base):
+    """Read only API collection backed by a list."""
+
+    def __init__(self, items=None):
+        self._items = list(items or [])
+
+    @property
+    def count(self) -> int:
+        return len(self._items)
+
+    def item(self, index: int):
+        record(f'{type(self).__name__}.item')
+        return self._items[index]
+
+    def __getitem__(self, index: int):
+        return self._items[index]
+
+    def __iter__(self):
+        return iter(list(self._items))
+
+    def __len__(self):
+        return len(self._items)
@@ -0,0 +1,218 @@
+"""Benchmarks create_hsw against the recording fake adsk in benchmarks/fake_adsk.
+
+Every case builds one wall in a fresh fake design and reports the number of
+Fusion API calls, the features left on the timeline and the python side time.
+Call counts are compared with baseline.json and the run fails when any case
+needs more calls than recorded there. Times are only reported, they depend on
+the machine. The outline cases plan walls of other shapes with the hex grid
+engine and build them like the direct mode, they are left out without numpy.
+
+    python benchmarks/run_benchmarks.py                    # compare with the baseline
+    python benchmarks/run_benchmarks.py --update-baseline  # record new counts
+    python benchmarks/run_benchmarks.py --filter direct --calls 15
+"""
+
+import argparse
+import contextlib
+import importlib
+import io
+import json
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+ADDIN_DIR = os.path.dirname(BENCHMARK_DIR)
+BASELINE_PATH = os.path.join(BENCHMARK_DIR, 'baseline.json')
+
+sys.path.insert(0, os.path.join(BENCHMARK_DIR, 'fake_adsk'))
+sys.path.insert(0, os.path.dirname(ADDIN_DIR))
+
+import adsk.core
+import adsk.fusion
+from adsk import recording
+
+ADDIN = os.path.basename(ADDIN_DIR)
+entry = importlib.import_module(f'{ADDIN}.commands.HoneycombStorageWall.entry')
+layout = importlib.import_module(f'{ADDIN}.lib.honeycombStorageWallUtils.layout')
+tiles = importlib.import_module(f'{ADDIN}.lib.honeycombStorageWallUtils.tiles')
+constants = importlib.import_module(f'{ADDIN}.lib.honeycombStorageWallUtils.constants')
+direct = importlib.import_module(f'{ADDIN}.lib.honeycombStorageWallUtils.direct')
+hexgrid = importlib.import_module(f'{ADDIN}.lib.honeycombStorageWallUtils.hexgrid')
+
+SIZES = [(10.0, 10.0), (25.0, 25.0), (50.0, 50.0), (100.0, 60.0)]
+
+BORDERS = {
+    'none': (),
+    'bottom': ('bottom',),
+    'top': ('top',),
+    'left': ('left',),
+    'right': ('right',),
+    'bottom+top': ('bottom', 'top'),
+    'left+right': ('left', 'right'),
+    'all': ('bottom', 'top', 'left', 'right'),
+}
+
+# An outlet, a light switch and a round pipe, all within the smallest wall.
+KEEP_OUTS = 'rect 2 3 1.2 2; rect 6 6 0.8 1.2; circle 8 2 0.6'
+
+# name -> (build mode, drive with user parameters, sketch first, capture history, keep-out zones)
+MODES = {
+    'features': (entry.BUILD_MODE_FEATURES, False, True, True, ''),
+    'interleaved': (entry.BUILD_MODE_FEATURES, False, False, True, ''),
+    'parameters': (entry.BUILD_MODE_FEATURES, True, True, True, ''),
+    'nohistory': (entry.BUILD_MODE_FEATURES, False, True, False, ''),
+    'direct': (entry.BUILD_MODE_DIRECT, False, True, True, ''),
+    'instanced': (entry.BUILD_MODE_INSTANCED, False, True, True, ''),
+    'keepouts': (entry.BUILD_MODE_FEATURES, False, True, True, KEEP_OUTS),
+    'keepouts-nohistory': (entry.BUILD_MODE_FEATURES, False, True, False, KEEP_OUTS),
+    'keepouts-direct': (entry.BUILD_MODE_DIRECT, False, True, True, KEEP_OUTS),
+}
+
+# name -> outline, all about as large as the 25x25 wall
+OUTLINES = {
+    'L': 'polygon 0 0 25 0 25 25 12 25 12 12 0 12',
+    'round': 'circle 12.5 12.5 12.5',
+    'holes': 'rect 0 0 25 25; -circle 8 8 2; -rect 15 4 1 12',
+    'union': 'rect 0 0 15 25; rect 10 0 15 15',
+}
+
+
+class FakeInputs:
+    """The command inputs create_hsw reads, with their values."""
+
+    def __init__(self, width, height, borders, buildMode, userParameters, sketchFirst, captureHistory, keepOuts,
+                 combine=True):
+        self._inputs = {
+            'width': SimpleNamespace(value=width),
+            'height': SimpleNamespace(value=height),
+            'bottom_border': SimpleNamespace(value='bottom' in borders),
+            'top_border': SimpleNamespace(value='top' in borders),
+            'left_border': SimpleNamespace(value='left' in borders),
+            'right_border': SimpleNamespace(value='right' in borders),
+            'do_corners': SimpleNamespace(value=True),
+            'combine_everything': SimpleNamespace(value=combine),
+            'build_mode': SimpleNamespace(selectedItem=SimpleNamespace(name=buildMode)),
+            'update_existing': SimpleNamespace(value=False, isVisible=False),
+            'user_parameters': SimpleNamespace(value=userParameters, isVisible=True),
+            'sketch_first': SimpleNamespace(value=sketchFirst, isVisible=True),
+            'capture_history': SimpleNamespace(value=captureHistory, isVisible=True),
+            'keep_outs': SimpleNamespace(value=keepOuts),
+        }
+
+    def itemById(self, id):
+        return self._inputs[id]
+
+
+def run_case(build):
+    design = adsk.fusion.Design()
+    app = adsk.core.Application.get()
+    app.activeProduct = design
+    app.userInterface.messages = []
+
+    # every case starts cold, nothing modelled or planned by an earlier one
+    tiles.session_tiles.clear()
+    layout.plan_layout.cache_clear()
+    recording.reset()
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        build(design)
+    seconds = time.perf_counter() - start
+
+    return {
+        'calls': recording.total(),
+        'features': design.timeline.count,
+        'seconds': seconds,
+        'breakdown': recording.calls.copy(),
+        'errors': list(app.userInterface.messages),
+    }
+
+
+def wall_case(width, height, borders, mode):
+    buildMode, userParameters, sketchFirst, captureHistory, keepOuts = MODES[mode]
+
+    def build(design):
+        entry.create_hsw(FakeInputs(width, height, borders, buildMode, userParameters, sketchFirst, captureHistory, keepOuts))
+    return build
+
+
+def outline_case(text):
+    def build(design):
+        component = design.rootComponent
+        topPlaneInput = component.constructionPlanes.createInput()
+        topPlaneInput.setByOffset(component.xYConstructionPlane, constants.TOTAL_THICKNESS)
+        topPlane = component.constructionPlanes.add(topPlaneInput)
+        plan = hexgrid.plan_outline(hexgrid.parse_outline(text))
+        direct.build_direct_wall(component, topPlane, plan, True)
+    return build
+
+
+def cases(pattern=None):
+    named = []
+    for mode in MODES:
+        for width, height in SIZES:
+            for bordersName, borders in BORDERS.items():
+                named.append((f'{mode}/{width:g}x{height:g}/{bordersName}', wall_case(width, height, borders, mode)))
+    if hexgrid.np is not None:
+        for outlineName, text in OUTLINES.items():
+            named.append((f'outline/{outlineName}', outline_case(text)))
+
+    for name, build in named:
+        if pattern is None or pattern in name:
+            yield name, build
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--update-baseline', action='store_true', help='write the call counts of this run to baseline.json')
+    parser.add_argument('--tolerance', type=float, default=0.0, help='allowed growth over the baseline, 0.05 is 5%%')
+    parser.add_argument('--filter', help='only run cases whose name contains this')
+    parser.add_argument('--calls', type=int, default=0, help='show the most frequent API calls of every case')
+    args = parser.parse_args(argv)
+
+    baseline = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH) as file:
+            baseline = json.load(file)
+
+    results = {}
+    errors = []
+    regressions = []
+    print(f'{"case":<36} {"calls":>8} {"baseline":>8} {"features":>8} {"seconds":>8}')
+    for name, build in cases(args.filter):
+        result = run_case(build)
+        results[name] = result['calls']
+        expected = baseline.get(name)
+
+        status = ''
+        if result['errors']:
+            status = 'ERROR'
+            errors.append(f'{name}: {result["errors"][0]}')
+        elif expected is None:
+            status = 'new'
+        elif result['calls'] > expected * (1 + args.tolerance):
+            status = 'REGRESSED'
+            regressions.append(f'{name}: {result["calls"]} calls, baseline {expected}')
+
+        print(f'{name:<36} {result["calls"]:>8} {expected if expected is not None else "-":>8} '
+              f'{result["features"]:>8} {result["seconds"]:>8.3f} {status}')
+        for call, count in result['breakdown'].most_common(args.calls):
+            print(f'    {call:<60} {count:>8}')
+
+    if args.update_baseline:
+        baseline.update(results)
+        with open(BASELINE_PATH, 'w') as file:
+            json.dump(dict(sorted(baseline.items())), file, indent=2)
+            file.write('\n')
+        print(f'Wrote {len(results)} cases to {BASELINE_PATH}')
+        regressions = []
+
+    for failure in errors + regressions:
+        print(f'FAILED {failure}')
+    return 1 if errors or regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,85 @@
+"""Tests of the batching helpers, the caches and the tile cache key."""
+
+import os
+import subprocess
+import sys
+
+from honeycombStorageWallUtils import batching
+from honeycombStorageWallUtils.cache import LRUCache
+from honeycombStorageWallUtils.constants import VERTICAL_SPACING
+from honeycombStorageWallUtils.diskcache import DiskCache
+
+
+def test_spatial_order_goes_row_by_row():
+    points = [(5.0, VERTICAL_SPACING * 2), (1.0, 0.0), (3.0, VERTICAL_SPACING * 2), (2.0, 0.1)]
+    assert batching.spatial_order(points, lambda point: point) == [points[1], points[3], points[2], points[0]]
+
+
+def test_reduce_in_batches_keeps_every_item_in_order():
+    levels = []
+    merged = batching.reduce_in_batches([[index] for index in range(100)], lambda batch: sum(batch, []), 8,
+                                        lambda level, before, after, seconds: levels.append((before, after)))
+    assert merged == list(range(100))
+    assert levels == [(100, 13), (13, 2), (2, 1)]
+    assert batching.reduce_in_batches([], sum, 8) is None
+
+
+def test_lru_cache_evicts_the_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+
+    assert 'b' not in cache
+    assert cache.get('a') == 1 and cache.get('c') == 3
+    assert cache.get('b') is None
+    assert (cache.hits, cache.misses, len(cache)) == (3, 1, 2)
+
+
+def _put(cache, name, size, mtime):
+    assert cache.put(name, lambda path: open(path, 'wb').write(b'x' * size))
+    os.utime(cache.path(name), (mtime, mtime))
+
+
+def test_disk_cache_evicts_the_least_recently_used(tmp_path):
+    cache = DiskCache(str(tmp_path), 'key', maxBytes=300, suffix='.bin')
+    _put(cache, 'a', 100, 1000)
+    _put(cache, 'b', 100, 2000)
+    _put(cache, 'c', 100, 3000)
+    assert cache.get('a') is not None
+
+    _put(cache, 'd', 100, 4000)
+    assert cache.get('b') is None
+    assert all(cache.get(name) for name in 'acd')
+    assert cache.size() == 300
+
+
+def test_disk_cache_evicts_other_keys_first(tmp_path):
+    old = DiskCache(str(tmp_path), 'old', maxBytes=1000)
+    _put(old, 'a', 100, 5000)
+    cache = DiskCache(str(tmp_path), 'new', maxBytes=200)
+    _put(cache, 'a', 100, 1000)
+    _put(cache, 'b', 100, 2000)
+
+    assert old.get('a') is None
+    assert not os.path.exists(os.path.join(str(tmp_path), 'old'))
+    assert cache.get('a') and cache.get('b')
+
+
+def test_disk_cache_keeps_no_broken_entries(tmp_path):
+    cache = DiskCache(str(tmp_path), 'key', maxBytes=1000)
+    assert not cache.put('a', lambda path: False)
+    assert cache.get('a') is None
+    assert os.listdir(os.path.join(str(tmp_path), 'key')) == []
+
+
+def _geometry_key(version):
+    script = f'import conftest; from honeycombStorageWallUtils import tiles; print(tiles.geometry_key({version!r}))'
+    return subprocess.check_output([sys.executable, '-c', script], cwd=os.path.dirname(__file__), text=True).strip()
+
+
+def test_geometry_key_is_stable_between_sessions():
+    first = _geometry_key('1.0.0')
+    assert first == _geometry_key('1.0.0')
+    assert first != _geometry_key('1.0.1')
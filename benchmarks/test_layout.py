@@ -0,0 +1,121 @@
+"""Tests of the layout planners: rectangles, keep-out zones, outlines and print bed panels."""
+
+import pytest
+
+from honeycombStorageWallUtils import layout, obstacles, panels, shapes
+
+SPECS = [
+    layout.WallSpec(30, 20),
+    layout.WallSpec(50, 50, bottom_border=True, top_border=True),
+    layout.WallSpec(100, 60, True, True, True, True),
+    layout.WallSpec(41.3, 27.9, left_border=True, right_border=True, do_corners=False),
+]
+
+
+@pytest.mark.parametrize('spec', SPECS)
+def test_plan_is_deterministic(spec):
+    first = layout.plan_layout(spec)
+    second = layout.plan_layout(spec)
+    assert first == second
+    assert first.layout_key == second.layout_key
+    assert list(first.tiles()) == list(second.tiles())
+    assert len(list(first.tiles())) == first.tile_count
+
+
+@pytest.mark.parametrize('spec', SPECS)
+def test_plan_starts_at_the_origin_without_overlaps(spec):
+    plan = layout.plan_layout(spec)
+    minX, minY, _, _ = panels.wall_bounds(plan.tiles())
+    assert minX == pytest.approx(0, abs=1e-6) and minY == pytest.approx(0, abs=1e-6)
+
+    centers = [(round(tile.placement.x, 6), round(tile.placement.y, 6)) for tile in plan.tiles()]
+    assert len(set(centers)) == len(centers)
+
+
+def test_keep_outs_clear_every_zone():
+    plan = layout.plan_layout(layout.WallSpec(50, 50, True, True, True, True))
+    zones = obstacles.parse_keep_outs('rect 10 4 7 11; circle 30 30 4')
+    result = obstacles.apply_keep_outs(plan, zones)
+
+    assert result.removed
+    assert len(list(result.tiles())) == plan.tile_count - len(result.removed) + len(result.added)
+    for tile in result.tiles():
+        outer, _ = shapes.tile_loops(tile)
+        assert not any(zone.overlaps(outer) for zone in zones)
+
+
+def test_keep_outs_are_deterministic():
+    plan = layout.plan_layout(layout.WallSpec(50, 50, True, True, True, True))
+    zones = obstacles.parse_keep_outs('rect 10 4 7 11; circle 30 30 4')
+    first = obstacles.apply_keep_outs(plan, zones)
+    assert first == obstacles.apply_keep_outs(plan, zones)
+    assert list(first.tiles()) == list(obstacles.apply_keep_outs(plan, zones).tiles())
+
+
+@pytest.mark.parametrize('text', ['rect 1 2 3', 'circle 1 1 0', 'square 1 1 1 1', 'rect 1 2 a 4'])
+def test_bad_keep_outs_are_rejected(text):
+    with pytest.raises(ValueError):
+        obstacles.parse_keep_outs(text)
+
+
+@pytest.mark.parametrize('bed', [(25.6, 25.6), (22, 18), (12, 40)])
+def test_panels_fit_the_bed(bed):
+    plan = layout.plan_layout(layout.WallSpec(100, 60, True, True, True, True))
+    parts = panels.split_panels(plan.tiles(), *bed)
+
+    assert len(parts) > 1
+    for panel in parts:
+        width, height = panel.size
+        assert width <= bed[0] + 1e-6 and height <= bed[1] + 1e-6
+        minX, minY, maxX, maxY = panels.wall_bounds(panel.placed_tiles())
+        assert minX >= -1e-6 and minY >= -1e-6
+        assert maxX <= bed[0] + 1e-6 and maxY <= bed[1] + 1e-6
+
+
+def test_panels_cover_the_wall():
+    plan = layout.plan_layout(layout.WallSpec(100, 60, True, True, True, True))
+    parts = panels.split_panels(plan.tiles(), 25.6, 25.6)
+
+    def quarters(tiles):
+        return sum(len(shapes.PIECE_QUARTERS[(tile.kind, tile.type)]) for tile in tiles)
+
+    assert quarters(tile for panel in parts for tile in panel.tiles()) == quarters(plan.tiles())
+
+
+def test_panels_need_a_bed():
+    plan = layout.plan_layout(layout.WallSpec(30, 20))
+    with pytest.raises(ValueError):
+        panels.split_panels(plan.tiles(), 0, 20)
+
+
+def test_outline_plan_is_deterministic():
+    hexgrid = pytest.importorskip('honeycombStorageWallUtils.hexgrid')
+    pytest.importorskip('numpy')
+    outline = hexgrid.parse_outline('polygon 0 0 40 0 40 15 20 15 20 30 0 30; -circle 10 10 3')
+    first = list(hexgrid.plan_outline(outline).tiles())
+    assert first == list(hexgrid.plan_outline(outline).tiles())
+
+    minX, minY, maxX, maxY = panels.wall_bounds(first)
+    assert minX >= -1e-6 and minY >= -1e-6
+    assert maxX <= 40 + 1e-6 and maxY <= 30 + 1e-6
+    assert any(tile.kind == 'border' for tile in first)
+
+
+def test_outline_keeps_clear_of_cutouts():
+    hexgrid = pytest.importorskip('honeycombStorageWallUtils.hexgrid')
+    pytest.importorskip('numpy')
+    whole = hexgrid.plan_outline(hexgrid.Outline.rectangle(40, 30))
+    holed = hexgrid.plan_outline(hexgrid.Outline.rectangle(40, 30).minus(hexgrid.Circle(20, 15, 5)))
+    assert holed.tile_count < whole.tile_count or holed.cell_count < whole.cell_count
+    for tile in holed.tiles():
+        outer, _ = shapes.tile_loops(tile)
+        assert not obstacles.KeepOutCircle(20, 15, 5 - 1e-3).contains(outer)
+
+
+def test_outline_needs_a_shape():
+    hexgrid = pytest.importorskip('honeycombStorageWallUtils.hexgrid')
+    assert hexgrid.parse_outline('') is None
+    with pytest.raises(ValueError):
+        hexgrid.parse_outline('-circle 1 1 1')
+    with pytest.raises(ValueError):
+        hexgrid.parse_outline('polygon 0 0 1 1')
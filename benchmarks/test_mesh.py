@@ -0,0 +1,86 @@
+"""Tests of the mesh writers and the build cost estimate."""
+
+import collections
+import struct
+import zipfile
+
+import pytest
+
+from honeycombStorageWallUtils import batching, cost, layout, mesh, obstacles
+
+
+def read_stl(path):
+    with open(path, 'rb') as file:
+        data = file.read()
+    count, = struct.unpack_from('<I', data, 80)
+    assert len(data) == 84 + 50 * count
+    triangles = []
+    for index in range(count):
+        values = struct.unpack_from('<12f', data, 84 + 50 * index)
+        triangles.append(tuple(tuple(round(value, 4) for value in values[start:start + 3]) for start in (3, 6, 9)))
+    return triangles
+
+
+@pytest.mark.parametrize('tile', mesh.tile_variants(), ids=mesh.variant_name)
+def test_every_tile_is_watertight(tmp_path, tile):
+    path = str(tmp_path / 'tile.stl')
+    count = mesh.write_stl(path, [tile])
+    triangles = read_stl(path)
+    assert len(triangles) == count > 0
+
+    # every edge of a closed, consistently wound shell is used once in each direction
+    edges = collections.Counter()
+    for a, b, c in triangles:
+        edges.update([(a, b), (b, c), (c, a)])
+    for (start, end), uses in edges.items():
+        assert uses == 1 and edges[(end, start)] == 1
+
+
+def test_wall_stl_has_every_tile(tmp_path):
+    spec = layout.WallSpec(30, 20, True, True, True, True)
+    plan = layout.plan_layout(spec)
+    path = str(tmp_path / 'wall.stl')
+    count = mesh.write_wall_stl(path, spec)
+
+    assert len(read_stl(path)) == count
+    templates = mesh.TileTemplates(mesh.MM_PER_CM)
+    assert count == sum(len(templates.records(tile)) // 13 for tile in plan.tiles())
+
+
+def test_wall_3mf_has_every_tile(tmp_path):
+    spec = layout.WallSpec(30, 20, True, True, True, True)
+    path = str(tmp_path / 'wall.3mf')
+    items = mesh.write_wall_3mf(path, spec)
+
+    assert items == layout.plan_layout(spec).tile_count
+    with zipfile.ZipFile(path) as archive:
+        model = archive.read('3D/3dmodel.model').decode('utf-8')
+    assert model.count('<item ') == items
+    assert model.count('<object ') == len(mesh.tile_variants())
+
+
+@pytest.mark.parametrize('mode', sorted(cost.DEFAULT_MODEL))
+def test_estimate_counts_the_plan(mode):
+    plan = layout.plan_layout(layout.WallSpec(50, 50, True, True, True, True))
+    estimate = cost.estimate(plan, mode, combine=True)
+
+    assert estimate.tiles == plan.tile_count
+    assert estimate.seconds > 0
+    assert estimate == cost.estimate(plan, mode, combine=True)
+
+
+def test_estimate_follows_keep_outs():
+    plan = layout.plan_layout(layout.WallSpec(50, 50, True, True, True, True))
+    keptOut = obstacles.apply_keep_outs(plan, obstacles.parse_keep_outs('rect 10 4 7 11'))
+    counted = collections.Counter((tile.kind, tile.type) for tile in keptOut.tiles())
+    assert cost.tile_counts(keptOut) == +counted
+
+
+@pytest.mark.parametrize('bodies', [0, 1, 2, 15, 16, 17, 33, 250, 1000])
+@pytest.mark.parametrize('batchSize', [2, 3, 16])
+def test_combine_steps_match_the_batched_reduce(bodies, batchSize):
+    combines = []
+    levels = []
+    batching.reduce_in_batches(list(range(bodies)), lambda batch: combines.append(batch) or batch[0], batchSize,
+                               lambda level, before, after, seconds: levels.append(level))
+    assert cost.combine_steps(bodies, batchSize) == (len(combines), len(levels))
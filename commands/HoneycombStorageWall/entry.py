@@ -5,7 +5,7 @@ import traceback
 
 import adsk.fusion
 
-from ...lib.honeycombStorageWallUtils import constants, utils
+from ...lib.honeycombStorageWallUtils import cache, constants, cost, direct, features, layout, obstacles, preview, profiling, progress, records, tiles, utils
 from ...lib import fusionAddInUtils as futil
 from ... import config
 
@@ -27,6 +27,18 @@ IS_PROMOTED = True
 WORKSPACE_ID = 'FusionSolidEnvironment'
 PANEL_ID = 'SolidCreatePanel'
 
+# Ways of building the wall, picked in the dialog.
+BUILD_MODE_FEATURES = 'Timeline Features'
+BUILD_MODE_DIRECT = 'Direct BRep'
+BUILD_MODE_INSTANCED = 'Instanced Components'
+
+# Build mode names of the cost estimate.
+COST_MODES = {
+    BUILD_MODE_FEATURES: cost.FEATURES,
+    BUILD_MODE_DIRECT: cost.DIRECT,
+    BUILD_MODE_INSTANCED: cost.INSTANCED,
+}
+
 # Path to Icons
 ICON_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'resources', '')
 
@@ -34,8 +46,40 @@ ICON_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'resource
 # they are not released and garbage collected.
 local_handlers = []
 
+# Custom graphics drawn by the last preview, removed before the next one is drawn.
+preview_graphics = None
+boundary_graphics = None
+preview_key = None
+
+# Tile outlines of recently previewed layouts, keyed by preview_cache_key.
+preview_cache = cache.LRUCache(config.PREVIEW_CACHE_SIZE)
+
+# Text of the keep-out input and its zones, validation reads them on every keystroke.
+keep_outs_cache = None
+
+# Inputs that change what the preview draws, typing into them is debounced.
+PREVIEW_INPUTS = ('width', 'height', 'bottom_border', 'top_border', 'left_border', 'right_border',
+                  'do_corners', 'combine_everything', 'keep_outs')
+PREVIEW_EVENT_ID = f'{config.COMPANY_NAME}_{config.ADDIN_NAME}_previewSettled'
+
+# The open dialog and the debouncer that asks it for a new preview once typing stops.
+active_command = None
+preview_debouncer = None
+
+# Plans walls on a worker thread and builds them on the main thread once planned, set up in start().
+BUILD_EVENT_ID = f'{config.COMPANY_NAME}_{config.ADDIN_NAME}_wallPlanned'
+background_build = None
+
 # Executed when add-in is run.
 def start():
+    # Tiles modelled by earlier sessions are imported from the tile cache folder.
+    tiles.session_tiles.use_disk(config.TILE_CACHE_DIR, config.TILE_CACHE_MAX_BYTES, config.ADDIN_VERSION)
+
+    # the custom event outlives the dialog, the wall is built after the command has ended
+    global background_build
+    if config.BACKGROUND_BUILD:
+        background_build = futil.BackgroundTask(BUILD_EVENT_ID, plan_build, build_planned)
+
     # Create a command Definition.
     cmd_def = ui.commandDefinitions.addButtonDefinition(CMD_ID, CMD_NAME, CMD_Description, ICON_FOLDER)
 
@@ -56,6 +100,11 @@ def start():
 
 # Executed when add-in is stopped.
 def stop():
+    global background_build
+    if background_build is not None:
+        background_build.stop()
+        background_build = None
+
     # Get the various UI elements for this command
     workspace = ui.workspaces.itemById(WORKSPACE_ID)
     panel = workspace.toolbarPanels.itemById(PANEL_ID)
@@ -79,17 +128,56 @@ def command_created(args: adsk.core.CommandCreatedEventArgs):
     # https://help.autodesk.com/view/fusion360/ENU/?contextId=CommandInputs
     inputs = args.command.commandInputs
 
+    global active_command, preview_debouncer
+    active_command = args.command
+    if config.PREVIEW_DEBOUNCE_SECONDS > 0:
+        preview_debouncer = futil.Debouncer(PREVIEW_EVENT_ID, config.PREVIEW_DEBOUNCE_SECONDS, refresh_preview,
+                                            local_handlers=local_handlers)
+
+    # start from the last wall built on the timeline, if there is one, so it can be edited
+    design = adsk.fusion.Design.cast(app.activeProduct)
+    existing = records.find_wall_record(design) if design is not None else None
+    spec = existing[1] if existing is not None else layout.WallSpec(10.0, 10.0)
+    combineEverything = existing[2] if existing is not None else True
+
     # Input Definitions
-    width_input = inputs.addDistanceValueCommandInput('width','Width', adsk.core.ValueInput.createByReal(10.0))
-    height_input = inputs.addDistanceValueCommandInput('height','Height', adsk.core.ValueInput.createByReal(10.0))
+    width_input = inputs.addDistanceValueCommandInput('width','Width', adsk.core.ValueInput.createByReal(spec.width))
+    height_input = inputs.addDistanceValueCommandInput('height','Height', adsk.core.ValueInput.createByReal(spec.height))
+
+    bottomBorderInput = inputs.addBoolValueInput('bottom_border', "Bottom Border", True, "", spec.bottom_border)
+    topBorderInput = inputs.addBoolValueInput('top_border', "Top Border", True, "", spec.top_border)
+    leftBorderInput = inputs.addBoolValueInput('left_border', "Left Border", True, "", spec.left_border)
+    rightBorderInput = inputs.addBoolValueInput('right_border', "Right Border", True, "", spec.right_border)
+
+    doCornersInput = inputs.addBoolValueInput('do_corners', "Include Corners", True, "", spec.do_corners)
+    combineEverythingInput = inputs.addBoolValueInput('combine_everything', "Combine Everything", True, "", combineEverything)
+
+    buildModeInput = inputs.addDropDownCommandInput('build_mode', "Build Mode", adsk.core.DropDownStyles.TextListDropDownStyle)
+    buildModeInput.listItems.add(BUILD_MODE_FEATURES, True)
+    buildModeInput.listItems.add(BUILD_MODE_DIRECT, False)
+    buildModeInput.listItems.add(BUILD_MODE_INSTANCED, False)
 
-    bottomBorderInput = inputs.addBoolValueInput('bottom_border', "Bottom Border", True)
-    topBorderInput = inputs.addBoolValueInput('top_border', "Top Border", True)
-    leftBorderInput = inputs.addBoolValueInput('left_border', "Left Border", True)
-    rightBorderInput = inputs.addBoolValueInput('right_border', "Right Border", True)
+    # timeline walls can be driven by user parameters so they can be resized from the parameters dialog
+    userParametersInput = inputs.addBoolValueInput('user_parameters', "Drive With User Parameters", True, "", False)
 
-    doCornersInput = inputs.addBoolValueInput('do_corners', "Include Corners", True, "", True)
-    combineEverythingInput = inputs.addBoolValueInput('combine_everything', "Combine Everything", True, "", True)
+    # draws every sketch before the first solid so sketches are not solved again between features
+    sketchFirstInput = inputs.addBoolValueInput('sketch_first', "Sketch First, Compute Once", True, "", True)
+
+    # without history only the finished bodies are kept, smaller and faster for walls nobody edits
+    captureHistoryInput = inputs.addBoolValueInput('capture_history', "Capture Design History", True, "", True)
+
+    # outlets, switches and studs: tiles over them are cut down to a half or quarter comb, or left out
+    keepOutsInput = inputs.addStringValueInput('keep_outs', "Keep-out Zones", '')
+    keepOutsInput.tooltip = "Areas to keep clear, in cm from the lower left corner of the wall"
+    keepOutsInput.tooltipDescription = ("rect x y width height; circle x y radius\n"
+                                        "or the path of a .json file with a list of such zones")
+
+    # only offered when the design already has a wall that was built on the timeline
+    updateExistingInput = inputs.addBoolValueInput('update_existing', "Update Existing Wall", True, "", True)
+    updateExistingInput.isVisible = existing is not None
+
+    # bodies, features and faces the build will make and how long it should take, filled in by validation
+    inputs.addTextBoxCommandInput('estimate', "Estimate", '', 3, True)
 
     
     origin = adsk.core.Point3D.create(0, 0, 0)
@@ -112,7 +200,27 @@ def command_execute(args: adsk.core.CommandEventArgs):
     futil.log(f'{CMD_NAME} Honeycomb Storage Wall Execute Event')
   
     inputs = args.command.commandInputs
-    create_hsw(inputs)
+
+    if background_build is not None:
+        if background_build.busy:
+            ui.messageBox('The last wall is still being built, try again once it is done.')
+            return
+        try:
+            request = read_build_request(inputs)
+        except (OSError, ValueError) as error:
+            ui.messageBox(f'Failed:\n{error}')
+            return
+        # the layout is planned on a worker thread and build_planned builds it once the plan arrives,
+        # after the dialog has closed, so the progress dialog's events can't reach the dialog any more
+        background_build.start(request)
+        return
+
+    design = adsk.fusion.Design.cast(app.activeProduct)
+    with profiling.session(CMD_NAME, lambda: features.feature_count(design)) as profiler:
+        built = create_hsw(inputs)
+    report_profile(profiler)
+    if built:
+        record_build_timing(read_build_request(inputs), profiler)
 
 # This event handler is called when the command needs to compute a new preview in the graphics window.
 def command_preview(args: adsk.core.CommandEventArgs):
@@ -120,7 +228,17 @@ def command_preview(args: adsk.core.CommandEventArgs):
     futil.log(f'{CMD_NAME} Honeycomb Storage Wall Preview Event')
     inputs = args.command.commandInputs
 
-    create_hsw(inputs)
+    if preview_debouncer is not None and preview_debouncer.pending:
+        # still typing, refresh_preview asks for the preview again once the inputs settle
+        futil.log(f'{CMD_NAME} Preview skipped, waiting for the inputs to settle')
+        return
+
+    # only outline the planned tiles here, the solids are built once the user clicks OK
+    draw_hsw_preview(inputs)
+
+def refresh_preview():
+    if active_command is not None and active_command.isValid:
+        active_command.doExecutePreview()
 
 # This event handler is called when the user changes anything in the command dialog
 # allowing you to modify values of other inputs based on that change.
@@ -131,6 +249,17 @@ def command_input_changed(args: adsk.core.InputChangedEventArgs):
     # General logging for debug.
     futil.log(f'{CMD_NAME} Input Changed Event fired from a change to {changed_input.id}')
 
+    if changed_input.id in PREVIEW_INPUTS and preview_debouncer is not None:
+        preview_debouncer.trigger()
+
+    if changed_input.id == 'build_mode':
+        # user parameters and the sketch order only matter for walls built on the timeline
+        buildModeInput: adsk.core.DropDownCommandInput = inputs.itemById('build_mode')
+        isFeatures = buildModeInput.selectedItem.name == BUILD_MODE_FEATURES
+        inputs.itemById('user_parameters').isVisible = isFeatures
+        inputs.itemById('sketch_first').isVisible = isFeatures
+        inputs.itemById('capture_history').isVisible = isFeatures
+
 # This event handler is called when the user interacts with any of the inputs in the dialog
 # which allows you to verify that all of the inputs are valid and enables the OK button.
 def command_validate_input(args: adsk.core.ValidateInputsEventArgs):
@@ -138,327 +267,361 @@ def command_validate_input(args: adsk.core.ValidateInputsEventArgs):
     futil.log(f'{CMD_NAME} Validate Input Event')
 
     inputs = args.inputs
+    estimateInput: adsk.core.TextBoxCommandInput = inputs.itemById('estimate')
+
+    try:
+        request = read_build_request(inputs)
+    except (OSError, ValueError) as error:
+        args.areInputsValid = False
+        estimateInput.text = f'Invalid input: {error}'
+        return
+
+    estimate = estimate_build(request)
+    text = estimate.describe()
+    if estimate.seconds > config.BUILD_BUDGET_SECONDS:
+        # caught here in milliseconds instead of locking up Fusion for the whole build
+        args.areInputsValid = False
+        text = f'Over the {cost.format_seconds(config.BUILD_BUDGET_SECONDS)} budget: {text}'
+        buildModes = {mode: name for name, mode in COST_MODES.items()}
+        faster = [other for other in estimate_cheaper_builds(request) if other.seconds <= config.BUILD_BUDGET_SECONDS]
+        if faster:
+            text += f'. {buildModes[faster[0].mode]} takes about {cost.format_seconds(faster[0].seconds)}'
+        else:
+            text += '. Make the wall smaller'
+    estimateInput.text = text
 
-    #TODO validate inputs
-        
 
 # This event handler is called when the command terminates.
 def command_destroy(args: adsk.core.CommandEventArgs):
     # General logging for debug.
     futil.log(f'{CMD_NAME} Command Destroy Event')
 
-    global local_handlers
+    clear_hsw_preview()
+
+    global local_handlers, active_command, preview_debouncer, keep_outs_cache
+    if preview_debouncer is not None:
+        preview_debouncer.stop()
+    preview_debouncer = None
+    active_command = None
+    # a keep-out file may change before the dialog is opened again
+    keep_outs_cache = None
     local_handlers = []
 
-def create_hsw(inputs: adsk.core.CommandInputs):
-    try:   
-        design = adsk.fusion.Design.cast(app.activeProduct) 
-        occurrence = design.rootComponent.occurrences.addNewComponent(adsk.core.Matrix3D.create())
-       
-        #TODO use root component for now
+def clear_hsw_preview():
+    global preview_graphics, boundary_graphics, preview_key
+    for group in (preview_graphics, boundary_graphics):
+        if group is not None and group.isValid:
+            group.deleteMe()
+    preview_graphics = None
+    boundary_graphics = None
+    preview_key = None
+
+def preview_cache_key(plan: layout.LayoutPlan, combineEverything: bool) -> tuple:
+    return plan.layout_key + (combineEverything,)
+
+def draw_hsw_preview(inputs: adsk.core.CommandInputs):
+    global preview_graphics, boundary_graphics, preview_key
+    try:
+        design = adsk.fusion.Design.cast(app.activeProduct)
         component = design.rootComponent
-        #component = occurrence.component
-        #component.name = "Honeycomb Storage Wall"
-
-        baseSketch = component.sketches.add(component.xYConstructionPlane)
-        baseSketch.name = "Honeycomb_Base"
-
-        width_input: adsk.core.ValueCommandInput = inputs.itemById('width')
-        width = width_input.value
-        height_input: adsk.core.ValueCommandInput = inputs.itemById('height')
-        height = height_input.value
-
-        bottomBorderInput: adsk.core.BoolValueCommandInput = inputs.itemById('bottom_border')
-        createBottomBorder = bottomBorderInput.value
-        topBorderInput: adsk.core.BoolValueCommandInput = inputs.itemById('top_border')
-        createTopBorder = topBorderInput.value
-        leftBorderInput: adsk.core.BoolValueCommandInput = inputs.itemById('left_border')
-        createLeftBorder = leftBorderInput.value
-        rightBorderInput: adsk.core.BoolValueCommandInput = inputs.itemById('right_border')
-        createRightBorder = rightBorderInput.value
-        doCornersInput: adsk.core.BoolValueCommandInput = inputs.itemById('do_corners')
-        doCorners = doCornersInput.value
-        combineEverythingInput: adsk.core.BoolValueCommandInput = inputs.itemById('combine_everything')
-        combineEverything = combineEverythingInput.value
-
-
-
-        xOffset = 0.0
-        yOffset = 0.0
-
-        sideBordersExist = createLeftBorder or createRightBorder
 
-        if sideBordersExist:
-            yOffset = constants.VERTICAL_SPACING / 2
-        if createLeftBorder:
-            xOffset = constants.HORIZONTAL_SPACING / 6
-
-        firstPatternVerticalQuantity = math.floor((height-yOffset) / constants.VERTICAL_SPACING)
-        firstPatternHorizontalQuantity = math.floor(((width-xOffset) + constants.HORIZONTAL_SPACING / 2) / constants.HORIZONTAL_SPACING)
-        secondPatternVerticalQuantity = math.floor(((height-yOffset) - constants.VERTICAL_SPACING / 2) / constants.VERTICAL_SPACING)
-        if sideBordersExist:
-            #we need an additional one if there's a left border because it goes down into the offset
-            secondPatternVerticalQuantity += 1
+        spec = read_wall_spec(inputs)
+        plan = layout.plan_layout(spec)
+        keepOuts = read_keep_outs(inputs)
+        if keepOuts:
+            plan = obstacles.apply_keep_outs(plan, keepOuts)
+        combineEverythingInput: adsk.core.BoolValueCommandInput = inputs.itemById('combine_everything')
+        key = preview_cache_key(plan, combineEverythingInput.value)
+
+        # the boundary follows the exact size so it is always redrawn, it is only four lines
+        if boundary_graphics is not None and boundary_graphics.isValid:
+            boundary_graphics.deleteMe()
+        boundary_graphics = preview.draw_boundary(component, spec.width, spec.height)
+
+        if key == preview_key and preview_graphics is not None and preview_graphics.isValid:
+            futil.log(f'{CMD_NAME} Preview unchanged, reusing the drawn outlines')
+            return
+
+        loops = preview_cache.get(key)
+        if loops is None:
+            loops = preview.wall_outline_loops(plan)
+            preview_cache.put(key, loops)
+        futil.log(f'{CMD_NAME} Preview cache {preview_cache.stats()}')
+
+        if preview_graphics is not None and preview_graphics.isValid:
+            preview_graphics.deleteMe()
+        preview_graphics = preview.draw_tile_outlines(component, loops)
+        preview_key = key
+    except:
+        futil.handle_error('draw_hsw_preview')
+
+def read_wall_spec(inputs: adsk.core.CommandInputs) -> layout.WallSpec:
+    width_input: adsk.core.ValueCommandInput = inputs.itemById('width')
+    height_input: adsk.core.ValueCommandInput = inputs.itemById('height')
+
+    bottomBorderInput: adsk.core.BoolValueCommandInput = inputs.itemById('bottom_border')
+    topBorderInput: adsk.core.BoolValueCommandInput = inputs.itemById('top_border')
+    leftBorderInput: adsk.core.BoolValueCommandInput = inputs.itemById('left_border')
+    rightBorderInput: adsk.core.BoolValueCommandInput = inputs.itemById('right_border')
+    doCornersInput: adsk.core.BoolValueCommandInput = inputs.itemById('do_corners')
+
+    return layout.WallSpec(
+        width=width_input.value,
+        height=height_input.value,
+        bottom_border=bottomBorderInput.value,
+        top_border=topBorderInput.value,
+        left_border=leftBorderInput.value,
+        right_border=rightBorderInput.value,
+        do_corners=doCornersInput.value,
+    )
+
+def _estimate_arguments(request: dict):
+    # keep-out zones only change a few tiles, the estimate leaves them out to stay quick on huge walls
+    return (layout.plan_layout(request['spec']), COST_MODES[request['build_mode']], request['combine'],
+            config.COMBINE_BATCH_SIZE, cost.load_model(config.COST_TIMINGS_PATH))
+
+def estimate_build(request: dict) -> cost.CostEstimate:
+    return cost.estimate(*_estimate_arguments(request))
+
+def estimate_cheaper_builds(request: dict):
+    return cost.cheaper_modes(*_estimate_arguments(request))
+
+def record_build_timing(request: dict, profiler: profiling.Profiler):
+    # every new wall makes the estimate of the next one a little better
+    if not config.COST_TIMINGS_PATH:
+        return
+    try:
+        cost.record_timing(config.COST_TIMINGS_PATH, estimate_build(request), profiler.report()['seconds'])
+    except OSError:
+        futil.log(f'{CMD_NAME} Could not record the build time to {config.COST_TIMINGS_PATH}', force_console=True)
+
+def read_keep_outs(inputs: adsk.core.CommandInputs):
+    global keep_outs_cache
+    keepOutsInput: adsk.core.StringValueCommandInput = inputs.itemById('keep_outs')
+    text = keepOutsInput.value
+    # only parsed again, or the file read again, once the text changes
+    if keep_outs_cache is None or keep_outs_cache[0] != text:
+        keep_outs_cache = (text, obstacles.parse_keep_outs(text))
+    return keep_outs_cache[1]
+
+def create_base_sketch(component: adsk.fusion.Component, spec: layout.WallSpec) -> adsk.fusion.Sketch:
+    baseSketch = component.sketches.add(component.xYConstructionPlane)
+    baseSketch.name = "Honeycomb_Base"
+
+    #define center and corner of overall construction boundaries
+    centerPoint = adsk.core.Point3D.create(0, 0, 0)
+    cornerPoint = adsk.core.Point3D.create(spec.width, spec.height, 0) # Defines corner relative to center
+
+    # Add the rectangle
+    rectangle = baseSketch.sketchCurves.sketchLines.addTwoPointRectangle(centerPoint, cornerPoint)
+    
+    for line in rectangle:
+        line.isConstruction = True
+
+    return baseSketch
+
+def update_hsw(design: adsk.fusion.Design, spec: layout.WallSpec, combineEverything: bool) -> bool:
+    """Applies the dialog to the last wall built on the timeline. Returns False if it has to be rebuilt."""
+    existing = records.find_wall_record(design)
+    if existing is None:
+        return False
+
+    topPlane, oldSpec, oldCombine, baseSketchToken, record = existing
+    component = topPlane.parent
+    plan = layout.plan_layout(spec)
+
+    # whatever the update adds goes into the wall's timeline group, not after the features that follow it
+    with features.adding_to_group(design, features.wall_group(design, record)):
+        record = features.update_feature_wall(design, component, topPlane, record, layout.plan_layout(oldSpec), plan,
+                                              combineEverything, config.COMBINE_BATCH_SIZE, futil.log)
+        if record is None:
+            return False
+
+        features.delete_entities(design, [baseSketchToken])
+        baseSketch = create_base_sketch(component, spec)
+    records.save_wall_record(topPlane, spec, combineEverything, baseSketch, record)
+    futil.log(f'{CMD_NAME} Updated the existing wall in place')
+    return True
+
+def delete_hsw(design: adsk.fusion.Design, existing):
+    """Deletes a wall found by records.find_wall_record, with its base sketch and top plane."""
+    topPlane, _, _, baseSketchToken, record = existing
+    features.delete_feature_wall(design, record)
+    features.delete_entities(design, [baseSketchToken])
+    if topPlane.isValid:
+        topPlane.deleteMe()
+
+def report_profile(profiler: profiling.Profiler):
+    for line in profiler.summary_lines():
+        futil.log(line, force_console=True)
+
+    if config.PROFILE_REPORT_PATH:
+        try:
+            profiler.write_json(config.PROFILE_REPORT_PATH)
+        except OSError:
+            futil.log(f'{CMD_NAME} Could not write the profile to {config.PROFILE_REPORT_PATH}', force_console=True)
+
+def read_build_request(inputs: adsk.core.CommandInputs) -> dict:
+    """Everything a build needs from the dialog, as plain values that outlive the dialog."""
+    combineEverythingInput: adsk.core.BoolValueCommandInput = inputs.itemById('combine_everything')
+    buildModeInput: adsk.core.DropDownCommandInput = inputs.itemById('build_mode')
+    userParametersInput: adsk.core.BoolValueCommandInput = inputs.itemById('user_parameters')
+    sketchFirstInput: adsk.core.BoolValueCommandInput = inputs.itemById('sketch_first')
+    captureHistoryInput: adsk.core.BoolValueCommandInput = inputs.itemById('capture_history')
+    updateExistingInput: adsk.core.BoolValueCommandInput = inputs.itemById('update_existing')
+
+    return {
+        'spec': read_wall_spec(inputs),
+        'zones': read_keep_outs(inputs),
+        'combine': combineEverythingInput.value,
+        'build_mode': buildModeInput.selectedItem.name,
+        'user_parameters': userParametersInput.value,
+        'sketch_first': sketchFirstInput.value,
+        'capture_history': captureHistoryInput.value,
+        'update_existing': updateExistingInput.isVisible and updateExistingInput.value,
+    }
+
+def plan_build(request: dict):
+    """The layout plan of a request and its keep-out layout, if any. Plain python, runs on a worker thread."""
+    plan = layout.plan_layout(request['spec'])
+
+    # a wall with keep-out zones is a list of tiles rather than plain patterns, it is always built new
+    keepOuts = None
+    if request['zones']:
+        with profiling.stage('keep-outs'):
+            keepOuts = obstacles.apply_keep_outs(plan, request['zones'])
+    return plan, keepOuts
+
+def build_planned(request: dict, planned, error: str):
+    """Builds a wall planned on the worker thread, behind a progress dialog that can cancel it."""
+    if error is not None:
+        ui.messageBox(f'Failed:\n{error}')
+        return
+
+    design = adsk.fusion.Design.cast(app.activeProduct)
+    with profiling.session(CMD_NAME, lambda: features.feature_count(design)) as profiler:
+        built = build_with_progress(request, planned)
+    report_profile(profiler)
+    if built:
+        record_build_timing(request, profiler)
+
+def build_with_progress(request: dict, planned) -> bool:
+    plan, keepOuts = planned
+    combine = request['combine'] and plan.spec.any_border
+    copies = 2 if request['build_mode'] == BUILD_MODE_INSTANCED and combine else 1
+    total = progress.total_work(sum(cost.tile_counts(keepOuts or plan).values()), combine, copies)
+
+    dialog = ui.createProgressDialog()
+    dialog.cancelButtonText = 'Cancel'
+    dialog.isCancelButtonShown = True
+    dialog.show(CMD_NAME, 'Building the wall, %p% done', 0, total, 0)
+
+    def report(done, total, message):
+        dialog.progressValue = done
+        if message:
+            dialog.message = f'{message}, %p% done'
+        # lets Fusion redraw and notice the cancel button between two chunks
+        adsk.doEvents()
+        return not dialog.wasCancelled
+
+    try:
+        with progress.session(total, report):
+            return build_hsw(request, planned)
+    finally:
+        dialog.hide()
+
+def create_hsw(inputs: adsk.core.CommandInputs) -> bool:
+    """Plans and builds a new wall from the dialog right away. Returns True when one was built, False when updated or failed."""
+    try:
+        request = read_build_request(inputs)
+        planned = plan_build(request)
+    except:
+        if ui:
+            ui.messageBox('Failed:\n{}'.format(traceback.format_exc()))
+        return False
+    return build_hsw(request, planned)
+
+def build_hsw(request: dict, planned) -> bool:
+    """Builds a planned wall. Returns True when one was built, False when updated, failed or cancelled.
+
+    A build cancelled through the active progress is rolled back, the design is left as it was.
+    """
+    design = adsk.fusion.Design.cast(app.activeProduct)
+    # what the design held before, to roll a cancelled build back and to list what the wall added
+    snapshot = features.design_snapshot(design)
+    try:
+        spec = request['spec']
+        plan, keepOuts = planned
+        if keepOuts is not None:
+            futil.log(f'{CMD_NAME} Keep-out zones removed {len(keepOuts.removed)} tiles and added {len(keepOuts.added)} pieces')
+
+        combineEverything = request['combine']
+        buildMode = request['build_mode']
+
+        replaced = None
+        if request['update_existing']:
+            if buildMode == BUILD_MODE_FEATURES and not keepOuts:
+                # an update edits features that were there before, it can't be rolled back halfway
+                with profiling.stage('update'), progress.suspended():
+                    updated = update_hsw(design, spec, combineEverything)
+                if updated:
+                    # an update in place is not a new build, its time would skew the cost estimate
+                    return False
+            # the old wall can't be turned into this one, it is deleted once the new one is built,
+            # so a cancelled build leaves it as it was
+            replaced = records.find_wall_record(design)
+
+        # everything from here on ends up in a single timeline group
+        timelineStart = features.timeline_count(design)
 
-        secondPatternHorizontalQuantity = math.floor((width-xOffset) / constants.HORIZONTAL_SPACING)
+        component = design.rootComponent
 
-        #define center and corner of overall construction boundaries
-        centerPoint = adsk.core.Point3D.create(0, 0, 0)
-        cornerPoint = adsk.core.Point3D.create(width, height, 0) # Defines corner relative to center
+        baseSketch = create_base_sketch(component, spec)
 
         topPlaneInput = component.constructionPlanes.createInput()
         topPlaneInput.setByOffset(component.xYConstructionPlane, constants.TOTAL_THICKNESS)
         topPlane = component.constructionPlanes.add(topPlaneInput)
         topPlane.name = "Honeycomb_TopPlane"
 
-        # Add the rectangle
-        rectangle = baseSketch.sketchCurves.sketchLines.addTwoPointRectangle(centerPoint, cornerPoint)
-        
-        for line in rectangle:
-            line.isConstruction = True
-
-        honeycombCenterPoint = adsk.core.Point3D.create(xOffset + constants.SIDE_LENGTH, yOffset + constants.OUTER_RADIUS, 0)
-        honeycombStarterInnerHexagon = baseSketch.sketchCurves.sketchLines.addScribedPolygon(honeycombCenterPoint, 6, math.pi/2, constants.INNER_RADIUS, False)
-        honeycombStarterOuterHexagon = baseSketch.sketchCurves.sketchLines.addScribedPolygon(honeycombCenterPoint, 6, math.pi/2, constants.OUTER_RADIUS, False)
-
-        honeycombBodyExtrudeFeature = component.features.extrudeFeatures.addSimple(
-            baseSketch.profiles.item(1),
-            constants.TOTAL_THICKNESS,
-            adsk.fusion.FeatureOperations.NewBodyFeatureOperation
-        )
-        honeycombBody = honeycombBodyExtrudeFeature.bodies.item(0)
-        honeycombBody.name = "Honeycomb"
-
-        # create sketch plane on top of newly extruded honeycomb
-        facePlaneSketch = component.sketches.add(topPlane)
-        facePlaneSketch.name = "Honeycomb_Top"
-
-        # create one mm offset hexagon from the inner hexagon
-        honeycombStarterInnerHexagon = facePlaneSketch.sketchCurves.sketchLines.addScribedPolygon(
-            honeycombCenterPoint, 6, math.pi / 2, constants.INNER_RADIUS + constants.INNER_OFFSET, False)
-        honeycombCutFeature = component.features.extrudeFeatures.addSimple(facePlaneSketch.profiles.item(0),
-                                                                           adsk.core.ValueInput.createByReal(
-                                                                               constants.LIP_DEPTH),
-                                                                           adsk.fusion.FeatureOperations.CutFeatureOperation)
-
-        # chamfer new inner edge
-        chamferEdgeCollection = adsk.core.ObjectCollection.create()
-        chamferEdgeCollection.add(honeycombBody.edges.item(18))
-        chamferEdgeCollection.add(honeycombBody.edges.item(19))
-        chamferEdgeCollection.add(honeycombBody.edges.item(20))
-        chamferEdgeCollection.add(honeycombBody.edges.item(21))
-        chamferEdgeCollection.add(honeycombBody.edges.item(22))
-        chamferEdgeCollection.add(honeycombBody.edges.item(23))
-
-        innerChamferInput = component.features.chamferFeatures.createInput2()
-        innerChamferInput.chamferEdgeSets.addTwoDistancesChamferEdgeSet(chamferEdgeCollection,
-                                                                        constants.INNER_CHAMFER_DISTANCES[0],
-                                                                        constants.INNER_CHAMFER_DISTANCES[1], False,
-                                                                        True)
-        innerChamfer = component.features.chamferFeatures.add(innerChamferInput)
-
-        # chamber the bottom inner edge
-        bottomChamferEdgeCollection = adsk.core.ObjectCollection.create()
-        bottomChamferEdgeCollection.add(honeycombBody.faces.item(25).edges.item(0))
-        bottomChamferEdgeCollection.add(honeycombBody.faces.item(25).edges.item(1))
-        bottomChamferEdgeCollection.add(honeycombBody.faces.item(25).edges.item(2))
-        bottomChamferEdgeCollection.add(honeycombBody.faces.item(25).edges.item(3))
-        bottomChamferEdgeCollection.add(honeycombBody.faces.item(25).edges.item(4))
-        bottomChamferEdgeCollection.add(honeycombBody.faces.item(25).edges.item(5))
-
-        bottomChamferInput = component.features.chamferFeatures.createInput2()
-        bottomChamferInput.chamferEdgeSets.addTwoDistancesChamferEdgeSet(bottomChamferEdgeCollection,
-                                                                         constants.BOTTOM_CHAMFER_DISTANCES[0],
-                                                                         constants.BOTTOM_CHAMFER_DISTANCES[1],
-                                                                         False, True)
-        bottomChamfer = component.features.chamferFeatures.add(bottomChamferInput)
-
-        # mirror honeycomb body so we have a second one to the upper right of it
-        mirrorPlane = honeycombBody.faces.item(25)
-        if sideBordersExist:
-            mirrorPlane = honeycombBody.faces.item(26)
-
-        entitiesToMirror = adsk.core.ObjectCollection.create()
-        entitiesToMirror.add(honeycombBody)
-
-        mirrorInput = component.features.mirrorFeatures.createInput(entitiesToMirror, mirrorPlane)
-        mirrorInput.isCombine = False
-        mirrorFeature = component.features.mirrorFeatures.add(mirrorInput)
-
-        # duplicate the first honeycomb with a rectangular pattern
-        firstHoneycombCollection = adsk.core.ObjectCollection.create()
-        firstHoneycombCollection.add(honeycombBody)
-
-        firstPatternInput = component.features.rectangularPatternFeatures.createInput(firstHoneycombCollection,
-                                                                                      design.rootComponent.yConstructionAxis,
-                                                                                      adsk.core.ValueInput.createByReal(firstPatternVerticalQuantity),
-                                                                                      adsk.core.ValueInput.createByReal(constants.VERTICAL_SPACING),
-                                                                                      adsk.fusion.PatternDistanceType.SpacingPatternDistanceType)
-        firstPatternInput.setDirectionTwo(design.rootComponent.xConstructionAxis, adsk.core.ValueInput.createByReal(firstPatternHorizontalQuantity),
-                                          adsk.core.ValueInput.createByReal(constants.HORIZONTAL_SPACING))
-        firstPattern = component.features.rectangularPatternFeatures.add(firstPatternInput)
-
-        # duplicate the second honeycomb with a rectangular pattern
-        secondHoneycombCollection = adsk.core.ObjectCollection.create()
-        secondHoneycombCollection.add(mirrorFeature.bodies.item(0))
-
-        secondPatternInput = component.features.rectangularPatternFeatures.createInput(
-            secondHoneycombCollection,
-            design.rootComponent.yConstructionAxis,
-            adsk.core.ValueInput.createByReal(secondPatternVerticalQuantity),
-            adsk.core.ValueInput.createByReal(constants.VERTICAL_SPACING),
-            adsk.fusion.PatternDistanceType.SpacingPatternDistanceType
-        )
-        secondPatternInput.setDirectionTwo(design.rootComponent.xConstructionAxis, adsk.core.ValueInput.createByReal(secondPatternHorizontalQuantity),
-                                           adsk.core.ValueInput.createByReal(constants.HORIZONTAL_SPACING))
-        secondPattern = component.features.rectangularPatternFeatures.add(secondPatternInput)
-
-        if createBottomBorder:
-            xPos = xOffset + constants.SIDE_LENGTH * 2.5
-            yPos = yOffset
-            if sideBordersExist:
-                xPos -= constants.HORIZONTAL_SPACING/2
-                yPos -= yOffset
-
-            centerPoint = adsk.core.Point3D.create(xPos, yPos, 0)
-            borderBottomBody = utils.create_half_comb(constants.BorderType.BOTTOM, topPlane, component, centerPoint)
-
-            if borderBottomBody is not None:
-                num_duplicates = secondPatternHorizontalQuantity
-                if sideBordersExist:
-                    num_duplicates = firstPatternHorizontalQuantity
-
-                bottomBorderPatternFeature = utils.duplicate_border_body(component, component.xConstructionAxis,
-                                                                         borderBottomBody, num_duplicates,
-                                                                         adsk.core.ValueInput.createByReal(constants.HORIZONTAL_SPACING))
-
-        if createTopBorder:
-            firstEven = firstPatternVerticalQuantity % 2 == 0
-            secondEven = secondPatternVerticalQuantity % 2 == 0
-
-            doHorizontalShift = True
-
-            if (not firstEven) ^ (not secondEven):
-                doHorizontalShift = False
-
-            topBorderXOffset = 0
-            topBorderYOffset = 0
-
-            if sideBordersExist:
-                doHorizontalShift = not doHorizontalShift
-
-            if doHorizontalShift:
-                topBorderXOffset =  (-1 * constants.HORIZONTAL_SPACING / 2)
-                topBorderYOffset = (-1 * constants.VERTICAL_SPACING / 2)
-
-            if sideBordersExist:
-                topBorderYOffset -= constants.VERTICAL_SPACING
-
-            centerPoint = adsk.core.Point3D.create(
-                xOffset + constants.SIDE_LENGTH * 2.5 + topBorderXOffset,
-                yOffset + constants.VERTICAL_SPACING*(secondPatternVerticalQuantity+1) + topBorderYOffset
-            )
-            borderTopBody = utils.create_half_comb(constants.BorderType.TOP, topPlane, component, centerPoint)
-
-            if borderTopBody is not None:
-                num_duplicates = secondPatternHorizontalQuantity
-                if doHorizontalShift:
-                    num_duplicates = firstPatternHorizontalQuantity
-
-                topBorderPatternFeature = utils.duplicate_border_body(component, component.xConstructionAxis,
-                                                                      borderTopBody, num_duplicates,
-                                                                      adsk.core.ValueInput.createByReal(constants.HORIZONTAL_SPACING))
-
-        if createLeftBorder:
-            centerPoint = adsk.core.Point3D.create(
-                xOffset + constants.SIDE_LENGTH * 2.5 - constants.HORIZONTAL_SPACING,
-                yOffset
-            )
-            borderLeftBody = utils.create_half_comb(constants.BorderType.LEFT, topPlane, component, centerPoint)
-
-            if borderLeftBody is not None:
-                leftBorderPatternFeature = utils.duplicate_border_body(component, component.yConstructionAxis,
-                                                                       borderLeftBody, secondPatternVerticalQuantity,
-                                                                       adsk.core.ValueInput.createByReal(constants.VERTICAL_SPACING))
-
-            if doCorners and firstPatternVerticalQuantity == secondPatternVerticalQuantity:
-                cornerStartingCenterPoint = adsk.core.Point3D.create(
-                    centerPoint.x,
-                    centerPoint.y + constants.VERTICAL_SPACING * firstPatternVerticalQuantity
-                )
-                utils.create_quarter_comb(
-                    constants.CornerType.TopLeft,
-                    topPlane,
-                    component,
-                    cornerStartingCenterPoint
-                )
-
-
-        if createRightBorder:
-            if firstPatternHorizontalQuantity == secondPatternHorizontalQuantity:
-                doVerticalShift = True
+        if buildMode == BUILD_MODE_DIRECT:
+            direct.build_direct_wall(component, topPlane, keepOuts or plan, combineEverything and spec.any_border,
+                                     config.COMBINE_BATCH_SIZE, futil.log)
+        elif buildMode == BUILD_MODE_INSTANCED:
+            # the instances share one wall component, the other modes build into the root component
+            occurrence = design.rootComponent.occurrences.addNewComponent(adsk.core.Matrix3D.create())
+            occurrence.component.name = "Honeycomb Storage Wall"
+            direct.build_instanced_wall(occurrence.component, topPlane, keepOuts or plan, combineEverything and spec.any_border,
+                                        config.COMBINE_BATCH_SIZE)
+        else:
+            if request['capture_history']:
+                record = features.build_feature_wall(design, component, topPlane, plan, combineEverything,
+                                                     config.COMBINE_BATCH_SIZE, futil.log, request['user_parameters'],
+                                                     request['sketch_first'], keepOuts)
+                # the record only knows the patterns, updating it in place would bring back the removed tiles
+                if keepOuts is None:
+                    record['entities'] = features.added_tokens(design, snapshot)
+                    records.save_wall_record(topPlane, spec, combineEverything, baseSketch, record)
             else:
-                doVerticalShift = False
-
-            borderXOffset = -1 * constants.HORIZONTAL_SPACING * 1 / 6
-            borderYOffset = 0
-
-            if doVerticalShift:
-                borderXOffset = -1 * constants.HORIZONTAL_SPACING * 2 / 3
-                borderYOffset = constants.VERTICAL_SPACING / 2
-
-            centerPoint = adsk.core.Point3D.create(
-                xOffset + constants.HORIZONTAL_SPACING*(secondPatternHorizontalQuantity+1) + borderXOffset,
-                yOffset + borderYOffset
-            )
-            borderRightBody = utils.create_half_comb(constants.BorderType.RIGHT, topPlane, component, centerPoint)
-            if borderRightBody is not None:
-                num_duplicates = secondPatternVerticalQuantity
-                if doVerticalShift:
-                    num_duplicates = firstPatternVerticalQuantity
-
-                rightBorderPatternFeature = utils.duplicate_border_body(component, component.yConstructionAxis,
-                                                                        borderRightBody, num_duplicates,
-                                                                        adsk.core.ValueInput.createByReal(
-                                                                            constants.VERTICAL_SPACING))
-            if doCorners and firstPatternHorizontalQuantity == secondPatternHorizontalQuantity:
-                cornerStartingCenterPoint = adsk.core.Point3D.create(
-                    centerPoint.x,
-                    centerPoint.y - constants.VERTICAL_SPACING
-                )
-                utils.create_quarter_comb(
-                    constants.CornerType.BottomRight,
-                    topPlane,
-                    component,
-                    cornerStartingCenterPoint
-                )
-
-                if firstPatternVerticalQuantity != secondPatternVerticalQuantity:
-                    upperCornerStartingCenterPoint = adsk.core.Point3D.create(
-                        centerPoint.x,
-                        centerPoint.y + constants.VERTICAL_SPACING*firstPatternVerticalQuantity
-                    )
-                    utils.create_quarter_comb(
-                        constants.CornerType.TopRight,
-                        topPlane,
-                        component,
-                        upperCornerStartingCenterPoint
-                    )
-
-        if combineEverything and (createRightBorder or createLeftBorder or createTopBorder or createBottomBorder):
-            #combine all the bodies
-            allbodiesExceptFirst = adsk.core.ObjectCollection.create()
-            count=0
-            for body in component.bRepBodies:
-                if count != 0:
-                    allbodiesExceptFirst.add(body)
-                count+=1
-
-            combineInput = component.features.combineFeatures.createInput(component.bRepBodies.item(0), allbodiesExceptFirst)
-            combineInput.isKeepToolBodies = False
-            combineFeature = component.features.combineFeatures.add(combineInput)
-
+                # there are no features to drive with parameters or to update later, so no record is kept
+                with tiles.without_history(component):
+                    features.build_feature_wall(design, component, topPlane, plan, combineEverything,
+                                                config.COMBINE_BATCH_SIZE, futil.log, False, request['sketch_first'],
+                                                keepOuts)
+
+        features.group_timeline(design, timelineStart, "Honeycomb Storage Wall")
+
+        if replaced is not None:
+            with profiling.stage('update'), progress.suspended():
+                delete_hsw(design, replaced)
+            futil.log(f'{CMD_NAME} The existing wall could not be updated in place, it was replaced by a new one',
+                      force_console=True)
+        return True
+
+    except progress.Cancelled:
+        features.roll_back(design, snapshot)
+        futil.log(f'{CMD_NAME} Cancelled, the partly built wall was removed again', force_console=True)
+        return False
     except:
         if ui:
             ui.messageBox('Failed:\n{}'.format(traceback.format_exc()))
-
+        return False
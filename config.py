@@ -2,6 +2,7 @@
 # This module serves as a way to share variables across different
 # modules (global variables).
 
+import json
 import os
 
 # Flag that indicates to run in Debug mode or not. When running in Debug mode
@@ -17,5 +18,52 @@ DEBUG = True
 ADDIN_NAME = os.path.basename(os.path.dirname(__file__))
 COMPANY_NAME = 'ACME'
 
+# Version from the manifest, finished tiles cached by another version are not reused.
+try:
+    with open(os.path.join(os.path.dirname(__file__), f'{ADDIN_NAME}.manifest')) as _manifest:
+        ADDIN_VERSION = json.load(_manifest).get('version', '')
+except (OSError, ValueError):
+    ADDIN_VERSION = ''
+
 # Palettes
-sample_palette_id = f'{COMPANY_NAME}_{ADDIN_NAME}_palette_id'
\ No newline at end of file
+sample_palette_id = f'{COMPANY_NAME}_{ADDIN_NAME}_palette_id'
+
+# Number of distinct wall layouts whose preview outlines are kept in memory.
+PREVIEW_CACHE_SIZE = 8
+
+# Seconds the dialog inputs have to stay unchanged before the preview is redrawn, so typing
+# "250" into the width draws one preview instead of three. 0 turns this off.
+PREVIEW_DEBOUNCE_SECONDS = 0.3
+
+# Plan walls on a worker thread and build them once planned, after the dialog has closed, behind a
+# progress dialog that can cancel the build and roll it back. The wall is one timeline group, but not
+# part of the command's undo step. False plans and builds right away when OK is clicked, inside the
+# command, with Fusion busy until the wall is done.
+BACKGROUND_BUILD = True
+
+# Number of neighbouring bodies joined by each combine when combining everything.
+# Smaller batches keep every boolean small, larger ones create fewer features.
+COMBINE_BATCH_SIZE = 16
+
+# Per stage timings of every run are written to the Text Command window.
+# Set a file path here to also save them as a JSON report, e.g. to compare add-in versions.
+PROFILE_REPORT_PATH = ''
+
+# Finished tiles are exported here so a new Fusion session imports them instead of modelling
+# them again. They are keyed by the tile dimensions in constants.py and the add-in version.
+# Set it to '' to only cache tiles in memory.
+TILE_CACHE_DIR = os.path.join(os.path.dirname(__file__), 'tile_cache')
+
+# The least recently used tiles are deleted once the cache folder grows past this many bytes.
+TILE_CACHE_MAX_BYTES = 20 * 1024 * 1024
+
+# Walls estimated to take longer than this many seconds to build can't be started from the dialog,
+# it suggests a quicker build mode instead.
+BUILD_BUDGET_SECONDS = 300
+
+# Every new wall appends its estimated counts and its real build time here, and the estimate in the
+# dialog is refitted from them. Set it to '' to keep the built-in estimate.
+COST_TIMINGS_PATH = os.path.join(os.path.dirname(__file__), 'build_timings.jsonl')
+
+# Print bed size in cm (width, height) used when a wall is split into panels for printing.
+PRINT_BED_SIZE = (25.6, 25.6)
@@ -0,0 +1,285 @@
+"""Generates many walls from a job file without Fusion.
+
+Every job is planned with the headless layout planner and written as a mesh
+(binary STL or instanced 3MF, in mm) to the output folder, one file per job.
+Jobs run on a pool of processes, one per core by default, and a summary with
+the timing of every job is written next to them as summary.json.
+
+With --panels every wall is split into print bed sized panels along hex seams
+and each panel is written on its own, moved to the origin, as
+<name>_r<row>_c<column>. The bed defaults to PRINT_BED_SIZE in config.py.
+
+    python hsw_batch.py jobs.json --out walls
+    python hsw_batch.py jobs.csv --out walls --format 3mf --workers 4
+    python hsw_batch.py jobs.json --out panels --panels --bed 22 22
+
+A JSON job file is a list of jobs (or {"jobs": [...]}), a CSV file has one job
+per row with the keys as column headers. Sizes are in cm, like in the dialog:
+
+    name          file name of the output, defaults to the job number
+    width, height wall size
+    borders       "bottom,top,left,right" or any of them, or the separate
+                  bottom_border / top_border / left_border / right_border flags
+    do_corners    defaults to true
+    combine       defaults to true, only recorded: a mesh keeps every tile as
+                  its own shell, slicers print touching shells as one part
+    keep_outs     zones as typed in the dialog, "rect x y w h; circle x y r"
+    outline       any other wall shape instead of width and height,
+                  "polygon x1 y1 x2 y2 ...; rect x y w h; circle x y r" with a
+                  "-" in front of the shapes that are cut out. The borders are
+                  the half and quarter combs that fit, the border keys are not
+                  used. Needs numpy, see hexgrid.py
+    format        stl or 3mf, defaults to --format
+"""
+
+import argparse
+import concurrent.futures
+import csv
+import json
+import os
+import re
+import sys
+import time
+
+ADDIN_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(ADDIN_DIR, 'lib'))
+
+from honeycombStorageWallUtils import hexgrid, layout, mesh, obstacles, panels
+
+import config
+
+FORMATS = ('stl', '3mf')
+BORDERS = ('bottom', 'top', 'left', 'right')
+
+_TRUE = {'1', 'true', 'yes', 'y', 'on', 'x'}
+_FALSE = {'0', 'false', 'no', 'n', 'off', ''}
+
+
+def _flag(value, default: bool) -> bool:
+    if value is None:
+        return default
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in _TRUE:
+        return True
+    if text in _FALSE:
+        return False
+    raise ValueError(f'"{value}" is not a yes or no value')
+
+
+def read_jobs(path: str):
+    """Job dictionaries from a .json or .csv file, in file order."""
+    if path.lower().endswith('.csv'):
+        with open(path, newline='') as file:
+            return [{key.strip(): value for key, value in row.items() if key} for row in csv.DictReader(file)]
+
+    with open(path) as file:
+        data = json.load(file)
+    if isinstance(data, dict):
+        data = data.get('jobs', [])
+    return list(data)
+
+
+def _parse_spec(job: dict) -> layout.WallSpec:
+    try:
+        width = float(job['width'])
+        height = float(job['height'])
+    except (KeyError, TypeError, ValueError):
+        raise ValueError('needs a numeric width and height')
+    if width <= 0 or height <= 0:
+        raise ValueError('width and height must be positive')
+
+    borders = {border.strip().lower() for border in str(job.get('borders') or '').split(',') if border.strip()}
+    unknown = borders - set(BORDERS)
+    if unknown:
+        raise ValueError(f'unknown borders {", ".join(sorted(unknown))}')
+
+    return layout.WallSpec(
+        width=width,
+        height=height,
+        bottom_border=_flag(job.get('bottom_border'), 'bottom' in borders),
+        top_border=_flag(job.get('top_border'), 'top' in borders),
+        left_border=_flag(job.get('left_border'), 'left' in borders),
+        right_border=_flag(job.get('right_border'), 'right' in borders),
+        do_corners=_flag(job.get('do_corners'), True),
+    )
+
+
+def parse_job(job: dict, index: int, defaultFormat: str) -> dict:
+    """Checks one job and fills in its defaults. Raises ValueError describing the first problem."""
+    # a wall with an outline has no rectangle to plan, so no spec either
+    outline = hexgrid.parse_outline(str(job.get('outline') or ''))
+
+    format = str(job.get('format') or defaultFormat).lower().lstrip('.')
+    if format not in FORMATS:
+        raise ValueError(f'format must be one of {", ".join(FORMATS)}')
+
+    name = str(job.get('name') or f'wall_{index + 1:04d}')
+    return {
+        'name': re.sub(r'[^\w.-]+', '_', name).strip('_') or f'wall_{index + 1:04d}',
+        'spec': _parse_spec(job) if outline is None else None,
+        'outline': outline,
+        'combine': _flag(job.get('combine'), True),
+        'keep_outs': obstacles.parse_keep_outs(str(job.get('keep_outs') or '')),
+        'format': format,
+    }
+
+
+def plan_job(job: dict):
+    if job['outline'] is not None:
+        plan = hexgrid.plan_outline(job['outline'])
+    else:
+        plan = layout.plan_layout(job['spec'])
+    if job['keep_outs']:
+        plan = obstacles.apply_keep_outs(plan, job['keep_outs'])
+    return plan
+
+
+def _counted(tiles, result: dict):
+    result['tiles'] = 0
+    for tile in tiles:
+        result['tiles'] += 1
+        yield tile
+
+
+def _write(result: dict, path: str, format: str, tiles):
+    if format == '3mf':
+        result['tiles'] = mesh.write_3mf(path, tiles)
+    else:
+        result['triangles'] = mesh.write_stl(path, _counted(tiles, result))
+    result['bytes'] = os.path.getsize(path)
+
+
+def run_job(job: dict, outDir: str) -> dict:
+    """Plans and writes one wall. Runs in a worker process, errors are reported, not raised."""
+    start = time.perf_counter()
+    path = os.path.join(outDir, f'{job["name"]}.{job["format"]}')
+    result = {'name': job['name'], 'file': path, 'combine': job['combine']}
+    try:
+        plan = plan_job(job)
+        planned = time.perf_counter()
+        _write(result, path, job['format'], plan.tiles())
+        result['plan_seconds'] = planned - start
+        result['write_seconds'] = time.perf_counter() - planned
+    except Exception as error:
+        result['error'] = f'{type(error).__name__}: {error}'
+    result['seconds'] = time.perf_counter() - start
+    return result
+
+
+def run_panel(job: dict, panel: panels.Panel, outDir: str) -> dict:
+    """Writes one panel of a wall, moved to the origin. Runs in a worker process like run_job."""
+    start = time.perf_counter()
+    name = f'{job["name"]}_{panel.name}'
+    path = os.path.join(outDir, f'{name}.{job["format"]}')
+    result = {'name': name, 'job': job['name'], 'panel': panel.name, 'file': path,
+              'size': list(panel.size), 'combine': job['combine']}
+    try:
+        _write(result, path, job['format'], panel.placed_tiles())
+        result['write_seconds'] = time.perf_counter() - start
+    except Exception as error:
+        result['error'] = f'{type(error).__name__}: {error}'
+    result['seconds'] = time.perf_counter() - start
+    return result
+
+
+def split_job(job: dict, bed) -> tuple:
+    """The panels of one wall and None, or no panels and a failed result when it cannot be split."""
+    start = time.perf_counter()
+    try:
+        return panels.split_panels(plan_job(job).tiles(), *bed), None
+    except Exception as error:
+        return [], {'name': job['name'], 'job': job['name'], 'error': f'{type(error).__name__}: {error}',
+                    'seconds': time.perf_counter() - start}
+
+
+def _unique_names(jobs):
+    """Gives every job after the first with a name a free _2, _3, ... suffix.
+
+    Names are compared without case, as files are on Windows and macOS, and a
+    suffixed name never takes one that another job in the file asked for.
+    """
+    taken = {job['name'].casefold() for job in jobs}
+    used = set()
+    for job in jobs:
+        name, count = job['name'], 1
+        while name.casefold() in used or (count > 1 and name.casefold() in taken):
+            count += 1
+            name = f'{job["name"]}_{count}'
+        used.add(name.casefold())
+        job['name'] = name
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('jobs', help='.json or .csv job file')
+    parser.add_argument('--out', default='walls', help='folder for the generated files and summary.json')
+    parser.add_argument('--format', choices=FORMATS, default='stl', help='format of jobs that do not name one')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='processes to run jobs on')
+    parser.add_argument('--panels', action='store_true', help='split every wall into print bed sized panels')
+    parser.add_argument('--bed', type=float, nargs=2, metavar=('WIDTH', 'HEIGHT'), default=config.PRINT_BED_SIZE,
+                        help='print bed size in cm for --panels')
+    args = parser.parse_args(argv)
+
+    jobs = []
+    problems = []
+    for index, job in enumerate(read_jobs(args.jobs)):
+        try:
+            jobs.append(parse_job(job, index, args.format))
+        except (OSError, ValueError) as error:
+            problems.append(f'job {index + 1}: {error}')
+    if problems:
+        for problem in problems:
+            print(problem, file=sys.stderr)
+        return 2
+
+    _unique_names(jobs)
+    os.makedirs(args.out, exist_ok=True)
+
+    start = time.perf_counter()
+    results = []
+    tasks = []
+    if args.panels:
+        for job in jobs:
+            jobPanels, failure = split_job(job, args.bed)
+            if failure:
+                results.append(failure)
+                print(f'{failure["name"]:<32} {failure["seconds"]:>8.2f}s  {failure["error"]}')
+            tasks.extend((run_panel, job, panel, args.out) for panel in jobPanels)
+    else:
+        tasks = [(run_job, job, args.out) for job in jobs]
+
+    workers = max(1, min(args.workers, len(tasks)))
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(*task) for task in tasks]
+        for future in concurrent.futures.as_completed(futures):
+            result = future.result()
+            results.append(result)
+            status = result.get('error') or f'{result["tiles"]} tiles'
+            print(f'{result["name"]:<32} {result["seconds"]:>8.2f}s  {status}')
+
+    order = {job['name']: index for index, job in enumerate(jobs)}
+    results.sort(key=lambda result: (order[result.get('job', result['name'])], result.get('panel', '')))
+    failed = [result for result in results if 'error' in result]
+    summary = {
+        'job_file': os.path.abspath(args.jobs),
+        'workers': workers,
+        'jobs': len(jobs),
+        'failed': len(failed),
+        'seconds': time.perf_counter() - start,
+        'job_seconds': sum(result['seconds'] for result in results),
+        'bed': list(args.bed) if args.panels else None,
+        'results': results,
+    }
+    with open(os.path.join(args.out, 'summary.json'), 'w') as file:
+        json.dump(summary, file, indent=2)
+        file.write('\n')
+
+    print(f'{len(results) - len(failed)} of {len(results)} {"panels" if args.panels else "walls"} written to {args.out} '
+          f'in {summary["seconds"]:.1f}s on {workers} processes')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
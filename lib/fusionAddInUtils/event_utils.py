@@ -10,6 +10,8 @@
 #  UNINTERRUPTED OR ERROR FREE.
 
 import sys
+import threading
+import traceback
 from typing import Callable
 
 import adsk.core
@@ -19,6 +21,9 @@ from .general_utils import handle_error
 # Global Variable to hold Event Handlers
 _handlers = []
 
+# Handler class of each handler type, defined once and shared by every handler of that type.
+_handler_classes = {}
+
 
 def add_handler(
         event: adsk.core.Event,
@@ -67,22 +72,164 @@ def _create_handler(
         name: str = None,
         local_handlers: list = None
 ):
-    handler = _define_handler(handler_type, callback, name)()
+    handler = _define_handler(handler_type)(callback, name or handler_type.__name__)
     (local_handlers if local_handlers is not None else _handlers).append(handler)
     return handler
 
 
-def _define_handler(handler_type, callback, name: str = None):
-    name = name or handler_type.__name__
+def _define_handler(handler_type):
+    handler_class = _handler_classes.get(handler_type)
+    if handler_class is not None:
+        return handler_class
 
     class Handler(handler_type):
-        def __init__(self):
+        def __init__(self, callback: Callable, name: str):
             super().__init__()
+            self.callback = callback
+            self.name = name
 
         def notify(self, args):
             try:
-                callback(args)
+                self.callback(args)
             except:
-                handle_error(name)
+                handle_error(self.name)
 
+    _handler_classes[handler_type] = Handler
     return Handler
+
+
+class Debouncer:
+    """Coalesces a burst of events into one callback once they stop for interval seconds.
+
+    Every trigger() restarts the wait, so typing "250" into a field runs the
+    callback once, for "250", instead of for "2", "25" and "250". The wait runs on
+    a timer thread, which only fires a custom event; the callback itself runs on
+    Fusion's main thread when that event arrives, and only if no trigger() came
+    in after the one that fired it, so stale calls are dropped.
+
+    Arguments:
+    event_id -- Unique id of the custom event that is registered for this debouncer.
+    interval -- Seconds without a trigger() before the callback runs. 0 runs it
+                right away from trigger().
+    callback -- Called without arguments.
+    local_handlers -- Where the custom event handler is kept, like in add_handler.
+    """
+
+    def __init__(self, event_id: str, interval: float, callback: Callable, *, local_handlers: list = None):
+        self.event_id = event_id
+        self.interval = interval
+        self.callback = callback
+        self.generation = 0
+        self._fired = 0
+        self._timer = None
+        self._lock = threading.Lock()
+
+        app = adsk.core.Application.get()
+        app.unregisterCustomEvent(event_id)
+        self._event = app.registerCustomEvent(event_id)
+        add_handler(self._event, self._on_event, name=event_id, local_handlers=local_handlers)
+
+    @property
+    def pending(self) -> bool:
+        """True while the latest trigger() has not reached the callback yet."""
+        return self._fired != self.generation
+
+    def trigger(self):
+        with self._lock:
+            self.generation += 1
+            generation = self.generation
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if self.interval > 0:
+                self._timer = threading.Timer(self.interval, self._fire, (generation,))
+                self._timer.daemon = True
+                self._timer.start()
+        if self.interval <= 0:
+            self._run(generation)
+
+    def _fire(self, generation: int):
+        adsk.core.Application.get().fireCustomEvent(self.event_id, str(generation))
+
+    def _on_event(self, args: adsk.core.CustomEventArgs):
+        self._run(int(args.additionalInfo))
+
+    def _run(self, generation: int):
+        if generation != self.generation:
+            # more events came in after this one was scheduled, their own timer runs the callback
+            return
+        self._fired = generation
+        self.callback()
+
+    def stop(self):
+        """Cancels a waiting callback and unregisters the custom event."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self._fired = self.generation
+        adsk.core.Application.get().unregisterCustomEvent(self.event_id)
+
+
+class BackgroundTask:
+    """Runs work on a worker thread and hands the result to done on Fusion's main thread.
+
+    The Fusion API may only be used from the main thread, so work must be plain
+    python. When it finishes, a custom event carries the result back and
+    done(*args, result, error) is called from the main thread, where error is
+    the formatted traceback if work raised, or None. One run at a time.
+
+    Arguments:
+    event_id -- Unique id of the custom event that is registered for this task.
+    work -- Called on the worker thread with the arguments given to start().
+    done -- Called on the main thread with those arguments, the result and the error.
+    local_handlers -- Where the custom event handler is kept, like in add_handler.
+    """
+
+    def __init__(self, event_id: str, work: Callable, done: Callable, *, local_handlers: list = None):
+        self.event_id = event_id
+        self.work = work
+        self.done = done
+        self._runs = 0
+        self._results = {}
+        self._thread = None
+
+        app = adsk.core.Application.get()
+        app.unregisterCustomEvent(event_id)
+        self._event = app.registerCustomEvent(event_id)
+        add_handler(self._event, self._on_event, name=event_id, local_handlers=local_handlers)
+
+    @property
+    def busy(self) -> bool:
+        """True from start() until done has been called."""
+        return self._thread is not None
+
+    def start(self, *args):
+        if self.busy:
+            raise RuntimeError(f'{self.event_id} is still running')
+        self._runs += 1
+        self._thread = threading.Thread(target=self._run, args=(self._runs, args), daemon=True)
+        self._thread.start()
+
+    def _run(self, run: int, args: tuple):
+        try:
+            self._results[run] = (args, self.work(*args), None)
+        except Exception:
+            self._results[run] = (args, None, traceback.format_exc())
+        adsk.core.Application.get().fireCustomEvent(self.event_id, str(run))
+
+    def _on_event(self, args: adsk.core.CustomEventArgs):
+        run = int(args.additionalInfo)
+        if run not in self._results:
+            return
+        work_args, result, error = self._results.pop(run)
+        try:
+            self.done(*work_args, result, error)
+        finally:
+            # busy until done returned, done may keep Fusion handling events while it runs
+            self._thread = None
+
+    def stop(self):
+        """Unregisters the custom event, a run still going is never handed over."""
+        self._results.clear()
+        adsk.core.Application.get().unregisterCustomEvent(self.event_id)
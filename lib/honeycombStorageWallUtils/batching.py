@@ -0,0 +1,60 @@
+"""Spatially local batching for combining many tiles.
+
+Booleans between tiles that touch are cheap, one boolean between a body and
+thousands of tools is not. These helpers order tiles into row strips and then
+merge them in small batches of neighbours, level by level, like a tree.
+
+Plain python, no adsk.
+"""
+
+import time
+from typing import Callable, List, Sequence, Tuple, TypeVar
+
+from .constants import *
+
+T = TypeVar('T')
+
+
+def spatial_order(items: Sequence[T], position: Callable[[T], Tuple[float, float]]) -> List[T]:
+    """Sorts items into half row high strips, left to right within each strip."""
+    rowHeight = VERTICAL_SPACING / 2
+
+    def key(item):
+        x, y = position(item)
+        return round(y / rowHeight), x
+
+    return sorted(items, key=key)
+
+
+def reduce_in_batches(
+    items: Sequence[T],
+    combine: Callable[[List[T]], T],
+    batch_size: int,
+    on_level: Callable[[int, int, int, float], None] = None
+) -> T:
+    """Combines items batch_size at a time until a single one is left.
+
+    combine gets a list of two or more neighbouring items and returns the merged
+    item. on_level is called after every level with the level number, the item
+    counts before and after it and the seconds it took.
+    """
+    if not items:
+        return None
+
+    batch_size = max(batch_size, 2)
+    items = list(items)
+    level = 0
+
+    while len(items) > 1:
+        start = time.perf_counter()
+        merged = []
+        for index in range(0, len(items), batch_size):
+            batch = items[index:index + batch_size]
+            merged.append(batch[0] if len(batch) == 1 else combine(batch))
+
+        if on_level is not None:
+            on_level(level, len(items), len(merged), time.perf_counter() - start)
+        items = merged
+        level += 1
+
+    return items[0]
@@ -0,0 +1,40 @@
+from collections import OrderedDict
+
+
+class LRUCache:
+    """Small bounded mapping that evicts the least recently used entry.
+
+    Keeps hit and miss counters so callers can report how useful it is.
+    """
+
+    def __init__(self, maxsize: int = 8):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key, default=None):
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+        self.misses += 1
+        return default
+
+    def put(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> str:
+        return f'hits={self.hits} misses={self.misses} size={len(self._entries)}/{self.maxsize}'
@@ -1,7 +1,12 @@
 import math
-import adsk.core
 from enum import Enum
 
+try:
+    import adsk.core
+except ImportError:
+    # the layout planner imports these constants outside of Fusion
+    adsk = None
+
 #Constants
 INNER_OFFSET = .1
 LIP_DEPTH = -.29
@@ -11,10 +16,16 @@ RADIUS_OFFSET = 0.18
 OUTER_RADIUS = INNER_RADIUS + RADIUS_OFFSET
 SIDE_LENGTH = OUTER_RADIUS * (2.0 * math.tan(math.pi/6))
 
-TOTAL_THICKNESS = adsk.core.ValueInput.createByReal(0.8)
+THICKNESS = 0.8
+
+INNER_CHAMFER_SIZES = (.09, .1)
+BOTTOM_CHAMFER_SIZES = (.05, .04)
+
+if adsk is not None:
+    TOTAL_THICKNESS = adsk.core.ValueInput.createByReal(THICKNESS)
 
-INNER_CHAMFER_DISTANCES = [adsk.core.ValueInput.createByReal(.09), adsk.core.ValueInput.createByReal(.1)]
-BOTTOM_CHAMFER_DISTANCES = [adsk.core.ValueInput.createByReal(.05), adsk.core.ValueInput.createByReal(.04)]
+    INNER_CHAMFER_DISTANCES = [adsk.core.ValueInput.createByReal(size) for size in INNER_CHAMFER_SIZES]
+    BOTTOM_CHAMFER_DISTANCES = [adsk.core.ValueInput.createByReal(size) for size in BOTTOM_CHAMFER_SIZES]
 
 VERTICAL_SPACING = INNER_RADIUS * 2 + RADIUS_OFFSET * 2
 HORIZONTAL_SPACING = SIDE_LENGTH * 3
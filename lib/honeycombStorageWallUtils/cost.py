@@ -0,0 +1,220 @@
+"""Estimates what building a wall costs before anything is built.
+
+The dialog validates on every keystroke, so the estimate only looks at the
+layout plan: how many tiles of each shape it has, and from that the bodies,
+modelling features, B-rep faces, booleans and occurrences a build mode makes.
+The counts come from the pattern and run sizes, a wall of a million tiles is
+estimated as quickly as a small one.
+
+The build time is overhead + scale * work, where work weighs the counts with
+WORK_WEIGHTS (seconds in a typical Fusion session). Every finished build can
+be appended to a timings file with record_timing, and fit_model refits the
+overhead and scale of each build mode from those recorded timings.
+
+Plain python, no adsk.
+"""
+
+import collections
+import dataclasses
+import functools
+import json
+import math
+import os
+from typing import Dict, Tuple
+
+from .layout import LayoutPlan
+from .obstacles import KeepOutLayout
+from . import mesh, shapes
+
+FEATURES = 'features'
+DIRECT = 'direct'
+INSTANCED = 'instanced'
+
+# Sketch, extrudes, cut and chamfers that model one master tile.
+FEATURES_PER_MODELLED_TILE = 8
+
+# Estimated seconds per counted item. Only their ratios matter once a model has been fitted.
+WORK_WEIGHTS = {
+    'features': 0.15,
+    'bodies': 0.004,
+    'faces': 0.0002,
+    'boolean_faces': 0.00005,
+    'occurrences': 0.01,
+}
+
+# (overhead seconds, scale of the work) of each build mode until timings have been recorded.
+DEFAULT_MODEL = {
+    FEATURES: (1.0, 1.0),
+    DIRECT: (0.5, 1.0),
+    INSTANCED: (0.5, 1.0),
+}
+
+# Fewer recorded builds than this for a mode keep its default.
+MIN_SAMPLES = 3
+
+
+@dataclasses.dataclass(frozen=True)
+class CostEstimate:
+    mode: str
+    tiles: int
+    bodies: int
+    features: int
+    faces: int
+    booleans: int
+    boolean_faces: int
+    occurrences: int
+    seconds: float
+
+    def counts(self) -> Dict[str, int]:
+        return {name: getattr(self, name) for name in WORK_WEIGHTS}
+
+    def describe(self) -> str:
+        text = f'{self.tiles} tiles, {self.bodies} bodies, {self.features} features, {self.faces} faces'
+        if self.occurrences:
+            text += f', {self.occurrences} occurrences'
+        return f'{text}, about {format_seconds(self.seconds)}'
+
+
+def format_seconds(seconds: float) -> str:
+    if seconds < 90:
+        return f'{seconds:.0f} s'
+    if seconds < 90 * 60:
+        return f'{seconds / 60:.0f} min'
+    return f'{seconds / 3600:.1f} h'
+
+
+@functools.lru_cache(maxsize=None)
+def master_faces(master: str) -> int:
+    """Faces of one tile, every quad of its mesh is one planar face."""
+    return len(mesh.master_triangles(master)) // 2
+
+
+def tile_counts(plan) -> collections.Counter:
+    """Number of tiles of each (kind, type) in a LayoutPlan, a KeepOutLayout or anything with tiles()."""
+    if isinstance(plan, LayoutPlan):
+        counts = collections.Counter({('cell', None): plan.cell_count})
+        for run in plan.borders:
+            counts[('border', run.type)] += max(run.count, 0)
+        for corner in plan.corners:
+            counts[('corner', corner.type)] += 1
+    elif isinstance(plan, KeepOutLayout):
+        counts = tile_counts(plan.plan)
+        counts.subtract((tile.kind, tile.type) for tile in plan.removed)
+        counts.update((tile.kind, tile.type) for tile in plan.added)
+    else:
+        counts = collections.Counter((tile.kind, tile.type) for tile in plan.tiles())
+    return +counts
+
+
+def combine_steps(bodies: int, batchSize: int) -> Tuple[int, int]:
+    """Combines and levels reduce_in_batches needs to join the bodies."""
+    batchSize = max(batchSize, 2)
+    combines = levels = 0
+    while bodies > 1:
+        merged = math.ceil(bodies / batchSize)
+        combines += bodies // batchSize + (1 if bodies % batchSize > 1 else 0)
+        bodies = merged
+        levels += 1
+    return combines, levels
+
+
+def estimate(plan, mode: str, combine: bool, batchSize: int = 16, model: Dict[str, Tuple[float, float]] = None) -> CostEstimate:
+    """Counts what building the plan in the build mode makes and how long that takes."""
+    counts = tile_counts(plan)
+    tiles = sum(counts.values())
+    shapesUsed = len(counts)
+    faces = sum(count * master_faces(shapes.master_for(kind, type)) for (kind, type), count in counts.items())
+
+    combine = combine and tiles > 1 and plan.spec.any_border
+    combines, levels = combine_steps(tiles, batchSize) if combine else (0, 0)
+    booleans = tiles - 1 if combine else 0
+    # every level of the batched combine runs booleans over all of the wall's faces once
+    booleanFaces = faces * levels
+
+    # only one tile of each master is modelled, the other orientations are turned copies
+    modelling = len({shapes.master_for(kind, type) for kind, type in counts}) * FEATURES_PER_MODELLED_TILE
+    if mode == FEATURES:
+        runs = sum(1 for kind, _ in counts if kind == 'border')
+        corners = sum(count for (kind, _), count in counts.items() if kind == 'corner')
+        # cells and border runs are patterned, every corner is a copy in a base feature of its own
+        features = modelling + 2 + runs + corners + combines
+        bodies, occurrences = tiles, 0
+    elif mode == INSTANCED:
+        features = modelling + 1
+        bodies, occurrences = shapesUsed + (1 if combine else 0), tiles
+    else:
+        features = modelling + 1
+        bodies, occurrences = tiles, 0
+
+    counted = CostEstimate(mode, tiles, bodies, features, faces, booleans, booleanFaces, occurrences, 0.0)
+    overhead, scale = (model or DEFAULT_MODEL).get(mode, (0.0, 1.0))
+    work = sum(WORK_WEIGHTS[name] * value for name, value in counted.counts().items())
+    return dataclasses.replace(counted, seconds=overhead + scale * work)
+
+
+def cheaper_modes(plan, mode: str, combine: bool, batchSize: int = 16, model=None):
+    """Estimates of the other build modes that are quicker than mode, quickest first."""
+    current = estimate(plan, mode, combine, batchSize, model)
+    others = [estimate(plan, other, combine, batchSize, model) for other in DEFAULT_MODEL if other != mode]
+    return sorted((other for other in others if other.seconds < current.seconds), key=lambda other: other.seconds)
+
+
+def record_timing(path: str, estimate: CostEstimate, seconds: float):
+    """Appends the counts of a finished build and how long it really took."""
+    with open(path, 'a') as file:
+        file.write(json.dumps({'mode': estimate.mode, 'seconds': seconds, **estimate.counts()}) + '\n')
+
+
+def fit_model(samples) -> Dict[str, Tuple[float, float]]:
+    """Least squares overhead and scale of every build mode from recorded timings.
+
+    Modes with fewer than MIN_SAMPLES timings, or whose fit comes out negative,
+    keep their default.
+    """
+    byMode = collections.defaultdict(list)
+    for sample in samples:
+        work = sum(WORK_WEIGHTS[name] * sample.get(name, 0) for name in WORK_WEIGHTS)
+        byMode[sample.get('mode')].append((work, sample['seconds']))
+
+    model = dict(DEFAULT_MODEL)
+    for mode, points in byMode.items():
+        if mode not in model or len(points) < MIN_SAMPLES:
+            continue
+        count = len(points)
+        meanWork = sum(work for work, _ in points) / count
+        meanSeconds = sum(seconds for _, seconds in points) / count
+        spread = sum((work - meanWork) ** 2 for work, _ in points)
+        if spread <= 0:
+            continue
+        scale = sum((work - meanWork) * (seconds - meanSeconds) for work, seconds in points) / spread
+        overhead = meanSeconds - scale * meanWork
+        if scale > 0 and overhead >= 0:
+            model[mode] = (overhead, scale)
+    return model
+
+
+_loaded = (None, None, None)
+
+
+def load_model(path: str) -> Dict[str, Tuple[float, float]]:
+    """The model fitted from the timings file, refitted only when the file changed."""
+    global _loaded
+    try:
+        changed = os.path.getmtime(path)
+    except (OSError, TypeError):
+        return DEFAULT_MODEL
+    if _loaded[:2] == (path, changed):
+        return _loaded[2]
+
+    samples = []
+    try:
+        with open(path) as file:
+            for line in file:
+                try:
+                    samples.append(json.loads(line))
+                except ValueError:
+                    continue
+    except OSError:
+        return DEFAULT_MODEL
+    _loaded = (path, changed, fit_model(sample for sample in samples if 'seconds' in sample))
+    return _loaded[2]
@@ -0,0 +1,143 @@
+import adsk.core
+import adsk.fusion
+
+from .constants import *
+from .layout import LayoutPlan, Tile
+from . import batching, profiling, progress, tiles, utils
+
+
+def tile_cache_name(tile: Tile):
+    """Name a layout Tile is cached under in the TileCache."""
+    if tile.kind == 'cell':
+        return 'cell'
+    return tile.type
+
+
+def tile_body_name(tile: Tile) -> str:
+    if tile.kind == 'border':
+        return utils.border_body_name(tile.type)
+    if tile.kind == 'corner':
+        return utils.corner_body_name(tile.type)
+    return "Honeycomb"
+
+
+def union_tiles(bodies, placements, batchSize: int, log=None):
+    """Unions temporary tile bodies in memory, neighbours first."""
+    manager = adsk.fusion.TemporaryBRepManager.get()
+
+    def union(batch):
+        target = batch[0][0]
+        for body, placement in batch[1:]:
+            manager.booleanOperation(target, body, adsk.fusion.BooleanTypes.UnionBooleanType)
+        progress.advance(len(batch) - 1)
+        return batch[0]
+
+    def on_level(level, before, after, seconds):
+        if log is not None:
+            log(f'Union level {level}: {before} bodies into {after} in {seconds:.2f}s')
+
+    ordered = batching.spatial_order(list(zip(bodies, placements)), lambda item: (item[1].x, item[1].y))
+    return batching.reduce_in_batches(ordered, union, batchSize, on_level)[0]
+
+
+def build_direct_wall(
+    component: 'adsk.fusion.Component',
+    topPlane: 'adsk.fusion.ConstructionPlane',
+    plan: LayoutPlan,
+    combine: bool,
+    batchSize: int = 16,
+    log=None
+):
+    """Builds the wall from temporary copies of the cached tiles.
+
+    Each planned tile is copied and moved in memory, optionally unioned in memory
+    too, and the result goes into the design through a single base feature instead
+    of patterns, mirrors, moves and combine features.
+    """
+    wallTiles = list(plan.tiles())
+
+    names = []
+    for tile in wallTiles:
+        name = tile_cache_name(tile)
+        if name not in names:
+            names.append(name)
+    with profiling.stage('tiles'):
+        tiles.session_tiles.ensure(component, topPlane, names)
+
+    with profiling.stage('copies'):
+        bodies = []
+        for tile in wallTiles:
+            bodies.append(tiles.session_tiles.copy(tile_cache_name(tile), tile.placement.x, tile.placement.y))
+            progress.advance()
+    if not bodies:
+        return []
+
+    if combine:
+        progress.advance(0, 'Combining')
+        with profiling.stage('union'):
+            wallBody = union_tiles(bodies, [tile.placement for tile in wallTiles], batchSize, log)
+        with profiling.stage('add bodies'):
+            return tiles.add_bodies(component, [wallBody], ["Honeycomb Storage Wall"])
+
+    with profiling.stage('add bodies'):
+        return tiles.add_bodies(component, bodies, [tile_body_name(tile) for tile in wallTiles])
+
+
+def tile_component_name(name) -> str:
+    if name == 'cell':
+        return "Honeycomb Cell"
+    if isinstance(name, BorderType):
+        return "Honeycomb Border " + name.name.capitalize()
+    return "Honeycomb Corner " + name.name
+
+
+def build_instanced_wall(
+    wallComponent: 'adsk.fusion.Component',
+    topPlane: 'adsk.fusion.ConstructionPlane',
+    plan: LayoutPlan,
+    combine: bool,
+    batchSize: int = 16
+):
+    """Places the wall as occurrences of one component per tile variant.
+
+    The cell, every border orientation and every corner type get a component
+    holding a single body, and each planned tile becomes an occurrence of it, so
+    the tile geometry is only stored once no matter how big the wall is. When
+    combine is set, a single combined body is also added in its own hidden
+    "Export" component.
+    """
+    wallTiles = list(plan.tiles())
+
+    names = []
+    for tile in wallTiles:
+        name = tile_cache_name(tile)
+        if name not in names:
+            names.append(name)
+    with profiling.stage('tiles'):
+        tiles.session_tiles.ensure(topPlane.parent, topPlane, names)
+
+    tileComponents = {}
+    with profiling.stage('occurrences'):
+        for tile in wallTiles:
+            progress.advance()
+            name = tile_cache_name(tile)
+            transform = adsk.core.Matrix3D.create()
+            transform.translation = adsk.core.Vector3D.create(tile.placement.x, tile.placement.y, 0)
+
+            if name in tileComponents:
+                wallComponent.occurrences.addExistingComponent(tileComponents[name], transform)
+                continue
+
+            occurrence = wallComponent.occurrences.addNewComponent(transform)
+            occurrence.component.name = tile_component_name(name)
+            tiles.add_bodies(occurrence.component, [tiles.session_tiles.copy(name, 0, 0)], [tile_body_name(tile)])
+            tileComponents[name] = occurrence.component
+
+    if combine and wallTiles:
+        with profiling.stage('export'):
+            exportOccurrence = wallComponent.occurrences.addNewComponent(adsk.core.Matrix3D.create())
+            exportOccurrence.component.name = "Honeycomb Storage Wall Export"
+            build_direct_wall(exportOccurrence.component, topPlane, plan, True, batchSize)
+            exportOccurrence.isLightBulbOn = False
+
+    return tileComponents
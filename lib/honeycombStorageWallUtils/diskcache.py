@@ -0,0 +1,111 @@
+"""Files kept between Fusion sessions, bounded by their total size.
+
+Every entry is one file in a folder named after the key the entries were made
+with, so entries of other keys (older add-in versions, changed constants) are
+never read again and are the first to be evicted. Reading an entry bumps its
+modification time, eviction deletes the least recently used files until the
+whole cache fits in maxBytes.
+
+Plain python, no adsk.
+"""
+
+import os
+import re
+import uuid
+
+
+class DiskCache:
+    """Size bounded least recently used store of files under a folder."""
+
+    def __init__(self, directory: str, key: str, maxBytes: int, suffix: str = ''):
+        self.directory = directory
+        self.key = key
+        self.maxBytes = maxBytes
+        self.suffix = suffix
+        self.hits = 0
+        self.misses = 0
+
+    def path(self, name: str) -> str:
+        fileName = re.sub(r'[^\w.-]+', '_', name)
+        return os.path.join(self.directory, self.key, fileName + self.suffix)
+
+    def get(self, name: str):
+        """Path of the cached file, or None when there is none."""
+        path = self.path(name)
+        try:
+            os.utime(path)
+        except OSError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return path
+
+    def put(self, name: str, write) -> bool:
+        """Stores a file by calling write(path). Returns False when it could not be written.
+
+        write gets a temporary path in the cache folder, the file only replaces the
+        entry once it is complete, so an interrupted write never leaves a broken entry.
+        """
+        path = self.path(name)
+        temporary = f'{path}.{uuid.uuid4().hex}.tmp{self.suffix}'
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if write(temporary) is False or not os.path.isfile(temporary):
+                return False
+            os.replace(temporary, path)
+        except OSError:
+            return False
+        finally:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+        self.evict()
+        return True
+
+    def discard(self, name: str):
+        try:
+            os.remove(self.path(name))
+        except OSError:
+            pass
+
+    def _entries(self):
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for fileName in files:
+                path = os.path.join(root, fileName)
+                try:
+                    info = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((info.st_mtime, info.st_size, path))
+        return entries
+
+    def size(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self):
+        """Deletes the least recently used files until the cache fits in maxBytes."""
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        if total <= self.maxBytes:
+            return
+
+        # entries of other keys go first, they are never read again
+        entries.sort(key=lambda entry: (os.path.basename(os.path.dirname(entry[2])) == self.key, entry[0]))
+        for _, size, path in entries:
+            if total <= self.maxBytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+
+        for root, folders, files in os.walk(self.directory, topdown=False):
+            if root != self.directory and not folders and not files:
+                try:
+                    os.rmdir(root)
+                except OSError:
+                    pass
+
+    def stats(self) -> str:
+        return f'hits={self.hits} misses={self.misses} bytes={self.size()}/{self.maxBytes}'
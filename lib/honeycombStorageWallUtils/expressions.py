@@ -0,0 +1,97 @@
+"""Fusion parameter expressions that reproduce plan_layout.
+
+A wall driven by user parameters gets its cell counts, border counts and the
+position of the borders that follow the top and right edges from the
+expressions below, so changing the width or height parameter is enough to
+resize it. The expressions use the same floor() arithmetic as plan_layout.
+
+Plain python, no adsk.
+"""
+
+from typing import Dict, Tuple
+
+from .constants import *
+from .layout import WallSpec
+
+
+def parameter_prefix(index: int) -> str:
+    return f'hsw{index}'
+
+
+def wall_parameters(spec: WallSpec, prefix: str) -> Dict[str, Tuple[str, str, str]]:
+    """User parameters of a wall as name -> (expression, units, comment), in creation order."""
+    p = prefix
+    xOffset = HORIZONTAL_SPACING / 6 if spec.left_border else 0.0
+    yOffset = VERTICAL_SPACING / 2 if spec.side_borders else 0.0
+
+    secondRows = f'floor(({p}_wall_height - {p}_y_offset - {p}_vertical_spacing / 2) / {p}_vertical_spacing)'
+    if spec.side_borders:
+        secondRows += ' + 1'
+
+    rowParity = f'(({p}_first_rows - {p}_second_rows) - 2 * floor(({p}_first_rows - {p}_second_rows) / 2))'
+    topShift = rowParity if spec.side_borders else f'1 - {rowParity}'
+
+    return {
+        f'{p}_wall_width': (f'{spec.width} cm', 'cm', 'Honeycomb wall width'),
+        f'{p}_wall_height': (f'{spec.height} cm', 'cm', 'Honeycomb wall height'),
+        f'{p}_vertical_spacing': (f'{VERTICAL_SPACING} cm', 'cm', 'Distance between cells in a column'),
+        f'{p}_horizontal_spacing': (f'{HORIZONTAL_SPACING} cm', 'cm', 'Distance between columns of the same pattern'),
+        f'{p}_x_offset': (f'{xOffset} cm', 'cm', 'Room left for the left border'),
+        f'{p}_y_offset': (f'{yOffset} cm', 'cm', 'Room left for the side borders'),
+        f'{p}_first_rows': (f'floor(({p}_wall_height - {p}_y_offset) / {p}_vertical_spacing)', '', 'Rows of the first cell pattern'),
+        f'{p}_first_columns': (f'floor(({p}_wall_width - {p}_x_offset + {p}_horizontal_spacing / 2) / {p}_horizontal_spacing)', '', 'Columns of the first cell pattern'),
+        f'{p}_second_rows': (secondRows, '', 'Rows of the second cell pattern'),
+        f'{p}_second_columns': (f'floor(({p}_wall_width - {p}_x_offset) / {p}_horizontal_spacing)', '', 'Columns of the second cell pattern'),
+        f'{p}_top_shift': (topShift, '', '1 when the top border starts half a column to the left'),
+        f'{p}_right_shift': (f'1 - ({p}_first_columns - {p}_second_columns)', '', '1 when the right border starts half a row up'),
+    }
+
+
+def border_count_expression(type: BorderType, spec: WallSpec, prefix: str) -> str:
+    p = prefix
+    if type == BorderType.BOTTOM:
+        return f'{p}_first_columns' if spec.side_borders else f'{p}_second_columns'
+    if type == BorderType.TOP:
+        return f'{p}_second_columns + {p}_top_shift * ({p}_first_columns - {p}_second_columns)'
+    if type == BorderType.LEFT:
+        return f'{p}_second_rows'
+    return f'{p}_second_rows + {p}_right_shift * ({p}_first_rows - {p}_second_rows)'
+
+
+def _top_border_y(spec: WallSpec, p: str) -> str:
+    y = f'{p}_y_offset + {p}_vertical_spacing * ({p}_second_rows + 1) - {p}_top_shift * {p}_vertical_spacing / 2'
+    if spec.side_borders:
+        y += f' - {p}_vertical_spacing'
+    return y
+
+
+def _right_border_x(p: str) -> str:
+    return (f'{p}_x_offset + {p}_horizontal_spacing * ({p}_second_columns + 1) - {p}_horizontal_spacing / 6'
+            f' - {p}_right_shift * {p}_horizontal_spacing / 2')
+
+
+def _right_border_y(p: str) -> str:
+    return f'{p}_y_offset + {p}_right_shift * {p}_vertical_spacing / 2'
+
+
+def border_position_expressions(type: BorderType, spec: WallSpec, prefix: str):
+    """(x, y) expressions of the first piece of a border run, None where it never moves."""
+    p = prefix
+    if type == BorderType.TOP:
+        return (f'{p}_x_offset + {SIDE_LENGTH * 2.5} cm - {p}_top_shift * {p}_horizontal_spacing / 2',
+                _top_border_y(spec, p))
+    if type == BorderType.RIGHT:
+        return _right_border_x(p), _right_border_y(p)
+    return None, None
+
+
+def corner_position_expressions(type: CornerType, spec: WallSpec, prefix: str):
+    """(x, y) expressions of a corner piece, None where it never moves."""
+    p = prefix
+    if type == CornerType.TopLeft:
+        return None, f'{p}_y_offset + {p}_vertical_spacing * {p}_first_rows'
+    if type == CornerType.BottomRight:
+        return _right_border_x(p), f'{_right_border_y(p)} - {p}_vertical_spacing'
+    if type == CornerType.TopRight:
+        return _right_border_x(p), f'{_right_border_y(p)} + {p}_vertical_spacing * {p}_first_rows'
+    return None, None
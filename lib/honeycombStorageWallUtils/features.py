@@ -0,0 +1,769 @@
+import contextlib
+import dataclasses
+import time
+
+import adsk.core
+import adsk.fusion
+
+from .constants import *
+from .layout import BorderRun, CornerPiece, LayoutPlan, Placement, Tile, WallSpec
+from .obstacles import KeepOutLayout
+from .topology import TopologyIndex
+from . import expressions, profiling, progress, tiles, utils
+
+
+def timeline_tokens(design: 'adsk.fusion.Design', start: int):
+    """Entity tokens of everything added to the timeline from index start on, up to the marker."""
+    if design.designType != adsk.fusion.DesignTypes.ParametricDesignType:
+        return []
+
+    tokens = []
+    timeline = design.timeline
+    for index in range(start, timeline.markerPosition):
+        entity = timeline.item(index).entity
+        if entity is not None:
+            tokens.append(entity.entityToken)
+    return tokens
+
+
+def timeline_count(design: 'adsk.fusion.Design') -> int:
+    """Index the next feature goes to, the end of the timeline unless the marker was rolled back."""
+    if design.designType != adsk.fusion.DesignTypes.ParametricDesignType:
+        return 0
+    return design.timeline.markerPosition
+
+
+def feature_count(design: 'adsk.fusion.Design') -> int:
+    """Timeline items of a parametric design, bodies and sketches of a direct one."""
+    if design.designType == adsk.fusion.DesignTypes.ParametricDesignType:
+        return design.timeline.count
+    return sum(component.bRepBodies.count + component.sketches.count for component in design.allComponents)
+
+
+def group_timeline(design: 'adsk.fusion.Design', start: int, name: str):
+    """Collapses everything added to the timeline from index start on into one named group."""
+    if design.designType != adsk.fusion.DesignTypes.ParametricDesignType or design.timeline.count <= start:
+        return None
+
+    group = design.timeline.timelineGroups.add(start, design.timeline.count - 1)
+    group.name = name
+    return group
+
+
+def find_entity(design: 'adsk.fusion.Design', token: str):
+    entities = design.findEntityByToken(token)
+    if entities:
+        return entities[0]
+    return None
+
+
+def delete_entities(design: 'adsk.fusion.Design', tokens):
+    # last created first so nothing is deleted before what depends on it
+    for token in reversed(tokens):
+        entity = find_entity(design, token)
+        if entity is not None and entity.isValid:
+            entity.deleteMe()
+
+
+def delete_feature_wall(design: 'adsk.fusion.Design', record: dict):
+    """Deletes a wall built by build_feature_wall, newest features first, and its user parameters.
+
+    record['entities'], when the build stored it, is everything the wall put on
+    the timeline. Runs and corners added by later updates are in their own entries.
+    """
+    delete_entities(design, record['combine'])
+    for stored in reversed(record['corners']):
+        delete_entities(design, stored['entities'])
+    for stored in reversed(list(record['borders'].values())):
+        delete_entities(design, stored['entities'])
+    delete_entities(design, record.get('entities', [record['first_pattern'], record['second_pattern']]))
+
+    prefix = record.get('parameters')
+    if prefix:
+        userParameters = design.userParameters
+        for parameter in reversed([parameter for parameter in userParameters if parameter.name.startswith(f'{prefix}_')]):
+            parameter.deleteMe()
+
+
+def design_snapshot(design: 'adsk.fusion.Design') -> dict:
+    """What the design holds before a build, so roll_back can take a cancelled build out again."""
+    root = design.rootComponent
+    return {
+        'timeline': timeline_count(design),
+        'parameters': {parameter.name for parameter in design.userParameters},
+        'occurrences': {occurrence.entityToken for occurrence in root.occurrences},
+        'bodies': {body.entityToken for body in root.bRepBodies},
+        'sketches': {sketch.entityToken for sketch in root.sketches},
+        'planes': {plane.entityToken for plane in root.constructionPlanes},
+    }
+
+
+def added_tokens(design: 'adsk.fusion.Design', snapshot: dict) -> list:
+    """Entity tokens of everything added to the design since design_snapshot, oldest first.
+
+    A direct design has no timeline, its new planes, sketches and bodies are listed in that order.
+    """
+    if design.designType == adsk.fusion.DesignTypes.ParametricDesignType:
+        return timeline_tokens(design, snapshot['timeline'])
+    root = design.rootComponent
+    return [entity.entityToken
+            for entities, key in ((root.constructionPlanes, 'planes'), (root.sketches, 'sketches'), (root.bRepBodies, 'bodies'))
+            for entity in entities if entity.entityToken not in snapshot[key]]
+
+
+def roll_back(design: 'adsk.fusion.Design', snapshot: dict):
+    """Deletes everything added to the design since design_snapshot was taken."""
+    root = design.rootComponent
+    if design.designType == adsk.fusion.DesignTypes.ParametricDesignType:
+        timeline = design.timeline
+        if timeline.count > snapshot['timeline']:
+            timeline.item(snapshot['timeline']).rollTo(True)
+            timeline.deleteAllAfterMarker()
+
+    # whatever is left, everything of a direct design
+    # bodies before the occurrences and sketches, planes last, nothing depends on a later one
+    for entities, key in ((root.bRepBodies, 'bodies'), (root.occurrences, 'occurrences'),
+                          (root.sketches, 'sketches'), (root.constructionPlanes, 'planes')):
+        for entity in [entity for entity in entities if entity.entityToken not in snapshot[key]]:
+            if entity.isValid:
+                entity.deleteMe()
+
+    # parameters are not on the timeline, and nothing uses them once their features are gone
+    for parameter in [parameter for parameter in design.userParameters if parameter.name not in snapshot['parameters']]:
+        parameter.deleteMe()
+
+
+def create_wall_parameters(design: 'adsk.fusion.Design', spec: WallSpec) -> str:
+    """Adds the user parameters that drive a wall. Returns their name prefix.
+
+    Every wall gets its own numbered prefix so several parametric walls can live
+    in the same design.
+    """
+    userParameters = design.userParameters
+    index = 1
+    while userParameters.itemByName(f'{expressions.parameter_prefix(index)}_wall_width') is not None:
+        index += 1
+    prefix = expressions.parameter_prefix(index)
+
+    for name, (expression, units, comment) in expressions.wall_parameters(spec, prefix).items():
+        userParameters.add(name, adsk.core.ValueInput.createByString(expression), units, comment)
+    return prefix
+
+
+def _value(expression: str = None, value: float = 0.0) -> adsk.core.ValueInput:
+    if expression is not None:
+        return adsk.core.ValueInput.createByString(expression)
+    return adsk.core.ValueInput.createByReal(value)
+
+
+def _move_by_expressions(component: 'adsk.fusion.Component', body: 'adsk.fusion.BRepBody',
+                         x: float, y: float, xExpression: str, yExpression: str):
+    """Moves a body built at (x, y) to the position the expressions evaluate to."""
+    if xExpression is None and yExpression is None:
+        return
+
+    entities = adsk.core.ObjectCollection.create()
+    entities.add(body)
+    moveInput = component.features.moveFeatures.createInput2(entities)
+    moveInput.defineAsTranslateXYZ(
+        _value(f'({xExpression}) - {x} cm' if xExpression is not None else None),
+        _value(f'({yExpression}) - {y} cm' if yExpression is not None else None),
+        _value(),
+        True
+    )
+    component.features.moveFeatures.add(moveInput)
+
+
+def build_cells(
+    design: 'adsk.fusion.Design',
+    component: 'adsk.fusion.Component',
+    topPlane: 'adsk.fusion.ConstructionPlane',
+    plan: LayoutPlan,
+    prefix: str = None,
+    sketches: dict = None
+):
+    """Models (or copies) the first two cells and patterns them. Returns both pattern features.
+
+    With a parameter prefix the pattern quantities and spacings are driven by
+    the wall's user parameters instead of fixed values. sketches are the cell
+    sketches from sketch_wall, when they were drawn up front.
+    """
+    p = prefix
+    firstPattern = plan.first_pattern
+    secondPattern = plan.second_pattern
+
+    if tiles.session_tiles.has('cell'):
+        # the finished cell was modelled by an earlier run, copy it instead of modelling it again
+        honeycombBody, secondHoneycombBody = tiles.session_tiles.instantiate(
+            component,
+            [('cell', firstPattern.origin.x, firstPattern.origin.y),
+             ('cell', secondPattern.origin.x, secondPattern.origin.y)],
+            ["Honeycomb", "Honeycomb"]
+        )
+        profiling.split('cached tiles')
+    else:
+        if sketches is None:
+            honeycombCenterPoint = adsk.core.Point3D.create(firstPattern.origin.x, firstPattern.origin.y, 0)
+            sketches = utils.sketch_full_comb(topPlane, component, honeycombCenterPoint)
+        honeycombBody = utils.model_full_comb(component, sketches)
+
+        # mirror honeycomb body across the wall between the two cells, so we have a second one
+        # to the upper right of it (lower right with side borders)
+        mirrorPlane = TopologyIndex(honeycombBody, sketches['center']).outer_wall(
+            secondPattern.origin.x - firstPattern.origin.x, secondPattern.origin.y - firstPattern.origin.y
+        )
+
+        entitiesToMirror = adsk.core.ObjectCollection.create()
+        entitiesToMirror.add(honeycombBody)
+
+        mirrorInput = component.features.mirrorFeatures.createInput(entitiesToMirror, mirrorPlane)
+        mirrorInput.isCombine = False
+        mirrorFeature = component.features.mirrorFeatures.add(mirrorInput)
+        secondHoneycombBody = mirrorFeature.bodies.item(0)
+        profiling.split('mirror')
+
+        tiles.session_tiles.store('cell', honeycombBody, firstPattern.origin.x, firstPattern.origin.y)
+
+    # duplicate the first honeycomb with a rectangular pattern
+    firstHoneycombCollection = adsk.core.ObjectCollection.create()
+    firstHoneycombCollection.add(honeycombBody)
+
+    firstPatternInput = component.features.rectangularPatternFeatures.createInput(firstHoneycombCollection,
+                                                                                  design.rootComponent.yConstructionAxis,
+                                                                                  _value(p and f'{p}_first_rows', firstPattern.rows),
+                                                                                  _value(p and f'{p}_vertical_spacing', VERTICAL_SPACING),
+                                                                                  adsk.fusion.PatternDistanceType.SpacingPatternDistanceType)
+    firstPatternInput.setDirectionTwo(design.rootComponent.xConstructionAxis, _value(p and f'{p}_first_columns', firstPattern.columns),
+                                      _value(p and f'{p}_horizontal_spacing', HORIZONTAL_SPACING))
+    firstPatternFeature = component.features.rectangularPatternFeatures.add(firstPatternInput)
+    profiling.split('first pattern')
+
+    # duplicate the second honeycomb with a rectangular pattern
+    secondHoneycombCollection = adsk.core.ObjectCollection.create()
+    secondHoneycombCollection.add(secondHoneycombBody)
+
+    secondPatternInput = component.features.rectangularPatternFeatures.createInput(
+        secondHoneycombCollection,
+        design.rootComponent.yConstructionAxis,
+        _value(p and f'{p}_second_rows', secondPattern.rows),
+        _value(p and f'{p}_vertical_spacing', VERTICAL_SPACING),
+        adsk.fusion.PatternDistanceType.SpacingPatternDistanceType
+    )
+    secondPatternInput.setDirectionTwo(design.rootComponent.xConstructionAxis, _value(p and f'{p}_second_columns', secondPattern.columns),
+                                       _value(p and f'{p}_horizontal_spacing', HORIZONTAL_SPACING))
+    secondPatternFeature = component.features.rectangularPatternFeatures.add(secondPatternInput)
+    profiling.split('second pattern')
+
+    return firstPatternFeature, secondPatternFeature
+
+
+def model_piece(
+    component: 'adsk.fusion.Component',
+    topPlane: 'adsk.fusion.ConstructionPlane',
+    name,
+    x: float,
+    y: float,
+    sketches: dict = None
+):
+    """Models the border or corner piece name centered on (x, y) from its master.
+
+    Only the master orientation (tiles.MASTER_TILES) is modelled with features,
+    and it is kept in the tile cache. Any other orientation is a turned copy of
+    it from the cache, the same as on the cached path, and the master body is
+    removed again. sketches are the master's sketches, when they were drawn up front.
+    """
+    master = tiles.MASTER_TILES[tiles.tile_master(name)]
+    isBorder = isinstance(name, BorderType)
+    if sketches is None:
+        centerPoint = adsk.core.Point3D.create(x, y, 0)
+        sketch = utils.sketch_half_comb if isBorder else utils.sketch_quarter_comb
+        sketches = sketch(master, topPlane, component, centerPoint)
+    body = (utils.model_half_comb if isBorder else utils.model_quarter_comb)(component, sketches)
+    if body is None:
+        return None
+
+    tiles.session_tiles.store(master, body, x, y)
+    if master == name:
+        return body
+
+    bodyName = utils.border_body_name(name) if isBorder else utils.corner_body_name(name)
+    piece = tiles.session_tiles.instantiate(component, [(name, x, y)], [bodyName])[0]
+    component.features.removeFeatures.add(body)
+    profiling.split('turned copy')
+    return piece
+
+
+def build_border_run(
+    design: 'adsk.fusion.Design',
+    component: 'adsk.fusion.Component',
+    topPlane: 'adsk.fusion.ConstructionPlane',
+    run: BorderRun,
+    spec: WallSpec = None,
+    prefix: str = None,
+    sketches: dict = None
+) -> dict:
+    """Models (or copies) the first half comb of a border and patterns it along the edge.
+
+    With a parameter prefix the run follows the wall's user parameters: the top
+    and right borders are moved onto their edge and the count is an expression.
+    Returns the record of the run: the pattern feature and every timeline entity it made.
+    """
+    start = timeline_count(design)
+
+    if tiles.session_tiles.has(run.type):
+        borderBody = tiles.session_tiles.instantiate(
+            component, [(run.type, run.origin.x, run.origin.y)], [utils.border_body_name(run.type)]
+        )[0]
+        profiling.split('cached tiles')
+    else:
+        borderBody = model_piece(component, topPlane, run.type, run.origin.x, run.origin.y, sketches)
+
+    patternFeature = None
+    if borderBody is not None:
+        if run.type in (BorderType.BOTTOM, BorderType.TOP):
+            axis = component.xConstructionAxis
+            spacing = _value(prefix and f'{prefix}_horizontal_spacing', HORIZONTAL_SPACING)
+        else:
+            axis = component.yConstructionAxis
+            spacing = _value(prefix and f'{prefix}_vertical_spacing', VERTICAL_SPACING)
+
+        quantity = run.count
+        if prefix is not None:
+            xExpression, yExpression = expressions.border_position_expressions(run.type, spec, prefix)
+            _move_by_expressions(component, borderBody, run.origin.x, run.origin.y, xExpression, yExpression)
+            profiling.split('move')
+            quantity = _value(expressions.border_count_expression(run.type, spec, prefix))
+
+        patternFeature = utils.duplicate_border_body(component, axis, borderBody, quantity, spacing)
+
+    return {
+        'x': run.origin.x,
+        'y': run.origin.y,
+        'count': run.count,
+        'pattern': patternFeature.entityToken if patternFeature is not None else None,
+        'entities': timeline_tokens(design, start),
+    }
+
+
+def build_corner(
+    design: 'adsk.fusion.Design',
+    component: 'adsk.fusion.Component',
+    topPlane: 'adsk.fusion.ConstructionPlane',
+    corner: CornerPiece,
+    spec: WallSpec = None,
+    prefix: str = None,
+    sketches: dict = None
+) -> dict:
+    start = timeline_count(design)
+
+    if tiles.session_tiles.has(corner.type):
+        cornerBody = tiles.session_tiles.instantiate(
+            component, [(corner.type, corner.placement.x, corner.placement.y)],
+            [utils.corner_body_name(corner.type)]
+        )[0]
+        profiling.split('cached tiles')
+    else:
+        cornerBody = model_piece(component, topPlane, corner.type, corner.placement.x, corner.placement.y, sketches)
+
+    if prefix is not None:
+        xExpression, yExpression = expressions.corner_position_expressions(corner.type, spec, prefix)
+        _move_by_expressions(component, cornerBody, corner.placement.x, corner.placement.y, xExpression, yExpression)
+
+    return {
+        'type': corner.type.name,
+        'x': corner.placement.x,
+        'y': corner.placement.y,
+        'entities': timeline_tokens(design, start),
+    }
+
+
+def sketch_wall(
+    component: 'adsk.fusion.Component',
+    topPlane: 'adsk.fusion.ConstructionPlane',
+    plan: LayoutPlan
+) -> dict:
+    """Draws the sketches of every tile that is not cached yet, before any solid is made.
+
+    Only the first tile of each master is sketched, in the orientation of the
+    master, see model_piece. The tiles after it are copies turned by the tile
+    cache. Returns the sketches keyed like the tile cache: 'cell', a BorderType
+    or a CornerType, by the tile they are drawn for.
+    """
+    sketches = {}
+    sketched = set()
+
+    def needs_sketch(name) -> bool:
+        if tiles.tile_master(name) in sketched or tiles.session_tiles.has(name):
+            return False
+        sketched.add(tiles.tile_master(name))
+        return True
+
+    if needs_sketch('cell'):
+        origin = plan.first_pattern.origin
+        sketches['cell'] = utils.sketch_full_comb(topPlane, component, adsk.core.Point3D.create(origin.x, origin.y, 0))
+
+    for run in plan.borders:
+        if needs_sketch(run.type):
+            centerPoint = adsk.core.Point3D.create(run.origin.x, run.origin.y, 0)
+            master = tiles.MASTER_TILES[tiles.tile_master(run.type)]
+            sketches[run.type] = utils.sketch_half_comb(master, topPlane, component, centerPoint)
+
+    for corner in plan.corners:
+        if needs_sketch(corner.type):
+            centerPoint = adsk.core.Point3D.create(corner.placement.x, corner.placement.y, 0)
+            master = tiles.MASTER_TILES[tiles.tile_master(corner.type)]
+            sketches[corner.type] = utils.sketch_quarter_comb(master, topPlane, component, centerPoint)
+
+    return sketches
+
+
+def _offset_key(dx: float, dy: float):
+    return round(dx, 4), round(dy, 4)
+
+
+def suppress_pattern_tiles(component: 'adsk.fusion.Component', pattern: 'adsk.fusion.RectangularPatternFeature',
+                           origin: Placement, placements):
+    """Takes the elements of a pattern that sit at the given placements out of the wall.
+
+    On the timeline they are suppressed, except for the first element: that is
+    the seed body itself, it is taken out with a remove feature instead. Without
+    history there is nothing to suppress and the bodies are deleted.
+    """
+    offsets = {_offset_key(placement.x - origin.x, placement.y - origin.y) for placement in placements}
+    if not offsets:
+        return
+
+    seed = pattern.inputEntities.item(0)
+    design = adsk.fusion.Design.cast(component.parentDesign)
+    if design.designType == adsk.fusion.DesignTypes.ParametricDesignType and not tiles.editing_without_history():
+        for element in pattern.patternElements:
+            translation = element.transform.translation
+            key = _offset_key(translation.x, translation.y)
+            if key != (0.0, 0.0) and key in offsets:
+                element.isSuppressed = True
+
+        if (0.0, 0.0) in offsets:
+            component.features.removeFeatures.add(seed)
+        return
+
+    # the bounding box center of a half comb is not its placement, but it is off by the same amount for every copy
+    seedX, seedY = utils.body_center(seed)
+    bodies = [seed] + [body for body in pattern.bodies if body.entityToken != seed.entityToken]
+    for body in bodies:
+        x, y = utils.body_center(body)
+        if _offset_key(x - seedX, y - seedY) in offsets:
+            body.deleteMe()
+
+
+def _in_pattern(placement: Placement, origin: Placement) -> bool:
+    columns = (placement.x - origin.x) / HORIZONTAL_SPACING
+    rows = (placement.y - origin.y) / VERTICAL_SPACING
+    return abs(columns - round(columns)) < 1e-6 and abs(rows - round(rows)) < 1e-6
+
+
+def build_keep_out_pieces(
+    component: 'adsk.fusion.Component',
+    topPlane: 'adsk.fusion.ConstructionPlane',
+    pieces
+):
+    """Adds the half and quarter combs that replace tiles cut by keep-out zones.
+
+    The first piece of each master that is not cached yet is modelled where it
+    goes with model_piece, every other one is a copy of the cached tile.
+    """
+    copies = []
+    for piece in pieces:
+        x, y = piece.placement.x, piece.placement.y
+        if tiles.session_tiles.has(piece.type):
+            copies.append(piece)
+            continue
+
+        model_piece(component, topPlane, piece.type, x, y)
+
+    if copies:
+        names = [utils.border_body_name(piece.type) if piece.kind == 'border' else utils.corner_body_name(piece.type)
+                 for piece in copies]
+        tiles.session_tiles.instantiate(component, [(piece.type, piece.placement.x, piece.placement.y) for piece in copies],
+                                        names)
+        profiling.split('cached tiles')
+
+
+def apply_keep_outs(
+    design: 'adsk.fusion.Design',
+    component: 'adsk.fusion.Component',
+    topPlane: 'adsk.fusion.ConstructionPlane',
+    keepOuts: KeepOutLayout,
+    cellPatterns,
+    borderRecords: dict
+):
+    """Takes the tiles hit by keep-out zones out of the patterns and adds their replacements."""
+    plan = keepOuts.plan
+    removedCells = [tile.placement for tile in keepOuts.removed if tile.kind == 'cell']
+    firstOrigin = plan.first_pattern.origin
+    firstCells = [placement for placement in removedCells if _in_pattern(placement, firstOrigin)]
+    secondCells = [placement for placement in removedCells if not _in_pattern(placement, firstOrigin)]
+
+    firstPatternFeature, secondPatternFeature = cellPatterns
+    suppress_pattern_tiles(component, firstPatternFeature, firstOrigin, firstCells)
+    suppress_pattern_tiles(component, secondPatternFeature, plan.second_pattern.origin, secondCells)
+
+    for run in plan.borders:
+        stored = borderRecords.get(run.type.name)
+        placements = [tile.placement for tile in keepOuts.removed if tile.kind == 'border' and tile.type == run.type]
+        if stored is None or stored['pattern'] is None or not placements:
+            continue
+        pattern = adsk.fusion.RectangularPatternFeature.cast(find_entity(design, stored['pattern']))
+        suppress_pattern_tiles(component, pattern, run.origin, placements)
+    profiling.split('suppress')
+
+    build_keep_out_pieces(component, topPlane, keepOuts.added)
+
+
+def wall_bodies(design: 'adsk.fusion.Design', component: 'adsk.fusion.Component', record: dict) -> list:
+    """Bodies of the component made by the features of a wall built by build_feature_wall."""
+    tokens = list(record.get('entities', [record['first_pattern'], record['second_pattern']]))
+    for stored in record['borders'].values():
+        tokens += stored['entities']
+    for stored in record['corners']:
+        tokens += stored['entities']
+
+    made = set()
+    for token in tokens:
+        entity = find_entity(design, token)
+        # sketches and planes have no bodies
+        for body in getattr(entity, 'bodies', None) or ():
+            if body is not None and body.isValid:
+                made.add(body.entityToken)
+    return [body for body in component.bRepBodies if body.entityToken in made]
+
+
+def wall_group(design: 'adsk.fusion.Design', record: dict):
+    """Timeline group a wall built by build_feature_wall was put in, None when it is not grouped."""
+    pattern = find_entity(design, record['first_pattern'])
+    if pattern is None:
+        return None
+    return pattern.timelineObject.parentGroup
+
+
+@contextlib.contextmanager
+def adding_to_group(design: 'adsk.fusion.Design', group):
+    """Puts the features made in the with block into the timeline group, right after what it holds."""
+    if group is None:
+        yield
+        return
+
+    timeline = design.timeline
+    name = group.name
+    group.rollTo(False)
+    try:
+        yield
+    finally:
+        first = group.item(0).index
+        last = group.item(group.count - 1).index
+        added = timeline.markerPosition - 1
+        timeline.moveToEnd()
+        if added > last:
+            # a group can't grow, it is replaced by one that holds the new features as well
+            group.deleteMe(False)
+            regrouped = timeline.timelineGroups.add(first, added)
+            regrouped.name = name
+
+
+def combine_wall(design: 'adsk.fusion.Design', component: 'adsk.fusion.Component', bodies, batchSize: int, log=None):
+    """Combines the bodies of the wall. Returns the tokens of the combine features."""
+    start = timeline_count(design)
+    startTime = time.perf_counter()
+    utils.combine_bodies(component, bodies, batchSize, log)
+    if log is not None:
+        log(f'Combined everything in {time.perf_counter() - startTime:.2f}s')
+    return timeline_tokens(design, start)
+
+
+def build_feature_wall(
+    design: 'adsk.fusion.Design',
+    component: 'adsk.fusion.Component',
+    topPlane: 'adsk.fusion.ConstructionPlane',
+    plan: LayoutPlan,
+    combine: bool,
+    batchSize: int,
+    log=None,
+    parametric: bool = False,
+    sketchFirst: bool = False,
+    keepOuts: KeepOutLayout = None
+) -> dict:
+    """Builds the wall with sketches, features and patterns on the timeline.
+
+    A parametric wall is driven by user parameters, its size can be changed by
+    editing hsw<n>_wall_width and hsw<n>_wall_height without running the command
+    again. Which corners exist is still decided when the wall is built, and a
+    combine only holds the bodies that existed when it was made, so resizing
+    through the command (which recombines) is needed to keep a combined wall whole.
+
+    With sketchFirst every sketch is drawn before the first solid feature, so
+    Fusion does not solve sketches in between extrudes, chamfers and patterns.
+
+    keepOuts takes the tiles hit by keep-out zones back out of the patterns
+    again and adds the pieces that replace them. Such a wall is not parametric,
+    the zones would not follow a size change.
+
+    Returns a record of the features that were made, which update_feature_wall
+    uses to change the wall later on.
+    """
+    # bodies that were there before, only the wall's own bodies are combined
+    otherBodies = {body.entityToken for body in component.bRepBodies}
+
+    prefix = None
+    if parametric and keepOuts is None and design.designType == adsk.fusion.DesignTypes.ParametricDesignType:
+        prefix = create_wall_parameters(design, plan.spec)
+
+    sketches = {}
+    if sketchFirst:
+        with profiling.stage('sketches'):
+            sketches = sketch_wall(component, topPlane, plan)
+
+    with profiling.stage('cells'):
+        firstPatternFeature, secondPatternFeature = build_cells(design, component, topPlane, plan, prefix,
+                                                                sketches.get('cell'))
+    progress.advance(plan.cell_count, 'Cells')
+
+    record = {
+        'first_pattern': firstPatternFeature.entityToken,
+        'second_pattern': secondPatternFeature.entityToken,
+        'borders': {},
+        'corners': [],
+        'combine': [],
+        'parameters': prefix,
+    }
+
+    for run in plan.borders:
+        with profiling.stage(f'border {run.type.name}'):
+            record['borders'][run.type.name] = build_border_run(design, component, topPlane, run, plan.spec, prefix,
+                                                                sketches.get(run.type))
+        progress.advance(run.count, f'{run.type.name.capitalize()} border')
+
+    removed = set(keepOuts.removed) if keepOuts is not None else set()
+    with profiling.stage('corners'):
+        for corner in plan.corners:
+            if Tile('corner', corner.type, corner.placement) in removed:
+                continue
+            record['corners'].append(build_corner(design, component, topPlane, corner, plan.spec, prefix,
+                                                  sketches.get(corner.type)))
+            progress.advance(1, 'Corners')
+
+    if removed:
+        with profiling.stage('keep-outs'):
+            apply_keep_outs(design, component, topPlane, keepOuts, (firstPatternFeature, secondPatternFeature),
+                            record['borders'])
+
+    if combine and plan.spec.any_border:
+        progress.advance(0, 'Combining')
+        with profiling.stage('combine'):
+            bodies = [body for body in component.bRepBodies if body.entityToken not in otherBodies]
+            record['combine'] = combine_wall(design, component, bodies, batchSize, log)
+
+    return record
+
+
+def _same_point(x1, y1, x2, y2) -> bool:
+    return abs(x1 - x2) < 1e-6 and abs(y1 - y2) < 1e-6
+
+
+def _set_quantity(design: 'adsk.fusion.Design', token: str, rows: int, columns: int = None):
+    pattern = adsk.fusion.RectangularPatternFeature.cast(find_entity(design, token))
+    if pattern.quantityOne.value != rows:
+        pattern.quantityOne.expression = str(rows)
+    if columns is not None and pattern.quantityTwo.value != columns:
+        pattern.quantityTwo.expression = str(columns)
+
+
+def _parameters_cover(oldPlan: LayoutPlan, plan: LayoutPlan) -> bool:
+    """True when a parametric wall can become the new plan by changing its width and height only."""
+    if dataclasses.replace(oldPlan.spec, width=plan.spec.width, height=plan.spec.height) != plan.spec:
+        return False
+    return [corner.type for corner in oldPlan.corners] == [corner.type for corner in plan.corners]
+
+
+def set_wall_size(design: 'adsk.fusion.Design', prefix: str, width: float, height: float):
+    userParameters = design.userParameters
+    userParameters.itemByName(f'{prefix}_wall_width').expression = f'{width} cm'
+    userParameters.itemByName(f'{prefix}_wall_height').expression = f'{height} cm'
+
+
+def update_feature_wall(
+    design: 'adsk.fusion.Design',
+    component: 'adsk.fusion.Component',
+    topPlane: 'adsk.fusion.ConstructionPlane',
+    record: dict,
+    oldPlan: LayoutPlan,
+    plan: LayoutPlan,
+    combine: bool,
+    batchSize: int,
+    log=None
+):
+    """Changes a wall built by build_feature_wall into the new plan.
+
+    Only the difference is applied: pattern quantities are edited in place, and
+    border runs and corners are only removed or added when they moved or are
+    new. Returns the updated record, or None when the cells themselves moved
+    (a side border was switched on or off) and the wall has to be rebuilt.
+    """
+    if design.designType != adsk.fusion.DesignTypes.ParametricDesignType:
+        return None
+
+    prefix = record.get('parameters')
+    if prefix and not _parameters_cover(oldPlan, plan):
+        return None
+
+    for old, new in ((oldPlan.first_pattern, plan.first_pattern), (oldPlan.second_pattern, plan.second_pattern)):
+        if not _same_point(old.origin.x, old.origin.y, new.origin.x, new.origin.y):
+            return None
+
+    # take the combine apart first so every tile is its own body again
+    delete_entities(design, record['combine'])
+    record['combine'] = []
+
+    if prefix:
+        # the counts and positions are expressions, only the size parameters change
+        set_wall_size(design, prefix, plan.spec.width, plan.spec.height)
+        if combine and plan.spec.any_border:
+            record['combine'] = combine_wall(design, component, wall_bodies(design, component, record), batchSize, log)
+        return record
+
+    _set_quantity(design, record['first_pattern'], plan.first_pattern.rows, plan.first_pattern.columns)
+    _set_quantity(design, record['second_pattern'], plan.second_pattern.rows, plan.second_pattern.columns)
+
+    newRuns = {run.type.name: run for run in plan.borders}
+    for name in list(record['borders']):
+        stored = record['borders'][name]
+        run = newRuns.get(name)
+        if run is not None and stored['pattern'] is not None and _same_point(stored['x'], stored['y'], run.origin.x, run.origin.y):
+            if stored['count'] != run.count:
+                _set_quantity(design, stored['pattern'], run.count)
+                stored['count'] = run.count
+            continue
+
+        delete_entities(design, stored['entities'])
+        del record['borders'][name]
+
+    for name, run in newRuns.items():
+        if name not in record['borders']:
+            record['borders'][name] = build_border_run(design, component, topPlane, run)
+
+    keptCorners = []
+    for stored in record['corners']:
+        if any(corner.type.name == stored['type'] and _same_point(stored['x'], stored['y'], corner.placement.x, corner.placement.y)
+               for corner in plan.corners):
+            keptCorners.append(stored)
+        else:
+            delete_entities(design, stored['entities'])
+
+    for corner in plan.corners:
+        if not any(corner.type.name == stored['type'] and _same_point(stored['x'], stored['y'], corner.placement.x, corner.placement.y)
+                   for stored in keptCorners):
+            keptCorners.append(build_corner(design, component, topPlane, corner))
+    record['corners'] = keptCorners
+
+    if combine and plan.spec.any_border:
+        record['combine'] = combine_wall(design, component, wall_bodies(design, component, record), batchSize, log)
+
+    return record
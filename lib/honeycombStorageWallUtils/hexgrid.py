@@ -0,0 +1,437 @@
+"""Vectorized hex grid for walls with arbitrary outlines.
+
+plan_layout only knows rectangles. Here the wall is an Outline, a union of
+polygons, circles and rectangles minus cut-outs, and every cell of the hex
+lattice that overlaps it is classified in one batched numpy pass as a full cell,
+a half comb border piece or a quarter comb corner piece. The result yields the
+same layout Tiles as a LayoutPlan, so it can be built by anything that only
+walks plan.tiles().
+
+A piece is kept when all corners of its outer loop (shapes.master_loops) lie in
+the outline and no edge of the outline runs through it, so a notch of a concave
+outline or a small hole never ends up inside a piece. An edge of one shape
+inside another shape of the union is not an edge of the outline and does not
+count. A circle is the polygon of CIRCLE_SEGMENTS sides inscribed in it. Only
+one piece is kept per lattice cell, the full cell first, then the borders and
+the corners in the order of PIECES.
+
+Outlines are typed like the keep-out zones, with "polygon x1 y1 x2 y2 ..." as
+well and a "-" in front of the shapes that are cut out:
+
+    polygon 0 0 60 0 60 40 30 40 30 20 0 20; -circle 10 10 3
+
+Plain python, no adsk. numpy is optional: Fusion's own python does not ship it,
+so the rest of the add-in must not depend on this module.
+"""
+
+import math
+from dataclasses import dataclass
+from typing import Iterator, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from .constants import *
+from .layout import LayoutPlan, Placement, Tile, border_placement, corner_placement
+from . import shapes
+
+EMPTY = 0
+CELL = 1
+BORDER = 2
+CORNER = 3
+
+KIND_NAMES = {CELL: 'cell', BORDER: 'border', CORNER: 'corner'}
+
+# Pieces tried for every lattice cell, in order of preference.
+PIECES = (
+    (CELL, None),
+    (BORDER, BorderType.BOTTOM),
+    (BORDER, BorderType.TOP),
+    (BORDER, BorderType.LEFT),
+    (BORDER, BorderType.RIGHT),
+    (CORNER, CornerType.TopLeft),
+    (CORNER, CornerType.TopRight),
+    (CORNER, CornerType.BottomRight),
+    (CORNER, CornerType.BottomLeft),
+)
+
+# Piece corners are pulled this far towards the piece so corners lying exactly on
+# the outline, like a border half against the edge of a rectangle, count as inside.
+EPSILON = 1e-6
+
+# Sides of the polygon that stands in for a circle, it stays within 0.07% of the
+# radius of the circle.
+CIRCLE_SEGMENTS = 90
+
+# An edge running through a piece is an edge of the outline when the points this
+# far to either side of it are not both in or both out of the outline.
+SIDE_STEP = 1e-5
+
+
+def _require_numpy():
+    if np is None:
+        raise RuntimeError('The hex grid engine needs numpy, which is not installed')
+
+
+class Polygon:
+    """Simple polygon given by its corners, in either winding."""
+
+    def __init__(self, points: Sequence[Tuple[float, float]]):
+        if len(points) < 3:
+            raise ValueError('A polygon needs at least three points')
+        self.points = tuple((float(x), float(y)) for x, y in points)
+
+    @property
+    def bounds(self) -> Tuple[float, float, float, float]:
+        xs = [x for x, _ in self.points]
+        ys = [y for _, y in self.points]
+        return min(xs), min(ys), max(xs), max(ys)
+
+    def edges(self):
+        return zip(self.points, self.points[1:] + self.points[:1])
+
+    def contains(self, x, y):
+        """Even-odd test of every point of the x and y arrays at once.
+
+        The points are sorted by y once, so each edge only looks at the slice of
+        points within its own height instead of all of them.
+        """
+        minX, minY, maxX, maxY = self.bounds
+        inside = np.zeros(x.shape, dtype=bool)
+        candidates = (x >= minX) & (x <= maxX) & (y >= minY) & (y <= maxY)
+        px = x[candidates]
+        py = y[candidates]
+        crossings = np.zeros(px.shape, dtype=bool)
+
+        order = np.argsort(py, kind='stable')
+        sortedY = py[order]
+        x1, y1 = self.points[-1]
+        for x2, y2 in self.points:
+            if y1 != y2:
+                start, end = np.searchsorted(sortedY, (min(y1, y2), max(y1, y2)))
+                spanned = order[start:end]
+                edgeX = x1 + (py[spanned] - y1) * ((x2 - x1) / (y2 - y1))
+                crossings[spanned] ^= px[spanned] < edgeX
+            x1, y1 = x2, y2
+
+        inside[candidates] = crossings
+        return inside
+
+
+class Circle(Polygon):
+    """The polygon of CIRCLE_SEGMENTS sides inscribed in a circle."""
+
+    def __init__(self, x: float, y: float, radius: float):
+        if radius <= 0:
+            raise ValueError('A circle needs a positive radius')
+        self.x = float(x)
+        self.y = float(y)
+        self.radius = float(radius)
+        super().__init__([(self.x + self.radius * math.cos(2 * math.pi * i / CIRCLE_SEGMENTS),
+                           self.y + self.radius * math.sin(2 * math.pi * i / CIRCLE_SEGMENTS))
+                          for i in range(CIRCLE_SEGMENTS)])
+
+
+class Rectangle:
+    def __init__(self, x: float, y: float, width: float, height: float):
+        if width <= 0 or height <= 0:
+            raise ValueError('A rectangle needs a positive width and height')
+        self.x = float(x)
+        self.y = float(y)
+        self.width = float(width)
+        self.height = float(height)
+
+    @property
+    def bounds(self) -> Tuple[float, float, float, float]:
+        return self.x, self.y, self.x + self.width, self.y + self.height
+
+    def edges(self):
+        minX, minY, maxX, maxY = self.bounds
+        points = ((minX, minY), (maxX, minY), (maxX, maxY), (minX, maxY))
+        return zip(points, points[1:] + points[:1])
+
+    def contains(self, x, y):
+        minX, minY, maxX, maxY = self.bounds
+        return (x >= minX) & (x <= maxX) & (y >= minY) & (y <= maxY)
+
+
+@dataclass(frozen=True)
+class Outline:
+    """The wall area, the union of shapes minus the union of cut-outs."""
+    shapes: Tuple = ()
+    cutouts: Tuple = ()
+
+    @staticmethod
+    def rectangle(width: float, height: float) -> 'Outline':
+        return Outline((Rectangle(0.0, 0.0, width, height),))
+
+    @staticmethod
+    def polygon(points: Sequence[Tuple[float, float]]) -> 'Outline':
+        return Outline((Polygon(points),))
+
+    @staticmethod
+    def circle(x: float, y: float, radius: float) -> 'Outline':
+        return Outline((Circle(x, y, radius),))
+
+    def union(self, *shapes) -> 'Outline':
+        return Outline(self.shapes + tuple(shapes), self.cutouts)
+
+    def minus(self, *cutouts) -> 'Outline':
+        return Outline(self.shapes, self.cutouts + tuple(cutouts))
+
+    @property
+    def bounds(self) -> Tuple[float, float, float, float]:
+        if not self.shapes:
+            raise ValueError('The outline has no shapes')
+        allBounds = [shape.bounds for shape in self.shapes]
+        return (min(b[0] for b in allBounds), min(b[1] for b in allBounds),
+                max(b[2] for b in allBounds), max(b[3] for b in allBounds))
+
+    def edges(self):
+        """Edges of every shape and cut-out, including those that lie inside another shape."""
+        for shape in self.shapes + self.cutouts:
+            yield from shape.edges()
+
+    def contains(self, x, y):
+        inside = np.zeros(x.shape, dtype=bool)
+        for shape in self.shapes:
+            inside |= shape.contains(x, y)
+        for cutout in self.cutouts:
+            inside &= ~cutout.contains(x, y)
+        return inside
+
+
+def _shape(kind: str, values):
+    if kind in ('rect', 'rectangle') and len(values) == 4:
+        return Rectangle(*values)
+    if kind == 'circle' and len(values) == 3:
+        return Circle(*values)
+    if kind == 'polygon' and len(values) >= 6 and len(values) % 2 == 0:
+        return Polygon(list(zip(values[0::2], values[1::2])))
+    raise ValueError(f'Outline shapes are "polygon x1 y1 x2 y2 x3 y3 ...", "rect x y width height" or '
+                     f'"circle x y radius", not "{kind}" with {len(values)} values')
+
+
+def parse_outline(text: str) -> Optional[Outline]:
+    """Reads semicolon separated shapes, a "-" in front of a shape cuts it out. None for empty text."""
+    parts = []
+    cutouts = []
+    for entry in text.split(';'):
+        words = entry.replace(',', ' ').split()
+        if not words:
+            continue
+        cutout = words[0].startswith('-')
+        if words[0] == '-':
+            words = words[1:]
+        kind = words[0].lstrip('-').lower() if words else ''
+        try:
+            values = [float(word) for word in words[1:]]
+        except ValueError:
+            raise ValueError(f'Outline shape "{entry.strip()}" has a value that is not a number')
+        (cutouts if cutout else parts).append(_shape(kind, values))
+
+    if not parts:
+        if cutouts:
+            raise ValueError('An outline needs a shape that is not cut out')
+        return None
+    return Outline(tuple(parts), tuple(cutouts))
+
+
+@dataclass(frozen=True)
+class Lattice:
+    """Cell centers of the hex grid.
+
+    Column c, row r is centered at (x + c * HORIZONTAL_SPACING / 2,
+    y + r * VERTICAL_SPACING), odd columns shifted up by odd_offset.
+    """
+    x: float = SIDE_LENGTH
+    y: float = OUTER_RADIUS
+    odd_offset: float = OUTER_RADIUS
+
+
+def lattice_for_plan(plan: LayoutPlan) -> Lattice:
+    """The lattice the cells and borders of a rectangular plan sit on."""
+    first = plan.first_pattern.origin
+    second = plan.second_pattern.origin
+    return Lattice(first.x, first.y, second.y - first.y)
+
+
+def _piece_offsets():
+    """Corner offsets of every piece from the cell center, and the piece of each."""
+    offsets = []
+    for kind, type in PIECES:
+        outer, _ = shapes.master_loops(shapes.master_for(KIND_NAMES[kind], type))
+        if kind == BORDER:
+            placement = border_placement(type, 0.0, 0.0)
+        elif kind == CORNER:
+            placement = corner_placement(type, 0.0, 0.0)
+        else:
+            placement = None
+        points = [placement.apply(x, y) for x, y in outer] if placement else outer
+
+        centerX = sum(x for x, _ in points) / len(points)
+        centerY = sum(y for _, y in points) / len(points)
+        offsets.append([(x + (centerX - x) * EPSILON, y + (centerY - y) * EPSILON) for x, y in points])
+    return offsets
+
+
+_PIECE_OFFSETS = _piece_offsets()
+
+
+@dataclass(frozen=True)
+class GridPlan:
+    """Classified lattice cells, one entry per cell that holds a piece."""
+    outline: Outline
+    lattice: Lattice
+    x: 'np.ndarray'
+    y: 'np.ndarray'
+    kind: 'np.ndarray'
+    type: 'np.ndarray'
+
+    @property
+    def cell_count(self) -> int:
+        return int(np.count_nonzero(self.kind == CELL))
+
+    @property
+    def border_count(self) -> int:
+        return int(np.count_nonzero(self.kind == BORDER))
+
+    @property
+    def corner_count(self) -> int:
+        return int(np.count_nonzero(self.kind == CORNER))
+
+    @property
+    def tile_count(self) -> int:
+        return len(self.kind)
+
+    def tiles(self) -> Iterator[Tile]:
+        """Cells first, then borders, then corners, like LayoutPlan.tiles."""
+        for kind in (CELL, BORDER, CORNER):
+            for index in np.flatnonzero(self.kind == kind):
+                x = float(self.x[index])
+                y = float(self.y[index])
+                if kind == CELL:
+                    yield Tile('cell', None, Placement(x, y))
+                elif kind == BORDER:
+                    type = BorderType(int(self.type[index]))
+                    yield Tile('border', type, border_placement(type, x, y))
+                else:
+                    type = CornerType(int(self.type[index]))
+                    yield Tile('corner', type, corner_placement(type, x, y))
+
+
+def lattice_centers(outline: Outline, lattice: Lattice):
+    """Centers of every lattice cell that can touch the outline, as a columns x rows grid."""
+    minX, minY, maxX, maxY = outline.bounds
+    columnStep = HORIZONTAL_SPACING / 2
+
+    firstColumn = math.floor((minX - SIDE_LENGTH - lattice.x) / columnStep)
+    lastColumn = math.ceil((maxX + SIDE_LENGTH - lattice.x) / columnStep)
+    lowest = min(0.0, lattice.odd_offset)
+    highest = max(0.0, lattice.odd_offset)
+    firstRow = math.floor((minY - OUTER_RADIUS - highest - lattice.y) / VERTICAL_SPACING)
+    lastRow = math.ceil((maxY + OUTER_RADIUS - lowest - lattice.y) / VERTICAL_SPACING)
+
+    columns = np.arange(firstColumn, lastColumn + 1)
+    rows = np.arange(firstRow, lastRow + 1)
+    x = lattice.x + columns * columnStep
+    y = lattice.y + rows * VERTICAL_SPACING
+    centersX = np.repeat(x[:, None], len(rows), axis=1)
+    centersY = y[None, :] + np.where(columns % 2 == 1, lattice.odd_offset, 0.0)[:, None]
+    return centersX, centersY
+
+
+def _outline_edges(outline: Outline, x, y):
+    """Every edge of the outline with the indices of the cells it can reach into."""
+    near = []
+    for (x1, y1), (x2, y2) in outline.edges():
+        if x1 == x2 and y1 == y2:
+            continue
+        reach = ((x >= min(x1, x2) - SIDE_LENGTH) & (x <= max(x1, x2) + SIDE_LENGTH)
+                 & (y >= min(y1, y2) - OUTER_RADIUS) & (y <= max(y1, y2) + OUTER_RADIUS))
+        indices = np.flatnonzero(reach)
+        if len(indices):
+            near.append((x1, y1, x2, y2, indices))
+    return near
+
+
+def _crossed(outline: Outline, near, x, y, candidates, offsets):
+    """Marks the candidate pieces, given by their corner offsets, that an edge of the outline runs through."""
+    crossed = np.zeros(len(x), dtype=bool)
+    loop = np.array(offsets, dtype=float)
+    following = np.roll(loop, -1, axis=0)
+    winding = 1.0 if np.sum(loop[:, 0] * following[:, 1] - following[:, 0] * loop[:, 1]) >= 0 else -1.0
+    # a point is inside the convex piece when it is above the level of every side along its inward normal
+    normals = np.stack([loop[:, 1] - following[:, 1], following[:, 0] - loop[:, 0]], axis=1) * winding
+    levels = np.sum(normals * loop, axis=1)
+
+    for x1, y1, x2, y2, indices in near:
+        indices = indices[candidates[indices] & ~crossed[indices]]
+        if not len(indices):
+            continue
+
+        # the part of the edge inside each piece, from start to end along the edge
+        dx, dy = x2 - x1, y2 - y1
+        start = np.zeros(len(indices))
+        end = np.ones(len(indices))
+        for (nx, ny), level in zip(normals, levels):
+            height = nx * (x1 - x[indices]) + ny * (y1 - y[indices]) - level
+            slope = nx * dx + ny * dy
+            if slope > 0:
+                start = np.maximum(start, -height / slope)
+            elif slope < 0:
+                end = np.minimum(end, -height / slope)
+            else:
+                end = np.where(height > 0, end, -1.0)
+        through = start < end
+        if not through.any():
+            continue
+
+        # it only counts when it is an edge of the outline at all, not one shape inside another
+        indices = indices[through]
+        middle = (start[through] + end[through]) / 2
+        middleX = x1 + middle * dx
+        middleY = y1 + middle * dy
+        length = math.hypot(dx, dy)
+        sideX = -dy / length * SIDE_STEP
+        sideY = dx / length * SIDE_STEP
+        crossed[indices] = (outline.contains(middleX + sideX, middleY + sideY)
+                            != outline.contains(middleX - sideX, middleY - sideY))
+    return crossed
+
+
+def plan_outline(outline: Outline, lattice: Optional[Lattice] = None) -> GridPlan:
+    """Classifies every lattice cell against the outline in one batched pass."""
+    _require_numpy()
+    lattice = lattice or Lattice()
+
+    centersX, centersY = lattice_centers(outline, lattice)
+    x = centersX.ravel()
+    y = centersY.ravel()
+
+    # every distinct piece corner is tested once for all cells
+    unique = {}
+    for offsets in _PIECE_OFFSETS:
+        for offset in offsets:
+            unique.setdefault((round(offset[0], 9), round(offset[1], 9)), len(unique))
+    offsetArray = np.array(list(unique), dtype=float)
+    pointsX = (x[:, None] + offsetArray[:, 0][None, :]).ravel()
+    pointsY = (y[:, None] + offsetArray[:, 1][None, :]).ravel()
+    inside = outline.contains(pointsX, pointsY).reshape(len(x), len(unique))
+
+    kind = np.zeros(len(x), dtype=np.int8)
+    type = np.zeros(len(x), dtype=np.int8)
+    near = _outline_edges(outline, x, y)
+
+    for (pieceKind, pieceType), offsets in zip(PIECES, _PIECE_OFFSETS):
+        columns = [unique[(round(ox, 9), round(oy, 9))] for ox, oy in offsets]
+        fits = inside[:, columns].all(axis=1) & (kind == EMPTY)
+        fits &= ~_crossed(outline, near, x, y, fits, offsets)
+        kind[fits] = pieceKind
+        if pieceType is not None:
+            type[fits] = pieceType.value
+
+    keep = kind != EMPTY
+    return GridPlan(outline, lattice, x[keep], y[keep], kind[keep], type[keep])
@@ -0,0 +1,354 @@
+"""Placement planning for honeycomb storage walls.
+
+This module is plain python and does not import adsk, so a wall can be planned
+(and inspected) without Fusion running. All distances are in centimeters like
+the rest of the add-in.
+
+The first full cell sits in the lower left of the wall. A second cell is placed
+half a row above it (or half a row below when there are side borders) and both
+are repeated with a rectangular pattern. Borders are runs of half combs along
+an edge and corners are single quarter combs.
+"""
+
+import functools
+import math
+from dataclasses import dataclass
+from typing import Iterator, Optional, Tuple, Union
+
+from .constants import *
+
+# Rotation and mirroring applied to the master half / quarter comb to get each
+# orientation. Mirroring flips the tile across its vertical axis before it is rotated.
+# The BOTTOM and LEFT halves, and the TopLeft quarter, are the unrotated masters.
+BORDER_ORIENTATIONS = {
+    BorderType.BOTTOM: (0.0, False),
+    BorderType.TOP: (math.pi, False),
+    BorderType.LEFT: (0.0, False),
+    BorderType.RIGHT: (math.pi, False),
+}
+
+CORNER_ORIENTATIONS = {
+    CornerType.TopLeft: (0.0, False),
+    CornerType.TopRight: (0.0, True),
+    CornerType.BottomRight: (math.pi, False),
+    CornerType.BottomLeft: (math.pi, True),
+}
+
+
+@dataclass(frozen=True)
+class WallSpec:
+    width: float
+    height: float
+    bottom_border: bool = False
+    top_border: bool = False
+    left_border: bool = False
+    right_border: bool = False
+    do_corners: bool = True
+
+    @property
+    def side_borders(self) -> bool:
+        return self.left_border or self.right_border
+
+    @property
+    def any_border(self) -> bool:
+        return self.bottom_border or self.top_border or self.left_border or self.right_border
+
+
+@dataclass(frozen=True)
+class Placement:
+    """Center of a tile in the wall plane plus its orientation."""
+    x: float
+    y: float
+    rotation: float = 0.0
+    mirrored: bool = False
+
+    def translated(self, dx: float, dy: float) -> 'Placement':
+        return Placement(self.x + dx, self.y + dy, self.rotation, self.mirrored)
+
+    def apply(self, x: float, y: float) -> Tuple[float, float]:
+        """Maps a point given relative to the tile center into wall coordinates."""
+        if self.mirrored:
+            x = -x
+        if self.rotation:
+            cos = math.cos(self.rotation)
+            sin = math.sin(self.rotation)
+            x, y = x * cos - y * sin, x * sin + y * cos
+        return self.x + x, self.y + y
+
+
+@dataclass(frozen=True)
+class CellPattern:
+    """A rectangular pattern of full cells, rows go up and columns go right."""
+    origin: Placement
+    rows: int
+    columns: int
+
+    @property
+    def count(self) -> int:
+        return max(self.rows, 0) * max(self.columns, 0)
+
+    def placements(self) -> Iterator[Placement]:
+        for column in range(self.columns):
+            for row in range(self.rows):
+                yield self.origin.translated(column * HORIZONTAL_SPACING, row * VERTICAL_SPACING)
+
+
+@dataclass(frozen=True)
+class BorderRun:
+    """A line of half combs along one edge of the wall."""
+    type: BorderType
+    origin: Placement
+    count: int
+
+    @property
+    def step(self) -> Tuple[float, float]:
+        if self.type in (BorderType.BOTTOM, BorderType.TOP):
+            return HORIZONTAL_SPACING, 0.0
+        return 0.0, VERTICAL_SPACING
+
+    def placements(self) -> Iterator[Placement]:
+        dx, dy = self.step
+        for index in range(self.count):
+            yield self.origin.translated(dx * index, dy * index)
+
+
+@dataclass(frozen=True)
+class CornerPiece:
+    type: CornerType
+    placement: Placement
+
+
+@dataclass(frozen=True)
+class Tile:
+    """A single piece of the wall. kind is 'cell', 'border' or 'corner'."""
+    kind: str
+    type: Optional[Union[BorderType, CornerType]]
+    placement: Placement
+
+
+@dataclass(frozen=True)
+class LayoutPlan:
+    spec: WallSpec
+    x_offset: float
+    y_offset: float
+    first_pattern: CellPattern
+    second_pattern: CellPattern
+    borders: Tuple[BorderRun, ...]
+    corners: Tuple[CornerPiece, ...]
+
+    @property
+    def layout_key(self) -> tuple:
+        """Identifies the tiles of the plan but not the exact wall size.
+
+        Two walls whose sizes round down to the same cell counts share a key,
+        every tile position follows from the border flags and the counts.
+        """
+        spec = self.spec
+        return (
+            spec.bottom_border, spec.top_border, spec.left_border, spec.right_border, spec.do_corners,
+            self.first_pattern.rows, self.first_pattern.columns,
+            self.second_pattern.rows, self.second_pattern.columns,
+            tuple((run.type.value, run.count) for run in self.borders),
+            tuple(corner.type.value for corner in self.corners),
+        )
+
+    @property
+    def cell_count(self) -> int:
+        return self.first_pattern.count + self.second_pattern.count
+
+    @property
+    def border_count(self) -> int:
+        return sum(max(run.count, 0) for run in self.borders)
+
+    @property
+    def tile_count(self) -> int:
+        return self.cell_count + self.border_count + len(self.corners)
+
+    def border(self, type: BorderType) -> Optional[BorderRun]:
+        for run in self.borders:
+            if run.type == type:
+                return run
+        return None
+
+    def cells(self) -> Iterator[Tile]:
+        for pattern in (self.first_pattern, self.second_pattern):
+            for placement in pattern.placements():
+                yield Tile('cell', None, placement)
+
+    def border_tiles(self) -> Iterator[Tile]:
+        for run in self.borders:
+            for placement in run.placements():
+                yield Tile('border', run.type, placement)
+
+    def corner_tiles(self) -> Iterator[Tile]:
+        for corner in self.corners:
+            yield Tile('corner', corner.type, corner.placement)
+
+    def tiles(self) -> Iterator[Tile]:
+        yield from self.cells()
+        yield from self.border_tiles()
+        yield from self.corner_tiles()
+
+
+def border_placement(type: BorderType, x: float, y: float) -> Placement:
+    rotation, mirrored = BORDER_ORIENTATIONS[type]
+    return Placement(x, y, rotation, mirrored)
+
+
+def corner_placement(type: CornerType, x: float, y: float) -> Placement:
+    rotation, mirrored = CORNER_ORIENTATIONS[type]
+    return Placement(x, y, rotation, mirrored)
+
+
+def piece_tile(kind: str, type, x: float, y: float) -> Tile:
+    """A cell, border or corner tile centered on x, y in its usual orientation."""
+    if kind == 'border':
+        return Tile(kind, type, border_placement(type, x, y))
+    if kind == 'corner':
+        return Tile(kind, type, corner_placement(type, x, y))
+    return Tile(kind, type, Placement(x, y))
+
+
+@functools.lru_cache(maxsize=64)
+def plan_layout(spec: WallSpec) -> LayoutPlan:
+    """Computes where every cell, border and corner of a wall goes."""
+    width = spec.width
+    height = spec.height
+    sideBordersExist = spec.side_borders
+
+    xOffset = 0.0
+    yOffset = 0.0
+
+    if sideBordersExist:
+        yOffset = VERTICAL_SPACING / 2
+    if spec.left_border:
+        xOffset = HORIZONTAL_SPACING / 6
+
+    firstPatternVerticalQuantity = math.floor((height-yOffset) / VERTICAL_SPACING)
+    firstPatternHorizontalQuantity = math.floor(((width-xOffset) + HORIZONTAL_SPACING / 2) / HORIZONTAL_SPACING)
+    secondPatternVerticalQuantity = math.floor(((height-yOffset) - VERTICAL_SPACING / 2) / VERTICAL_SPACING)
+    if sideBordersExist:
+        #we need an additional one if there's a left border because it goes down into the offset
+        secondPatternVerticalQuantity += 1
+
+    secondPatternHorizontalQuantity = math.floor((width-xOffset) / HORIZONTAL_SPACING)
+
+    # the second cell is the first one mirrored to its upper right, or to its
+    # lower right when the side borders push the first column up
+    firstCenter = Placement(xOffset + SIDE_LENGTH, yOffset + OUTER_RADIUS)
+    secondCenter = firstCenter.translated(HORIZONTAL_SPACING / 2,
+                                          -OUTER_RADIUS if sideBordersExist else OUTER_RADIUS)
+
+    firstPattern = CellPattern(firstCenter, firstPatternVerticalQuantity, firstPatternHorizontalQuantity)
+    secondPattern = CellPattern(secondCenter, secondPatternVerticalQuantity, secondPatternHorizontalQuantity)
+
+    borders = []
+    corners = []
+
+    if spec.bottom_border:
+        xPos = xOffset + SIDE_LENGTH * 2.5
+        yPos = yOffset
+        if sideBordersExist:
+            xPos -= HORIZONTAL_SPACING/2
+            yPos -= yOffset
+
+        num_duplicates = secondPatternHorizontalQuantity
+        if sideBordersExist:
+            num_duplicates = firstPatternHorizontalQuantity
+
+        borders.append(BorderRun(BorderType.BOTTOM, border_placement(BorderType.BOTTOM, xPos, yPos), num_duplicates))
+
+    if spec.top_border:
+        firstEven = firstPatternVerticalQuantity % 2 == 0
+        secondEven = secondPatternVerticalQuantity % 2 == 0
+
+        doHorizontalShift = True
+
+        if (not firstEven) ^ (not secondEven):
+            doHorizontalShift = False
+
+        topBorderXOffset = 0
+        topBorderYOffset = 0
+
+        if sideBordersExist:
+            doHorizontalShift = not doHorizontalShift
+
+        if doHorizontalShift:
+            topBorderXOffset = (-1 * HORIZONTAL_SPACING / 2)
+            topBorderYOffset = (-1 * VERTICAL_SPACING / 2)
+
+        if sideBordersExist:
+            topBorderYOffset -= VERTICAL_SPACING
+
+        num_duplicates = secondPatternHorizontalQuantity
+        if doHorizontalShift:
+            num_duplicates = firstPatternHorizontalQuantity
+
+        borders.append(BorderRun(
+            BorderType.TOP,
+            border_placement(
+                BorderType.TOP,
+                xOffset + SIDE_LENGTH * 2.5 + topBorderXOffset,
+                yOffset + VERTICAL_SPACING*(secondPatternVerticalQuantity+1) + topBorderYOffset
+            ),
+            num_duplicates
+        ))
+
+    if spec.left_border:
+        leftCenter = border_placement(BorderType.LEFT, xOffset + SIDE_LENGTH * 2.5 - HORIZONTAL_SPACING, yOffset)
+        borders.append(BorderRun(BorderType.LEFT, leftCenter, secondPatternVerticalQuantity))
+
+        if spec.do_corners and firstPatternVerticalQuantity == secondPatternVerticalQuantity:
+            corners.append(CornerPiece(
+                CornerType.TopLeft,
+                corner_placement(CornerType.TopLeft, leftCenter.x,
+                                 leftCenter.y + VERTICAL_SPACING * firstPatternVerticalQuantity)
+            ))
+
+    if spec.right_border:
+        if firstPatternHorizontalQuantity == secondPatternHorizontalQuantity:
+            doVerticalShift = True
+        else:
+            doVerticalShift = False
+
+        borderXOffset = -1 * HORIZONTAL_SPACING * 1 / 6
+        borderYOffset = 0
+
+        if doVerticalShift:
+            borderXOffset = -1 * HORIZONTAL_SPACING * 2 / 3
+            borderYOffset = VERTICAL_SPACING / 2
+
+        rightCenter = border_placement(
+            BorderType.RIGHT,
+            xOffset + HORIZONTAL_SPACING*(secondPatternHorizontalQuantity+1) + borderXOffset,
+            yOffset + borderYOffset
+        )
+
+        num_duplicates = secondPatternVerticalQuantity
+        if doVerticalShift:
+            num_duplicates = firstPatternVerticalQuantity
+
+        borders.append(BorderRun(BorderType.RIGHT, rightCenter, num_duplicates))
+
+        if spec.do_corners and firstPatternHorizontalQuantity == secondPatternHorizontalQuantity:
+            corners.append(CornerPiece(
+                CornerType.BottomRight,
+                corner_placement(CornerType.BottomRight, rightCenter.x, rightCenter.y - VERTICAL_SPACING)
+            ))
+
+            if firstPatternVerticalQuantity != secondPatternVerticalQuantity:
+                corners.append(CornerPiece(
+                    CornerType.TopRight,
+                    corner_placement(CornerType.TopRight, rightCenter.x,
+                                     rightCenter.y + VERTICAL_SPACING*firstPatternVerticalQuantity)
+                ))
+
+    return LayoutPlan(
+        spec=spec,
+        x_offset=xOffset,
+        y_offset=yOffset,
+        first_pattern=firstPattern,
+        second_pattern=secondPattern,
+        borders=tuple(borders),
+        corners=tuple(corners),
+    )
@@ -0,0 +1,339 @@
+"""Triangle meshes of the wall tiles, streamed to binary STL or instanced 3MF.
+
+Every tile is the solid create_full_comb, create_half_comb or
+create_quarter_comb model: the outer loop from shapes.master_loops extruded to
+THICKNESS, the inner loop as the hole with the LIP_DEPTH lip cut INNER_OFFSET
+wider at the top, the inner chamfer at the foot of the lip and the bottom
+chamfer around the hole. Each master is triangulated once and every tile of a
+plan is written as a moved copy of it, tile by tile, so the whole wall is never
+held in memory. A 3MF file stores each tile variant as a single mesh object
+and every tile as a build item that only moves it into place.
+
+The two distances of a chamfer are taken as (across the face, down the wall).
+
+Plain python, no adsk, so walls can be exported on any machine:
+
+    cd lib && python -m honeycombStorageWallUtils.mesh 100 60 wall.stl --borders bottom,top
+    cd lib && python -m honeycombStorageWallUtils.mesh 100 60 wall.3mf --borders bottom,top
+"""
+
+import argparse
+import math
+import struct
+import zipfile
+from typing import Dict, Iterable, List, Tuple
+
+from .constants import *
+from .layout import Placement, Tile, WallSpec, border_placement, corner_placement, plan_layout
+from . import shapes
+
+Point3 = Tuple[float, float, float]
+Triangle = Tuple[Point3, Point3, Point3]
+
+# STL files are written in mm, the add-in works in cm.
+MM_PER_CM = 10.0
+
+_STL_HEADER = b'Honeycomb Storage Wall'.ljust(80, b' ')
+
+
+def offset_loop(loop, distance: float):
+    """Moves every edge of a counter clockwise convex loop outwards by distance."""
+    count = len(loop)
+    normals = []
+    for index in range(count):
+        x1, y1 = loop[index]
+        x2, y2 = loop[(index + 1) % count]
+        length = math.hypot(x2 - x1, y2 - y1)
+        normals.append(((y2 - y1) / length, (x1 - x2) / length))
+
+    result = []
+    for index in range(count):
+        nx1, ny1 = normals[index - 1]
+        nx2, ny2 = normals[index]
+        # the corner moves along the bisector, far enough for both edges to move by distance
+        scale = distance / (1.0 + nx1 * nx2 + ny1 * ny2)
+        x, y = loop[index]
+        result.append((x + (nx1 + nx2) * scale, y + (ny1 + ny2) * scale))
+    return result
+
+
+def tile_profile():
+    """Cross section of a tile wall as (loop, inset, z) from the outer bottom edge around.
+
+    loop is 'outer' or 'inner', inset how far the ring sits outside that loop.
+    """
+    lipBottom = THICKNESS + LIP_DEPTH
+    innerAcross, innerDown = INNER_CHAMFER_SIZES
+    bottomAcross, bottomUp = BOTTOM_CHAMFER_SIZES
+    return [
+        ('outer', 0.0, 0.0),
+        ('outer', 0.0, THICKNESS),
+        ('inner', INNER_OFFSET, THICKNESS),
+        ('inner', INNER_OFFSET, lipBottom),
+        ('inner', innerAcross, lipBottom),
+        ('inner', 0.0, lipBottom - innerDown),
+        ('inner', 0.0, bottomUp),
+        ('inner', bottomAcross, 0.0),
+    ]
+
+
+def master_triangles(master: str) -> List[Triangle]:
+    """Triangles of a master tile centered on the origin, counter clockwise seen from outside."""
+    outer, inner = shapes.master_loops(master)
+    rings = []
+    for loopName, inset, z in tile_profile():
+        loop = outer if loopName == 'outer' else inner
+        if inset:
+            loop = offset_loop(loop, inset)
+        rings.append([(x, y, z) for x, y in loop])
+
+    triangles = []
+    count = len(outer)
+    for ringIndex, ring in enumerate(rings):
+        nextRing = rings[(ringIndex + 1) % len(rings)]
+        for index in range(count):
+            a = ring[index]
+            b = ring[(index + 1) % count]
+            c = nextRing[(index + 1) % count]
+            d = nextRing[index]
+            triangles.append((a, b, c))
+            triangles.append((a, c, d))
+
+    # the profile runs the same way round for every master, make sure it faces out
+    if signed_volume(triangles) < 0:
+        triangles = [(a, c, b) for a, b, c in triangles]
+    return triangles
+
+
+def signed_volume(triangles: Iterable[Triangle]) -> float:
+    volume = 0.0
+    for (ax, ay, az), (bx, by, bz), (cx, cy, cz) in triangles:
+        volume += (ax * (by * cz - bz * cy) - ay * (bx * cz - bz * cx) + az * (bx * cy - by * cx)) / 6.0
+    return volume
+
+
+def _normal(a: Point3, b: Point3, c: Point3) -> Point3:
+    ux, uy, uz = b[0] - a[0], b[1] - a[1], b[2] - a[2]
+    vx, vy, vz = c[0] - a[0], c[1] - a[1], c[2] - a[2]
+    nx, ny, nz = uy * vz - uz * vy, uz * vx - ux * vz, ux * vy - uy * vx
+    length = math.sqrt(nx * nx + ny * ny + nz * nz)
+    if length == 0:
+        return 0.0, 0.0, 0.0
+    return nx / length, ny / length, nz / length
+
+
+def oriented_triangles(master: str, rotation: float, mirrored: bool, scale: float = 1.0) -> List[Triangle]:
+    """The master turned into one tile orientation around its center, mirroring keeps the faces outwards."""
+    placement = Placement(0.0, 0.0, rotation, mirrored)
+    triangles = []
+    for triangle in master_triangles(master):
+        points = []
+        for x, y, z in triangle:
+            x, y = placement.apply(x, y)
+            points.append((x * scale, y * scale, z * scale))
+        if mirrored:
+            points.reverse()
+        triangles.append(tuple(points))
+    return triangles
+
+
+class TileTemplates:
+    """STL records of every tile orientation, built on first use.
+
+    A record is the 13 values of one packed triangle; copies only add the tile
+    position to the vertex coordinates.
+    """
+
+    def __init__(self, scale: float = MM_PER_CM):
+        self.scale = scale
+        self._records: Dict[tuple, List[float]] = {}
+
+    def key(self, tile: Tile) -> tuple:
+        placement = tile.placement
+        return shapes.master_for(tile.kind, tile.type), round(placement.rotation, 9), placement.mirrored
+
+    def records(self, tile: Tile) -> List[float]:
+        key = self.key(tile)
+        records = self._records.get(key)
+        if records is None:
+            records = []
+            for a, b, c in oriented_triangles(*key, self.scale):
+                records.extend(_normal(a, b, c))
+                records.extend(a)
+                records.extend(b)
+                records.extend(c)
+                records.append(0)
+            self._records[key] = records
+        return records
+
+    def triangle_count(self, tile: Tile) -> int:
+        return len(self.records(tile)) // 13
+
+
+# Where the x and y of the three vertices sit in the 13 values of a record.
+_X_SLOTS = (3, 6, 9)
+_Y_SLOTS = (4, 7, 10)
+
+
+def write_stl(path: str, tiles: Iterable[Tile], scale: float = MM_PER_CM) -> int:
+    """Streams the tiles to a binary STL file. Returns the number of triangles written.
+
+    Only one tile is in memory at a time, the triangle count in the header is
+    filled in once everything is written.
+    """
+    templates = TileTemplates(scale)
+    structs = {}
+    count = 0
+    with open(path, 'wb') as file:
+        file.write(_STL_HEADER)
+        file.write(struct.pack('<I', 0))
+        for tile in tiles:
+            records = templates.records(tile)
+            triangles = len(records) // 13
+            packer = structs.get(triangles)
+            if packer is None:
+                packer = structs[triangles] = struct.Struct('<' + '12fH' * triangles)
+
+            x = tile.placement.x * scale
+            y = tile.placement.y * scale
+            values = records[:]
+            for slot in _X_SLOTS:
+                values[slot::13] = [value + x for value in records[slot::13]]
+            for slot in _Y_SLOTS:
+                values[slot::13] = [value + y for value in records[slot::13]]
+            file.write(packer.pack(*values))
+            count += triangles
+
+        file.seek(80)
+        file.write(struct.pack('<I', count))
+    return count
+
+
+def write_wall_stl(path: str, spec: WallSpec, scale: float = MM_PER_CM) -> int:
+    return write_stl(path, plan_layout(spec).tiles(), scale)
+
+
+_3MF_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="model" ContentType="application/vnd.ms-package.3dmanufacturing-3dmodel+xml"/>'
+    '</Types>\n'
+)
+
+_3MF_RELATIONSHIPS = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Target="/3D/3dmodel.model" Id="rel0" '
+    'Type="http://schemas.microsoft.com/3dmanufacturing/2013/01/3dmodel"/>'
+    '</Relationships>\n'
+)
+
+# Build items are written to the model in chunks of this many tiles.
+_3MF_CHUNK = 1024
+
+
+def tile_variants() -> List[Tile]:
+    """One tile of every variant centered on the origin: the cell, each border and each corner."""
+    variants = [Tile('cell', None, Placement(0.0, 0.0))]
+    variants += [Tile('border', type, border_placement(type, 0.0, 0.0)) for type in BorderType]
+    variants += [Tile('corner', type, corner_placement(type, 0.0, 0.0)) for type in CornerType]
+    return variants
+
+
+def variant_name(tile: Tile) -> str:
+    if tile.kind == 'cell':
+        return 'Honeycomb Cell'
+    if tile.kind == 'border':
+        return 'Honeycomb Border ' + tile.type.name.capitalize()
+    return 'Honeycomb Corner ' + tile.type.name
+
+
+def _mesh_object(objectId: int, tile: Tile, scale: float) -> str:
+    """A 3MF object holding the indexed mesh of one tile variant."""
+    placement = tile.placement
+    master = shapes.master_for(tile.kind, tile.type)
+    vertices = {}
+    triangles = []
+    for triangle in oriented_triangles(master, placement.rotation, placement.mirrored, scale):
+        indices = []
+        for point in triangle:
+            key = tuple(round(value, 6) for value in point)
+            if key not in vertices:
+                vertices[key] = len(vertices)
+            indices.append(vertices[key])
+        triangles.append(indices)
+
+    lines = [f'<object id="{objectId}" type="model" name="{variant_name(tile)}"><mesh><vertices>']
+    lines += [f'<vertex x="{x:.6g}" y="{y:.6g}" z="{z:.6g}"/>' for x, y, z in vertices]
+    lines.append('</vertices><triangles>')
+    lines += [f'<triangle v1="{a}" v2="{b}" v3="{c}"/>' for a, b, c in triangles]
+    lines.append('</triangles></mesh></object>')
+    return '\n'.join(lines) + '\n'
+
+
+def write_3mf(path: str, tiles: Iterable[Tile], scale: float = MM_PER_CM) -> int:
+    """Writes the tiles to a 3MF file with one mesh per tile variant. Returns the number of build items.
+
+    Every variant is written up front whether the wall uses it or not, so the
+    tiles can be streamed as build items in a single pass.
+    """
+    variants = tile_variants()
+    objectIds = {}
+    count = 0
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('[Content_Types].xml', _3MF_CONTENT_TYPES)
+        archive.writestr('_rels/.rels', _3MF_RELATIONSHIPS)
+
+        with archive.open('3D/3dmodel.model', 'w', force_zip64=True) as model:
+            model.write(b'<?xml version="1.0" encoding="UTF-8"?>\n'
+                        b'<model unit="millimeter" xml:lang="en-US" '
+                        b'xmlns="http://schemas.microsoft.com/3dmanufacturing/core/2015/02">\n<resources>\n')
+            for objectId, variant in enumerate(variants, start=1):
+                model.write(_mesh_object(objectId, variant, scale).encode('utf-8'))
+                objectIds[(variant.kind, variant.type)] = objectId
+            model.write(b'</resources>\n<build>\n')
+
+            lines = []
+            for tile in tiles:
+                objectId = objectIds[(tile.kind, tile.type)]
+                x = tile.placement.x * scale
+                y = tile.placement.y * scale
+                lines.append(f'<item objectid="{objectId}" transform="1 0 0 0 1 0 0 0 1 {x:.6g} {y:.6g} 0"/>\n')
+                if len(lines) == _3MF_CHUNK:
+                    model.write(''.join(lines).encode('utf-8'))
+                    count += len(lines)
+                    lines = []
+            model.write(''.join(lines).encode('utf-8'))
+            count += len(lines)
+            model.write(b'</build>\n</model>\n')
+    return count
+
+
+def write_wall_3mf(path: str, spec: WallSpec, scale: float = MM_PER_CM) -> int:
+    return write_3mf(path, plan_layout(spec).tiles(), scale)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Writes a honeycomb storage wall as a binary STL or a 3MF file.')
+    parser.add_argument('width', type=float, help='wall width in cm')
+    parser.add_argument('height', type=float, help='wall height in cm')
+    parser.add_argument('path', help='.stl or .3mf file to write, in mm')
+    parser.add_argument('--borders', default='', help='comma separated: bottom, top, left, right')
+    parser.add_argument('--no-corners', action='store_true')
+    args = parser.parse_args(argv)
+
+    borders = {border.strip().lower() for border in args.borders.split(',') if border.strip()}
+    spec = WallSpec(args.width, args.height, 'bottom' in borders, 'top' in borders, 'left' in borders,
+                    'right' in borders, not args.no_corners)
+    if args.path.lower().endswith('.3mf'):
+        count = write_wall_3mf(args.path, spec)
+        print(f'Wrote {count} tiles to {args.path}')
+    else:
+        count = write_wall_stl(args.path, spec)
+        print(f'Wrote {count} triangles to {args.path}')
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
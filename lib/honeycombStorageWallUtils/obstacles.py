@@ -0,0 +1,248 @@
+"""Keep-out zones for outlets, switches and studs.
+
+Zones are rectangles or circles in wall coordinates (cm, origin in the lower
+left corner of the wall). A tile that overlaps a zone is replaced by the
+largest half or quarter comb of its cell that stays clear of every zone, or
+dropped when none does. Tiles are found through a spatial hash over their
+centers, so each zone only looks at the few tiles around it.
+
+Zones are typed into the dialog as "rect x y width height; circle x y radius",
+or loaded from a JSON file:
+
+    [{"type": "rect", "x": 10, "y": 4, "width": 7, "height": 11},
+     {"type": "circle", "x": 30, "y": 20, "radius": 2.5}]
+
+Plain python, no adsk.
+"""
+
+import collections
+import json
+import math
+from dataclasses import dataclass
+from typing import Iterator, List, Optional, Tuple, Union
+
+from .constants import *
+from .layout import LayoutPlan, Tile, piece_tile
+from . import shapes
+
+# Tiles touching a zone by less than this are left alone.
+TOLERANCE = 1e-6
+
+
+@dataclass(frozen=True)
+class KeepOutRect:
+    x: float
+    y: float
+    width: float
+    height: float
+
+    @property
+    def bounds(self) -> Tuple[float, float, float, float]:
+        return self.x, self.y, self.x + self.width, self.y + self.height
+
+    def contains(self, loop) -> bool:
+        minX, minY, maxX, maxY = self.bounds
+        return all(minX <= x <= maxX and minY <= y <= maxY for x, y in loop)
+
+    def overlaps(self, loop) -> bool:
+        """True when the convex loop and the rectangle share some area."""
+        minX, minY, maxX, maxY = self.bounds
+        if (max(x for x, _ in loop) <= minX + TOLERANCE or min(x for x, _ in loop) >= maxX - TOLERANCE
+                or max(y for _, y in loop) <= minY + TOLERANCE or min(y for _, y in loop) >= maxY - TOLERANCE):
+            return False
+
+        # separating axis test along the normals of the loop
+        corners = ((minX, minY), (maxX, minY), (maxX, maxY), (minX, maxY))
+        for (x1, y1), (x2, y2) in zip(loop, loop[1:] + loop[:1]):
+            nx, ny = y1 - y2, x2 - x1
+            length = math.hypot(nx, ny)
+            if length == 0:
+                continue
+            loopSide = [(x - x1) * nx + (y - y1) * ny for x, y in loop]
+            rectSide = [(x - x1) * nx + (y - y1) * ny for x, y in corners]
+            if (max(rectSide) <= min(loopSide) + TOLERANCE * length
+                    or min(rectSide) >= max(loopSide) - TOLERANCE * length):
+                return False
+        return True
+
+
+@dataclass(frozen=True)
+class KeepOutCircle:
+    x: float
+    y: float
+    radius: float
+
+    @property
+    def bounds(self) -> Tuple[float, float, float, float]:
+        return self.x - self.radius, self.y - self.radius, self.x + self.radius, self.y + self.radius
+
+    def contains(self, loop) -> bool:
+        return all(math.hypot(x - self.x, y - self.y) <= self.radius for x, y in loop)
+
+    def overlaps(self, loop) -> bool:
+        """True when the convex loop and the circle share some area."""
+        inside = True
+        for (x1, y1), (x2, y2) in zip(loop, loop[1:] + loop[:1]):
+            dx, dy = x2 - x1, y2 - y1
+            length = dx * dx + dy * dy
+            if length == 0:
+                continue
+            t = max(0.0, min(1.0, ((self.x - x1) * dx + (self.y - y1) * dy) / length))
+            if math.hypot(self.x - x1 - t * dx, self.y - y1 - t * dy) < self.radius - TOLERANCE:
+                return True
+            if (dx * (self.y - y1) - dy * (self.x - x1)) * _winding(loop) < 0:
+                inside = False
+        return inside
+
+
+KeepOut = Union[KeepOutRect, KeepOutCircle]
+
+
+def _winding(loop) -> float:
+    area = sum(x1 * y2 - x2 * y1 for (x1, y1), (x2, y2) in zip(loop, loop[1:] + loop[:1]))
+    return 1.0 if area >= 0 else -1.0
+
+
+def _zone(kind: str, values) -> KeepOut:
+    if kind in ('rect', 'rectangle') and len(values) == 4:
+        if values[2] <= 0 or values[3] <= 0:
+            raise ValueError('A keep-out rectangle needs a positive width and height')
+        return KeepOutRect(*values)
+    if kind == 'circle' and len(values) == 3:
+        if values[2] <= 0:
+            raise ValueError('A keep-out circle needs a positive radius')
+        return KeepOutCircle(*values)
+    raise ValueError(f'Keep-out zones are "rect x y width height" or "circle x y radius", not "{kind}" '
+                     f'with {len(values)} values')
+
+
+def parse_keep_outs(text: str) -> Tuple[KeepOut, ...]:
+    """Reads zones from the dialog: semicolon separated, or the path of a .json file."""
+    text = text.strip()
+    if not text:
+        return ()
+    if text.lower().endswith('.json'):
+        return load_keep_outs(text)
+
+    zones = []
+    for entry in text.split(';'):
+        words = entry.replace(',', ' ').split()
+        if not words:
+            continue
+        try:
+            values = [float(word) for word in words[1:]]
+        except ValueError:
+            raise ValueError(f'Keep-out zone "{entry.strip()}" has a value that is not a number')
+        zones.append(_zone(words[0].lower(), values))
+    return tuple(zones)
+
+
+def load_keep_outs(path: str) -> Tuple[KeepOut, ...]:
+    with open(path) as file:
+        data = json.load(file)
+    if isinstance(data, dict):
+        data = data.get('keep_outs', [])
+
+    zones = []
+    for item in data:
+        kind = str(item.get('type', '')).lower()
+        if kind == 'circle':
+            values = [item.get('x'), item.get('y'), item.get('radius')]
+        else:
+            values = [item.get('x'), item.get('y'), item.get('width'), item.get('height')]
+        if any(value is None for value in values):
+            raise ValueError(f'Keep-out zone {item} is missing a value')
+        zones.append(_zone(kind, [float(value) for value in values]))
+    return tuple(zones)
+
+
+class TileIndex:
+    """Spatial hash of tiles by center, one bucket per column and row of the hex lattice."""
+
+    BUCKET_WIDTH = HORIZONTAL_SPACING / 2
+    BUCKET_HEIGHT = VERTICAL_SPACING
+
+    def __init__(self, tiles):
+        self.tiles = list(tiles)
+        self._buckets = collections.defaultdict(list)
+        width, height = self.BUCKET_WIDTH, self.BUCKET_HEIGHT
+        for index, tile in enumerate(self.tiles):
+            placement = tile.placement
+            self._buckets[(math.floor(placement.x / width), math.floor(placement.y / height))].append(index)
+
+    def _key(self, x: float, y: float) -> Tuple[int, int]:
+        return math.floor(x / self.BUCKET_WIDTH), math.floor(y / self.BUCKET_HEIGHT)
+
+    def near(self, bounds) -> Iterator[int]:
+        """Indices of the tiles that can reach into the bounds, no tile reaches further than SIDE_LENGTH."""
+        minX, minY, maxX, maxY = bounds
+        firstColumn, firstRow = self._key(minX - SIDE_LENGTH, minY - SIDE_LENGTH)
+        lastColumn, lastRow = self._key(maxX + SIDE_LENGTH, maxY + SIDE_LENGTH)
+        for column in range(firstColumn, lastColumn + 1):
+            for row in range(firstRow, lastRow + 1):
+                yield from self._buckets.get((column, row), ())
+
+
+def replacement(tile: Tile, zones) -> Optional[Tile]:
+    """The largest piece of the tile's cell that fits in the tile and clears the zones."""
+    outer, _ = shapes.tile_loops(tile)
+    if any(zone.contains(outer) for zone in zones):
+        # every piece of the tile is inside the zone as well
+        return None
+
+    quarters = shapes.PIECE_QUARTERS[(tile.kind, tile.type)]
+    candidates = [key for key, covered in shapes.PIECE_QUARTERS.items() if covered < quarters]
+    candidates.sort(key=lambda key: -len(shapes.PIECE_QUARTERS[key]))
+
+    for kind, type in candidates:
+        piece = piece_tile(kind, type, tile.placement.x, tile.placement.y)
+        outer, _ = shapes.tile_loops(piece)
+        if not any(zone.overlaps(outer) for zone in zones):
+            return piece
+    return None
+
+
+@dataclass(frozen=True)
+class KeepOutLayout:
+    """A plan with the tiles hit by keep-out zones removed, and what replaces them."""
+    plan: LayoutPlan
+    zones: Tuple[KeepOut, ...]
+    removed: Tuple[Tile, ...]
+    added: Tuple[Tile, ...]
+
+    @property
+    def spec(self):
+        return self.plan.spec
+
+    @property
+    def layout_key(self) -> tuple:
+        return self.plan.layout_key + (self.zones,)
+
+    def tiles(self) -> Iterator[Tile]:
+        removed = set(self.removed)
+        for tile in self.plan.tiles():
+            if tile not in removed:
+                yield tile
+        yield from self.added
+
+
+def apply_keep_outs(plan: LayoutPlan, zones) -> KeepOutLayout:
+    """Finds the tiles of the plan that overlap a zone and what each one becomes."""
+    index = TileIndex(plan.tiles())
+    hits = collections.defaultdict(list)
+    for zone in zones:
+        for tileIndex in index.near(zone.bounds):
+            outer, _ = shapes.tile_loops(index.tiles[tileIndex])
+            if zone.overlaps(outer):
+                hits[tileIndex].append(zone)
+
+    removed: List[Tile] = []
+    added: List[Tile] = []
+    for tileIndex in sorted(hits):
+        tile = index.tiles[tileIndex]
+        removed.append(tile)
+        piece = replacement(tile, hits[tileIndex])
+        if piece is not None:
+            added.append(piece)
+
+    return KeepOutLayout(plan, tuple(zones), tuple(removed), tuple(added))
@@ -0,0 +1,130 @@
+"""Splits a wall into panels that fit on a print bed.
+
+Cuts run along hex seams of the lattice: a vertical cut goes through the
+centers of one column of cells, a horizontal cut through the centers of one
+row. Only the tiles centered on a cut straddle it, every other tile either
+stays clear of the line or ends flush on it. A straddling tile is handed out as
+the half or quarter comb on each side of the cut, the same BorderType and
+CornerType pieces the wall edges use, so the panels butt together into the
+whole wall and every panel edge is a proper border.
+
+    panels = split_panels(plan.tiles(), 25.6, 25.6)
+
+Sizes are in cm. Plain python, no adsk.
+"""
+
+import bisect
+from dataclasses import dataclass
+from typing import Iterable, List, Tuple
+
+from .layout import Tile, piece_tile
+from . import shapes
+
+# Tiles whose center is this close to a cut belong to the cut.
+TOLERANCE = 1e-6
+
+_LEFT = frozenset({'LL', 'UL'})
+_RIGHT = frozenset({'LR', 'UR'})
+_LOWER = frozenset({'LL', 'LR'})
+_UPPER = frozenset({'UL', 'UR'})
+_ALL = _LEFT | _RIGHT
+
+
+@dataclass(frozen=True)
+class Panel:
+    """One bed sized part of the wall. Tiles are in wall coordinates."""
+    column: int
+    row: int
+    bounds: Tuple[float, float, float, float]
+    pieces: Tuple[Tile, ...]
+
+    @property
+    def name(self) -> str:
+        return f'r{self.row + 1:02d}_c{self.column + 1:02d}'
+
+    @property
+    def size(self) -> Tuple[float, float]:
+        minX, minY, maxX, maxY = self.bounds
+        return maxX - minX, maxY - minY
+
+    def tiles(self):
+        return iter(self.pieces)
+
+    def placed_tiles(self):
+        """The tiles moved so the lower left corner of the panel is at the origin, ready to print."""
+        minX, minY, _, _ = self.bounds
+        for tile in self.pieces:
+            yield Tile(tile.kind, tile.type, tile.placement.translated(-minX, -minY))
+
+
+def wall_bounds(tiles: Iterable[Tile]) -> Tuple[float, float, float, float]:
+    minX = minY = float('inf')
+    maxX = maxY = float('-inf')
+    for tile in tiles:
+        outer, _ = shapes.tile_loops(tile)
+        for x, y in outer:
+            minX, maxX = min(minX, x), max(maxX, x)
+            minY, maxY = min(minY, y), max(maxY, y)
+    return minX, minY, maxX, maxY
+
+
+def _cuts(seams: List[float], start: float, end: float, size: float, axis: str) -> List[float]:
+    """Greedy cuts on the seams, each panel as wide as the bed allows."""
+    cuts = []
+    while end - start > size + TOLERANCE:
+        last = bisect.bisect_right(seams, start + size + TOLERANCE) - 1
+        if last < 0 or seams[last] <= start + TOLERANCE:
+            raise ValueError(f'The print bed is too small in {axis} to fit a single cell between two cuts')
+        start = seams[last]
+        cuts.append(start)
+    return cuts
+
+
+def _sides(value: float, cuts: List[float], before: frozenset, after: frozenset):
+    """(panel index, quarters) on either side of a cut through value, or the one panel it lies in."""
+    index = bisect.bisect_left(cuts, value - TOLERANCE)
+    if index < len(cuts) and abs(cuts[index] - value) <= TOLERANCE:
+        return ((index, before), (index + 1, after))
+    return ((index, _ALL),)
+
+
+def split_panels(tiles: Iterable[Tile], bedWidth: float, bedHeight: float) -> List[Panel]:
+    """Partitions the tiles into panels of at most bedWidth by bedHeight, row by row from the bottom left."""
+    if bedWidth <= 0 or bedHeight <= 0:
+        raise ValueError('The print bed needs a positive width and height')
+    tiles = list(tiles)
+    if not tiles:
+        return []
+
+    minX, minY, maxX, maxY = wall_bounds(tiles)
+    columns = sorted({round(tile.placement.x, 9) for tile in tiles})
+    rows = sorted({round(tile.placement.y, 9) for tile in tiles})
+    xCuts = _cuts(columns, minX, maxX, bedWidth, 'width')
+    yCuts = _cuts(rows, minY, maxY, bedHeight, 'height')
+
+    pieces = {}
+    for tile in tiles:
+        quarters = shapes.PIECE_QUARTERS[(tile.kind, tile.type)]
+        x, y = tile.placement.x, tile.placement.y
+        xSides = _sides(x, xCuts, _LEFT, _RIGHT)
+        ySides = _sides(y, yCuts, _LOWER, _UPPER)
+        if len(xSides) == 1 and len(ySides) == 1:
+            pieces.setdefault((xSides[0][0], ySides[0][0]), []).append(tile)
+            continue
+
+        for column, xQuarters in xSides:
+            for row, yQuarters in ySides:
+                kept = quarters & xQuarters & yQuarters
+                if kept:
+                    kind, type = shapes.QUARTER_PIECES[kept]
+                    pieces.setdefault((column, row), []).append(piece_tile(kind, type, x, y))
+
+    xEdges = [minX] + xCuts + [maxX]
+    yEdges = [minY] + yCuts + [maxY]
+    return [
+        Panel(column, row, (xEdges[column], yEdges[row], xEdges[column + 1], yEdges[row + 1]),
+              tuple(pieces[(column, row)]))
+        for row in range(len(yEdges) - 1)
+        for column in range(len(xEdges) - 1)
+        if (column, row) in pieces
+    ]
@@ -0,0 +1,67 @@
+import adsk.core
+import adsk.fusion
+
+from .constants import *
+from . import shapes
+from .layout import LayoutPlan
+
+CELL_COLOR = (240, 180, 20)
+BORDER_COLOR = (40, 120, 220)
+CORNER_COLOR = (220, 60, 60)
+BOUNDARY_COLOR = (120, 120, 120)
+
+
+def _solid_color(rgb):
+    return adsk.fusion.CustomGraphicsSolidColorEffect.create(adsk.core.Color.create(rgb[0], rgb[1], rgb[2], 255))
+
+
+def _add_loops(group: 'adsk.fusion.CustomGraphicsGroup', loops, z: float, rgb):
+    # every loop becomes one closed line strip, all of them share a single coordinate list
+    coordinates = []
+    stripLengths = []
+    for loop in loops:
+        for x, y in loop:
+            coordinates.extend((x, y, z))
+        x, y = loop[0]
+        coordinates.extend((x, y, z))
+        stripLengths.append(len(loop) + 1)
+
+    if not stripLengths:
+        return None
+
+    lines = group.addLines(adsk.fusion.CustomGraphicsCoordinates.create(coordinates), [], True, stripLengths)
+    lines.color = _solid_color(rgb)
+    return lines
+
+
+def wall_outline_loops(plan: LayoutPlan):
+    """Outline loops of the plan grouped by tile kind, in wall coordinates."""
+    loops = {'cell': [], 'border': [], 'corner': []}
+    for tile in plan.tiles():
+        outer, inner = shapes.tile_loops(tile)
+        loops[tile.kind].append(outer)
+        loops[tile.kind].append(inner)
+    return loops
+
+
+def draw_tile_outlines(component: 'adsk.fusion.Component', loops):
+    """Draws outline loops from wall_outline_loops as custom graphics on top of the wall.
+
+    Nothing is modelled, so this stays cheap for walls with thousands of cells.
+    Returns the custom graphics group, delete it to remove the outlines.
+    """
+    group = component.customGraphicsGroups.add()
+    z = THICKNESS
+
+    _add_loops(group, loops['cell'], z, CELL_COLOR)
+    _add_loops(group, loops['border'], z, BORDER_COLOR)
+    _add_loops(group, loops['corner'], z, CORNER_COLOR)
+
+    return group
+
+
+def draw_boundary(component: 'adsk.fusion.Component', width: float, height: float):
+    group = component.customGraphicsGroups.add()
+    boundary = [(0.0, 0.0), (width, 0.0), (width, height), (0.0, height)]
+    _add_loops(group, [boundary], 0.0, BOUNDARY_COLOR)
+    return group
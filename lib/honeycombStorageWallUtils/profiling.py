@@ -0,0 +1,129 @@
+"""Per stage timing of wall generation.
+
+A Profiler collects wall-clock time and the number of Fusion features created
+for each stage of a run. Stages nest, so the chamfers of the top border show up
+as "border TOP/chamfers". Inside a stage, split() closes the part of the stage
+since the last split, which times the steps of a long modelling function
+without wrapping each of them in a with block.
+
+The modelling code calls the module level stage() and split(), which do nothing
+unless a profiler was activated with session().
+
+Plain python, no adsk.
+"""
+
+import contextlib
+import json
+import time
+from typing import Callable, Dict, List, Optional
+
+
+class _Entry:
+    def __init__(self, depth: int):
+        self.depth = depth
+        self.calls = 0
+        self.seconds = 0.0
+        self.features = 0
+
+
+class Profiler:
+    def __init__(self, name: str, count_features: Callable[[], int] = None):
+        self.name = name
+        self._count_features = count_features or (lambda: 0)
+        self._entries: Dict[str, _Entry] = {}
+        # one [path, time of the last split, feature count at the last split] per open stage
+        self._stack: List[list] = []
+        self._start = time.perf_counter()
+        self._startFeatures = self._count_features()
+
+    def _entry(self, path: str) -> _Entry:
+        entry = self._entries.get(path)
+        if entry is None:
+            entry = self._entries[path] = _Entry(path.count('/'))
+        return entry
+
+    def _record(self, path: str, seconds: float, features: int):
+        entry = self._entry(path)
+        entry.calls += 1
+        entry.seconds += seconds
+        entry.features += features
+
+    def _path(self, name: str) -> str:
+        if self._stack:
+            return f'{self._stack[-1][0]}/{name}'
+        return name
+
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        path = self._path(name)
+        # added up front so a stage is listed before the stages nested in it
+        self._entry(path)
+        start = time.perf_counter()
+        startFeatures = self._count_features()
+        self._stack.append([path, start, startFeatures])
+        try:
+            yield
+        finally:
+            self._stack.pop()
+            self._record(path, time.perf_counter() - start, self._count_features() - startFeatures)
+
+    def split(self, name: str):
+        """Records the time since the last split (or the start) of the current stage as name."""
+        if not self._stack:
+            return
+        frame = self._stack[-1]
+        now = time.perf_counter()
+        features = self._count_features()
+        self._record(f'{frame[0]}/{name}', now - frame[1], features - frame[2])
+        frame[1] = now
+        frame[2] = features
+
+    def report(self) -> dict:
+        return {
+            'name': self.name,
+            'seconds': time.perf_counter() - self._start,
+            'features': self._count_features() - self._startFeatures,
+            'stages': [
+                {'stage': path, 'calls': entry.calls, 'seconds': entry.seconds, 'features': entry.features}
+                for path, entry in self._entries.items()
+            ],
+        }
+
+    def summary_lines(self) -> List[str]:
+        report = self.report()
+        lines = [f'{self.name}: {report["seconds"]:.3f}s, {report["features"]} features']
+        for path, entry in self._entries.items():
+            label = '  ' * (entry.depth + 1) + path.rsplit('/', 1)[-1]
+            lines.append(f'{label:<40} {entry.seconds:8.3f}s {entry.calls:5d}x {entry.features:6d} features')
+        return lines
+
+    def write_json(self, path: str):
+        with open(path, 'w') as file:
+            json.dump(self.report(), file, indent=2)
+
+
+# Profiler of the run in progress, if any.
+active: Optional[Profiler] = None
+
+
+@contextlib.contextmanager
+def session(name: str, count_features: Callable[[], int] = None):
+    """Activates a new Profiler for the duration of the with block and yields it."""
+    global active
+    previous = active
+    active = Profiler(name, count_features)
+    try:
+        yield active
+    finally:
+        active = previous
+
+
+def stage(name: str):
+    if active is None:
+        return contextlib.nullcontext()
+    return active.stage(name)
+
+
+def split(name: str):
+    if active is not None:
+        active.split(name)
@@ -0,0 +1,82 @@
+"""Progress and cancellation of a wall build.
+
+A build is applied in chunks: the cell patterns, each border run, each corner,
+every batch of a combine or union and every tile copied or placed. Between
+chunks the modelling code calls the module level advance() with the number of
+tiles it handled, which does nothing unless a Progress was activated with
+session(). The active Progress passes the count on to a report callback (a
+progress dialog) at most every REPORT_INTERVAL seconds, and raises Cancelled
+when the callback says the user cancelled, so the build stops at the next chunk.
+
+Plain python, no adsk.
+"""
+
+import contextlib
+import time
+from typing import Callable, Optional
+
+# Seconds between two reports, advance() is called for every tile of a big wall.
+REPORT_INTERVAL = 0.1
+
+
+class Cancelled(Exception):
+    """Raised by advance() once the user cancelled the build."""
+
+
+class Progress:
+    def __init__(self, total: int, report: Callable[[int, int, Optional[str]], bool] = None):
+        """report gets the work done, the total and a message, and returns False to cancel."""
+        self.total = max(total, 1)
+        self.done = 0
+        self.message = None
+        self._report = report
+        self._lastReport = 0.0
+
+    def advance(self, amount: int = 1, message: str = None):
+        self.done = min(self.total, self.done + amount)
+        if message is not None:
+            self.message = message
+        now = time.perf_counter()
+        if self._report is None or (now - self._lastReport < REPORT_INTERVAL and message is None):
+            return
+        self._lastReport = now
+        if self._report(self.done, self.total, self.message) is False:
+            raise Cancelled()
+
+
+# Progress of the build in progress, if any.
+active: Optional[Progress] = None
+
+
+@contextlib.contextmanager
+def session(total: int, report: Callable[[int, int, Optional[str]], bool] = None):
+    """Activates a new Progress for the duration of the with block and yields it."""
+    global active
+    previous = active
+    active = Progress(total, report)
+    try:
+        yield active
+    finally:
+        active = previous
+
+
+@contextlib.contextmanager
+def suspended():
+    """Runs the with block without progress, for work that can't be rolled back halfway."""
+    global active
+    previous = active
+    active = None
+    try:
+        yield
+    finally:
+        active = previous
+
+
+def advance(amount: int = 1, message: str = None):
+    if active is not None:
+        active.advance(amount, message)
+
+
+def total_work(tiles: int, combine: bool, copies: int = 1) -> int:
+    """Work of a build that places the tiles copies times and joins them when combine is set."""
+    return tiles * copies + (max(tiles - 1, 0) if combine else 0)
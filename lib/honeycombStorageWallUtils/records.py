@@ -0,0 +1,52 @@
+"""Generation parameters stored on the walls in a design.
+
+A wall built on the timeline keeps its WallSpec, the combine flag and the
+record returned by features.build_feature_wall as a JSON attribute on its
+Honeycomb_TopPlane, so running the command again can update it in place.
+"""
+
+import dataclasses
+import json
+
+import adsk.core
+import adsk.fusion
+
+from .layout import WallSpec
+
+ATTRIBUTE_GROUP = 'HoneycombStorageWall'
+ATTRIBUTE_NAME = 'wall'
+
+
+def save_wall_record(topPlane: 'adsk.fusion.ConstructionPlane', spec: WallSpec, combine: bool,
+                     baseSketch: 'adsk.fusion.Sketch', record: dict):
+    value = json.dumps({
+        'spec': dataclasses.asdict(spec),
+        'combine': combine,
+        'base_sketch': baseSketch.entityToken,
+        'features': record,
+    })
+    attribute = topPlane.attributes.itemByName(ATTRIBUTE_GROUP, ATTRIBUTE_NAME)
+    if attribute is not None:
+        attribute.value = value
+    else:
+        topPlane.attributes.add(ATTRIBUTE_GROUP, ATTRIBUTE_NAME, value)
+
+
+def find_wall_record(design: 'adsk.fusion.Design'):
+    """The most recently built wall of the design that can still be found.
+
+    Returns (topPlane, spec, combine, baseSketchToken, record) or None.
+    """
+    for attribute in reversed(design.findAttributes(ATTRIBUTE_GROUP, ATTRIBUTE_NAME)):
+        topPlane = attribute.parent
+        if topPlane is None or not topPlane.isValid:
+            continue
+
+        try:
+            stored = json.loads(attribute.value)
+            spec = WallSpec(**stored['spec'])
+        except (ValueError, KeyError, TypeError):
+            continue
+
+        return topPlane, spec, stored['combine'], stored['base_sketch'], stored['features']
+    return None
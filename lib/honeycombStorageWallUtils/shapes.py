@@ -0,0 +1,111 @@
+"""Plan view outlines of the wall tiles.
+
+Every tile is an outer loop and an inner loop (the hole), both given relative to
+the tile center in the orientation of the master tile: the whole cell, the
+BOTTOM half (split horizontally, keeps the upper half), the LEFT half (split
+vertically, keeps the right half) and the TopLeft quarter (keeps the lower right
+quarter). Split pieces keep a RADIUS_OFFSET wide bar along every cut, like
+create_half_comb and create_quarter_comb do.
+
+Plain python, no adsk.
+"""
+
+import math
+from typing import List, Tuple
+
+from .constants import *
+
+Point = Tuple[float, float]
+Loop = List[Point]
+
+CELL = 'cell'
+HALF_HORIZONTAL = 'half_horizontal'
+HALF_VERTICAL = 'half_vertical'
+QUARTER = 'quarter'
+
+MASTERS = (CELL, HALF_HORIZONTAL, HALF_VERTICAL, QUARTER)
+
+# Quarters of a cell each piece covers: lower/upper and left/right of the center.
+PIECE_QUARTERS = {
+    ('cell', None): frozenset({'LL', 'LR', 'UL', 'UR'}),
+    ('border', BorderType.BOTTOM): frozenset({'UL', 'UR'}),
+    ('border', BorderType.TOP): frozenset({'LL', 'LR'}),
+    ('border', BorderType.LEFT): frozenset({'UR', 'LR'}),
+    ('border', BorderType.RIGHT): frozenset({'UL', 'LL'}),
+    ('corner', CornerType.TopLeft): frozenset({'LR'}),
+    ('corner', CornerType.TopRight): frozenset({'LL'}),
+    ('corner', CornerType.BottomRight): frozenset({'UL'}),
+    ('corner', CornerType.BottomLeft): frozenset({'UR'}),
+}
+QUARTER_PIECES = {quarters: key for key, quarters in PIECE_QUARTERS.items()}
+
+_OUTER_SIDE = SIDE_LENGTH
+_INNER_SIDE = INNER_RADIUS * (2.0 * math.tan(math.pi/6))
+# how far the inner loop pulls back from a slanted side when it is cut by the bar
+_BAR_INSET = RADIUS_OFFSET / math.tan(math.pi/3)
+
+
+def hexagon(apothem: float) -> Loop:
+    """Flat topped hexagon, counter clockwise starting at the right hand vertex."""
+    side = apothem * (2.0 * math.tan(math.pi/6))
+    return [
+        (side, 0.0),
+        (side / 2, apothem),
+        (-side / 2, apothem),
+        (-side, 0.0),
+        (-side / 2, -apothem),
+        (side / 2, -apothem),
+    ]
+
+
+def master_loops(master: str) -> Tuple[Loop, Loop]:
+    """Returns (outer, inner) counter clockwise loops of a master tile.
+
+    The inner loop has the same number of points as the outer one and point i of
+    one faces point i of the other across the wall of the tile.
+    """
+    so = _OUTER_SIDE
+    si = _INNER_SIDE
+    ro = OUTER_RADIUS
+    ri = INNER_RADIUS
+    bar = RADIUS_OFFSET
+
+    if master == CELL:
+        return hexagon(OUTER_RADIUS), hexagon(INNER_RADIUS)
+
+    if master == HALF_HORIZONTAL:
+        outer = [(-so, 0.0), (so, 0.0), (so / 2, ro), (-so / 2, ro)]
+        inner = [(-si + _BAR_INSET, bar), (si - _BAR_INSET, bar), (si / 2, ri), (-si / 2, ri)]
+        return outer, inner
+
+    if master == HALF_VERTICAL:
+        outer = [(0.0, -ro), (so / 2, -ro), (so, 0.0), (so / 2, ro), (0.0, ro)]
+        inner = [(bar, -ri), (si / 2, -ri), (si, 0.0), (si / 2, ri), (bar, ri)]
+        return outer, inner
+
+    if master == QUARTER:
+        outer = [(0.0, -ro), (so / 2, -ro), (so, 0.0), (0.0, 0.0)]
+        inner = [(bar, -ri), (si / 2, -ri), (si - _BAR_INSET, -bar), (bar, -bar)]
+        return outer, inner
+
+    raise ValueError(f'Unknown master tile {master}')
+
+
+def master_for(kind: str, type=None) -> str:
+    """Which master tile a layout Tile of the given kind and type is made from."""
+    if kind == 'cell':
+        return CELL
+    if kind == 'border':
+        if type in (BorderType.BOTTOM, BorderType.TOP):
+            return HALF_HORIZONTAL
+        return HALF_VERTICAL
+    if kind == 'corner':
+        return QUARTER
+    raise ValueError(f'Unknown tile kind {kind}')
+
+
+def tile_loops(tile) -> Tuple[Loop, Loop]:
+    """Outer and inner loop of a layout Tile in wall coordinates."""
+    outer, inner = master_loops(master_for(tile.kind, tile.type))
+    placement = tile.placement
+    return [placement.apply(x, y) for x, y in outer], [placement.apply(x, y) for x, y in inner]
@@ -0,0 +1,299 @@
+import contextlib
+import hashlib
+
+import adsk.core
+import adsk.fusion
+
+from .constants import *
+from .diskcache import DiskCache
+from .layout import BORDER_ORIENTATIONS, CORNER_ORIENTATIONS, Placement
+from . import profiling, shapes, utils
+
+# Tile modelled for each master, every other orientation is a rotated or mirrored copy of it.
+MASTER_TILES = {
+    shapes.CELL: 'cell',
+    shapes.HALF_HORIZONTAL: BorderType.BOTTOM,
+    shapes.HALF_VERTICAL: BorderType.LEFT,
+    shapes.QUARTER: CornerType.TopLeft,
+}
+
+
+def geometry_key(version: str = '') -> str:
+    """Hash of every constant the shape of a finished tile depends on, and the add-in version when given."""
+    values = (
+        INNER_OFFSET, LIP_DEPTH, INNER_RADIUS, RADIUS_OFFSET, THICKNESS,
+        tuple(INNER_CHAMFER_SIZES), tuple(BOTTOM_CHAMFER_SIZES),
+    )
+    return hashlib.sha1(repr((version, values)).encode('utf-8')).hexdigest()[:16]
+
+
+def _file_name(name) -> str:
+    return name if isinstance(name, str) else f'{type(name).__name__}_{name.name}'
+
+
+def tile_master(name) -> str:
+    """Master a tile cache name is made from, see shapes.master_for."""
+    if name == 'cell':
+        return shapes.CELL
+    return shapes.master_for('border' if isinstance(name, BorderType) else 'corner', name)
+
+
+def _orientation(name):
+    if isinstance(name, BorderType):
+        return BORDER_ORIENTATIONS[name]
+    if isinstance(name, CornerType):
+        return CORNER_ORIENTATIONS[name]
+    return 0.0, False
+
+
+def orientation_matrix(source, target) -> adsk.core.Matrix3D:
+    """Turns a tile of the same master, centered on the origin, from orientation source into target."""
+    sourceRotation, sourceMirrored = _orientation(source)
+    targetRotation, targetMirrored = _orientation(target)
+    matrix = placement_matrix(Placement(0, 0, -sourceRotation))
+    matrix.transformBy(placement_matrix(Placement(0, 0, targetRotation, sourceMirrored != targetMirrored)))
+    return matrix
+
+
+def placement_matrix(placement: Placement) -> adsk.core.Matrix3D:
+    """Moves a tile modelled around the origin to its placement."""
+    matrix = adsk.core.Matrix3D.create()
+    if placement.mirrored:
+        mirror = adsk.core.Matrix3D.create()
+        mirror.setCell(0, 0, -1.0)
+        matrix.transformBy(mirror)
+    if placement.rotation:
+        rotation = adsk.core.Matrix3D.create()
+        rotation.setToRotation(placement.rotation, adsk.core.Vector3D.create(0, 0, 1), adsk.core.Point3D.create(0, 0, 0))
+        matrix.transformBy(rotation)
+    translation = adsk.core.Matrix3D.create()
+    translation.translation = adsk.core.Vector3D.create(placement.x, placement.y, 0)
+    matrix.transformBy(translation)
+    return matrix
+
+
+# Base feature opened by without_history, bodies are added straight into it while it is edited.
+_editedBaseFeature = None
+
+
+@contextlib.contextmanager
+def without_history(component: 'adsk.fusion.Component'):
+    """Runs the with block inside a base feature of a parametric design.
+
+    Features made while a base feature is edited are not captured in the
+    timeline, only the bodies they leave behind are kept in the base feature.
+    Direct designs have no history to begin with and are left alone.
+    """
+    global _editedBaseFeature
+    design = adsk.fusion.Design.cast(component.parentDesign)
+    if design.designType != adsk.fusion.DesignTypes.ParametricDesignType:
+        yield None
+        return
+
+    baseFeature = component.features.baseFeatures.add()
+    baseFeature.name = "Honeycomb Storage Wall"
+    baseFeature.startEdit()
+    _editedBaseFeature = baseFeature
+    try:
+        yield baseFeature
+    finally:
+        _editedBaseFeature = None
+        baseFeature.finishEdit()
+
+
+def editing_without_history() -> bool:
+    """True inside without_history, where features are not captured on the timeline."""
+    return _editedBaseFeature is not None
+
+
+def add_bodies(component: 'adsk.fusion.Component', bodies, names=None):
+    """Adds temporary bodies to the component and returns the new BRepBodies.
+
+    Parametric designs need a base feature to hold bodies that have no features
+    of their own, all of the bodies go into a single one.
+    """
+    design = adsk.fusion.Design.cast(component.parentDesign)
+    added = []
+
+    if _editedBaseFeature is not None:
+        for body in bodies:
+            added.append(component.bRepBodies.add(body, _editedBaseFeature))
+    elif design.designType == adsk.fusion.DesignTypes.ParametricDesignType:
+        baseFeature = component.features.baseFeatures.add()
+        baseFeature.startEdit()
+        for body in bodies:
+            component.bRepBodies.add(body, baseFeature)
+        baseFeature.finishEdit()
+        added = [baseFeature.bodies.item(i) for i in range(baseFeature.bodies.count)]
+    else:
+        for body in bodies:
+            added.append(component.bRepBodies.add(body))
+
+    if names is not None:
+        for body, name in zip(added, names):
+            body.name = name
+    return added
+
+
+class TileCache:
+    """Finished tiles of the current session kept as temporary BRep bodies.
+
+    Tiles are stored centered on the origin and are keyed by name: 'cell' for
+    the full cell, or the BorderType / CornerType of a border or corner piece in
+    the orientation it was modelled in. Only one tile of each master has to be
+    modelled, the other orientations are derived from it with orientation_matrix.
+    Everything is dropped when the geometric constants change.
+
+    With use_disk every stored tile is also exported as a .smt file, and a tile
+    missing from memory is imported from there before it is modelled again, so
+    a new Fusion session starts with the tiles of the last one.
+    """
+
+    def __init__(self):
+        self._version = ''
+        self._key = geometry_key()
+        self._bodies = {}
+        self.disk = None
+
+    def use_disk(self, directory: str, maxBytes: int, version: str = ''):
+        """Keeps the tiles in directory as well, keyed by the constants and the add-in version."""
+        self._version = version
+        self._key = geometry_key(version)
+        self._bodies = {}
+        self.disk = DiskCache(directory, self._key, maxBytes, '.smt') if directory else None
+
+    def _check_key(self):
+        key = geometry_key(self._version)
+        if key != self._key:
+            self._bodies = {}
+            self._key = key
+            if self.disk is not None:
+                self.disk.key = key
+
+    def _load(self, name) -> bool:
+        path = self.disk.get(_file_name(name))
+        if path is None:
+            return False
+        try:
+            bodies = adsk.fusion.TemporaryBRepManager.get().createFromFile(path)
+        except Exception:
+            bodies = None
+        if bodies is None or bodies.count != 1:
+            self.disk.discard(_file_name(name))
+            return False
+        self._bodies[name] = bodies.item(0)
+        return True
+
+    def _load_family(self, name) -> bool:
+        master = tile_master(name)
+        family = [name] + [other for other in ['cell', *BorderType, *CornerType]
+                           if other != name and tile_master(other) == master]
+        return any(self._load(other) for other in family)
+
+    def _derive(self, name) -> bool:
+        """Makes name from a cached tile of the same master, True when there was one."""
+        master = tile_master(name)
+        source = next((other for other in self._bodies if tile_master(other) == master), None)
+        if source is None:
+            return False
+        if source != name:
+            manager = adsk.fusion.TemporaryBRepManager.get()
+            tile = manager.copy(self._bodies[source])
+            manager.transform(tile, orientation_matrix(source, name))
+            self._bodies[name] = tile
+        return True
+
+    def _save(self, name):
+        manager = adsk.fusion.TemporaryBRepManager.get()
+        self.disk.put(_file_name(name), lambda path: manager.exportToFile([self._bodies[name]], path))
+
+    def has(self, name) -> bool:
+        self._check_key()
+        if name in self._bodies or self._derive(name):
+            return True
+        if self.disk is not None:
+            with profiling.stage('tile cache'):
+                return self._load_family(name) and self._derive(name)
+        return False
+
+    def clear(self):
+        self._bodies = {}
+
+    def store(self, name, body: 'adsk.fusion.BRepBody', x: float, y: float):
+        """Keeps a copy of a finished tile that was modelled centered on (x, y)."""
+        self._check_key()
+        manager = adsk.fusion.TemporaryBRepManager.get()
+        tile = manager.copy(body)
+
+        toOrigin = adsk.core.Matrix3D.create()
+        toOrigin.translation = adsk.core.Vector3D.create(-x, -y, 0)
+        manager.transform(tile, toOrigin)
+
+        self._bodies[name] = tile
+        if self.disk is not None:
+            with profiling.stage('tile cache'):
+                self._save(name)
+
+    def ensure(self, component: 'adsk.fusion.Component', topPlane: 'adsk.fusion.ConstructionPlane', names):
+        """Models every tile in names that is not cached yet, then removes the modelling again.
+
+        Only the master of each missing tile (MASTER_TILES) is modelled, around the
+        origin with the usual sketch, extrude and chamfer chain, and the other
+        orientations are transformed copies of it. Only the cached copies are kept, the sketches, features and
+        bodies used to make them are deleted so they leave nothing in the design.
+        """
+        missing = [name for name in names if not self.has(name)]
+        if not missing:
+            return
+
+        design = adsk.fusion.Design.cast(component.parentDesign)
+        parametric = design.designType == adsk.fusion.DesignTypes.ParametricDesignType
+
+        timelineStart = design.timeline.count if parametric else 0
+        existingSketches = {sketch.entityToken for sketch in component.sketches}
+        existingBodies = {body.entityToken for body in component.bRepBodies}
+
+        origin = adsk.core.Point3D.create(0, 0, 0)
+        for name in missing:
+            if self._derive(name):
+                continue
+            master = MASTER_TILES[tile_master(name)]
+            with profiling.stage(master if master == 'cell' else master.name):
+                if master == 'cell':
+                    body = utils.create_full_comb(topPlane, component, origin)
+                elif isinstance(master, BorderType):
+                    body = utils.create_half_comb(master, topPlane, component, origin)
+                else:
+                    body = utils.create_quarter_comb(master, topPlane, component, origin)
+                self.store(master, body, 0, 0)
+            self._derive(name)
+
+        if parametric:
+            design.timeline.item(timelineStart).rollTo(True)
+            design.timeline.deleteAllAfterMarker()
+        else:
+            for body in [body for body in component.bRepBodies if body.entityToken not in existingBodies]:
+                body.deleteMe()
+            for sketch in [sketch for sketch in component.sketches if sketch.entityToken not in existingSketches]:
+                sketch.deleteMe()
+
+    def copy(self, name, x: float, y: float) -> 'adsk.fusion.BRepBody':
+        """Temporary copy of a cached tile moved to (x, y), turned from its master if need be."""
+        if name not in self._bodies:
+            self._derive(name)
+        manager = adsk.fusion.TemporaryBRepManager.get()
+        tile = manager.copy(self._bodies[name])
+        manager.transform(tile, placement_matrix(Placement(x, y)))
+        return tile
+
+    def instantiate(self, component: 'adsk.fusion.Component', items, names=None):
+        """Adds copies of cached tiles to the component.
+
+        items is a list of (name, x, y), the copies are returned in the same order.
+        """
+        bodies = [self.copy(name, x, y) for name, x, y in items]
+        return add_bodies(component, bodies, names)
+
+
+# Tiles built by earlier runs in this Fusion session.
+session_tiles = TileCache()
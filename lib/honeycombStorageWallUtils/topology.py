@@ -0,0 +1,111 @@
+"""Named edges and faces of a modelled tile.
+
+The chamfers and mirrors of the tile modelling used to pick edges and faces by
+their index in body.edges / body.faces, which only holds as long as Fusion
+numbers the topology the same way. A TopologyIndex walks the faces of a body
+once and sorts them into named buckets by their geometry instead:
+
+- the walls of the hole are the vertical faces that stop below the top of the
+  tile, at the foot of the lip. The outer walls, the lip walls and the cut
+  faces all reach the top.
+- the lip inner edges are the edges of those walls at the height of the lip
+  floor, the bottom inner edges are their edges on the bottom of the tile.
+- the outer walls are the vertical faces OUTER_RADIUS away from the center of
+  the hex. The second cell of a wall is mirrored across one of them.
+- the split faces are the vertical faces through the center of the hex, where a
+  half or quarter comb was cut out of a cell. They are the mirror planes of the
+  quarter combs.
+
+An index describes the body as it was when it was built, build a new one after
+a feature changed the body.
+"""
+
+import collections
+
+import adsk.core
+import adsk.fusion
+
+from .constants import *
+
+HOLE_WALLS = 'hole walls'
+OUTER_WALLS = 'outer walls'
+LIP_INNER_EDGES = 'lip inner edges'
+BOTTOM_INNER_EDGES = 'bottom inner edges'
+# cut along x = center.x, mirrors left and right
+VERTICAL_SPLIT_FACE = 'vertical split face'
+# cut along y = center.y, mirrors top and bottom
+HORIZONTAL_SPLIT_FACE = 'horizontal split face'
+
+# Distances closer than this are the same, well below any of the tile's dimensions.
+TOLERANCE = 1e-4
+
+
+def _edge_height(edge: 'adsk.fusion.BRepEdge'):
+    """Height of a horizontal edge, None for an edge that is not horizontal."""
+    start = edge.startVertex.geometry.z
+    end = edge.endVertex.geometry.z
+    return start if abs(start - end) < TOLERANCE else None
+
+
+class TopologyIndex:
+    def __init__(self, body: 'adsk.fusion.BRepBody', center: adsk.core.Point3D):
+        """Sorts the faces and edges of a tile modelled around center."""
+        self.body = body
+        self._buckets = collections.defaultdict(list)
+        # outward normals of the outer walls, in the same order
+        self._outward = []
+
+        lipHeight = THICKNESS + LIP_DEPTH
+        for face in body.faces:
+            plane = adsk.core.Plane.cast(face.geometry)
+            if plane is None or abs(plane.normal.z) > TOLERANCE:
+                continue
+
+            if face.boundingBox.maxPoint.z < THICKNESS - TOLERANCE:
+                self._buckets[HOLE_WALLS].append(face)
+                for edge in face.edges:
+                    height = _edge_height(edge)
+                    if height is None:
+                        continue
+                    if abs(height) < TOLERANCE:
+                        self._buckets[BOTTOM_INNER_EDGES].append(edge)
+                    elif abs(height - lipHeight) < TOLERANCE:
+                        self._buckets[LIP_INNER_EDGES].append(edge)
+                continue
+
+            normal, origin = plane.normal, plane.origin
+            distance = normal.x * (origin.x - center.x) + normal.y * (origin.y - center.y)
+            if abs(abs(distance) - OUTER_RADIUS) < TOLERANCE:
+                self._buckets[OUTER_WALLS].append(face)
+                side = 1.0 if distance > 0 else -1.0
+                self._outward.append((normal.x * side, normal.y * side))
+            elif abs(distance) < TOLERANCE:
+                if abs(normal.y) < TOLERANCE:
+                    self._buckets[VERTICAL_SPLIT_FACE].append(face)
+                elif abs(normal.x) < TOLERANCE:
+                    self._buckets[HORIZONTAL_SPLIT_FACE].append(face)
+
+    def get(self, name: str) -> list:
+        return self._buckets.get(name, [])
+
+    def collection(self, name: str) -> adsk.core.ObjectCollection:
+        """The edges or faces of a bucket, ready for a feature input."""
+        collection = adsk.core.ObjectCollection.create()
+        for entity in self.get(name):
+            collection.add(entity)
+        return collection
+
+    def face(self, name: str) -> 'adsk.fusion.BRepFace':
+        """The one face of a bucket, raises when the body has none."""
+        faces = self.get(name)
+        if not faces:
+            raise ValueError(f'{self.body.name} has no {name}')
+        return faces[0]
+
+    def outer_wall(self, x: float, y: float) -> 'adsk.fusion.BRepFace':
+        """The outer wall that faces closest to the direction (x, y)."""
+        walls = self.get(OUTER_WALLS)
+        if not walls:
+            raise ValueError(f'{self.body.name} has no {OUTER_WALLS}')
+        facing = [normal[0] * x + normal[1] * y for normal in self._outward]
+        return walls[facing.index(max(facing))]
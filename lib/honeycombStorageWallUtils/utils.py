@@ -3,6 +3,8 @@ import adsk.fusion
 import math
 
 from .constants import *
+from . import batching, profiling, progress
+from .topology import BOTTOM_INNER_EDGES, LIP_INNER_EDGES, TopologyIndex
 
 def debug_selection_set_for_bodies_edges(body: 'adsk.fusion.BRepBody'):
     # #chamfer bottom
@@ -26,24 +28,108 @@ def debug_selection_set_for_bodies_faces(body: 'adsk.fusion.BRepBody'):
         design.selectionSets.add(face_collection.asArray(), f"{body.name}_face_{count}")
         count += 1
 
-def create_quarter_comb(
+def border_body_name(type: BorderType) -> str:
+    return "Honeycomb_Border_" + type.name.capitalize()
+
+def corner_body_name(type: CornerType) -> str:
+    return "Honeycomb_Corner_" + type.name
+
+def sketch_full_comb(
+    topPlane: 'adsk.fusion.ConstructionPlane',
+    component: 'adsk.fusion.Component',
+    centerPoint: adsk.core.Point3D
+):
+    sketchFeature = component.sketches.add(component.xYConstructionPlane)
+    sketchFeature.name = "Honeycomb_Cell"
+    sketchFeature.isComputeDeferred = True
+
+    innerHexagon = sketchFeature.sketchCurves.sketchLines.addScribedPolygon(centerPoint, 6, math.pi/2, INNER_RADIUS, False)
+    outerHexagon = sketchFeature.sketchCurves.sketchLines.addScribedPolygon(centerPoint, 6, math.pi/2, OUTER_RADIUS, False)
+
+    # create sketch plane on top of the honeycomb
+    facePlaneSketch = component.sketches.add(topPlane)
+    facePlaneSketch.name = "Honeycomb_Top"
+    facePlaneSketch.isComputeDeferred = True
+
+    # create one mm offset hexagon from the inner hexagon
+    lipHexagon = facePlaneSketch.sketchCurves.sketchLines.addScribedPolygon(
+        centerPoint, 6, math.pi / 2, INNER_RADIUS + INNER_OFFSET, False)
+
+    sketchFeature.isComputeDeferred = False
+    facePlaneSketch.isComputeDeferred = False
+    profiling.split('sketches')
+
+    return {'center': centerPoint, 'base': sketchFeature, 'top': facePlaneSketch}
+
+def model_full_comb(
+    component: 'adsk.fusion.Component',
+    sketches: dict
+):
+    sketchFeature = sketches['base']
+    facePlaneSketch = sketches['top']
+
+    # the ring between the two hexagons is the only profile with a hole in it
+    ringProfile = None
+    for profile in sketchFeature.profiles:
+        if profile.profileLoops.count == 2:
+            ringProfile = profile
+
+    honeycombBodyExtrudeFeature = component.features.extrudeFeatures.addSimple(
+        ringProfile,
+        TOTAL_THICKNESS,
+        adsk.fusion.FeatureOperations.NewBodyFeatureOperation
+    )
+    honeycombBody = honeycombBodyExtrudeFeature.bodies.item(0)
+    honeycombBody.name = "Honeycomb"
+    profiling.split('base tile')
+
+    honeycombCutFeature = component.features.extrudeFeatures.addSimple(facePlaneSketch.profiles.item(0),
+                                                                       adsk.core.ValueInput.createByReal(LIP_DEPTH),
+                                                                       adsk.fusion.FeatureOperations.CutFeatureOperation)
+    profiling.split('lip cut')
+
+    # chamfer new inner edge
+    chamferEdgeCollection = TopologyIndex(honeycombBody, sketches['center']).collection(LIP_INNER_EDGES)
+
+    innerChamferInput = component.features.chamferFeatures.createInput2()
+    innerChamferInput.chamferEdgeSets.addTwoDistancesChamferEdgeSet(chamferEdgeCollection,
+                                                                    INNER_CHAMFER_DISTANCES[0],
+                                                                    INNER_CHAMFER_DISTANCES[1], False,
+                                                                    True)
+    innerChamfer = component.features.chamferFeatures.add(innerChamferInput)
+
+    # chamber the bottom inner edge, the chamfer above changed the body
+    bottomChamferEdgeCollection = TopologyIndex(honeycombBody, sketches['center']).collection(BOTTOM_INNER_EDGES)
+
+    bottomChamferInput = component.features.chamferFeatures.createInput2()
+    bottomChamferInput.chamferEdgeSets.addTwoDistancesChamferEdgeSet(bottomChamferEdgeCollection,
+                                                                     BOTTOM_CHAMFER_DISTANCES[0],
+                                                                     BOTTOM_CHAMFER_DISTANCES[1],
+                                                                     False, True)
+    bottomChamfer = component.features.chamferFeatures.add(bottomChamferInput)
+    profiling.split('chamfers')
+
+    return honeycombBody
+
+def create_full_comb(
+    topPlane: 'adsk.fusion.ConstructionPlane',
+    component: 'adsk.fusion.Component',
+    centerPoint: adsk.core.Point3D
+):
+    return model_full_comb(component, sketch_full_comb(topPlane, component, centerPoint))
+
+def sketch_quarter_comb(
     type: CornerType,
     topPlane:  'adsk.fusion.ConstructionPlane' ,
     component: 'adsk.fusion.Component',
     startingCenterPoint: adsk.core.Point3D
 ):
-    name = ""
-    if type == CornerType.TopLeft:
-        name = "TopLeft"
-    elif type == CornerType.TopRight:
-        name = "TopRight"
-    elif type == CornerType.BottomRight:
-        name = "BottomRight"
-    elif type == CornerType.BottomLeft:
-        name = "BottomLeft"
+    # only the TopLeft master is modelled, the other corners are turned copies of it
+    name = "TopLeft"
 
     sketchFeature = component.sketches.add(component.xYConstructionPlane)
     sketchFeature.name = "Honeycomb_Corner_" + name
+    sketchFeature.isComputeDeferred = True
 
     innerHexagon = sketchFeature.sketchCurves.sketchLines.addScribedPolygon(startingCenterPoint, 6, math.pi / 2,
                                                                             INNER_RADIUS, False)
@@ -73,21 +159,9 @@ def create_quarter_comb(
         adsk.core.Point3D.create(startingCenterPoint.x + RADIUS_OFFSET, startingCenterPoint.y - VERTICAL_SPACING / 2)
     )
 
-    #grab profiles and extrude
-    profileCollection = adsk.core.ObjectCollection.create()
-    profileCollection.add(sketchFeature.profiles.item(0))
-    profileCollection.add(sketchFeature.profiles.item(1))
-    profileCollection.add(sketchFeature.profiles.item(3))
-    profileCollection.add(sketchFeature.profiles.item(4))
-
-    extrudeInput = component.features.extrudeFeatures.createInput(profileCollection,
-                                                                  adsk.fusion.FeatureOperations.NewBodyFeatureOperation)
-    extrudeInput.setOneSideExtent(adsk.fusion.DistanceExtentDefinition.create(TOTAL_THICKNESS),
-                                  adsk.fusion.ExtentDirections.PositiveExtentDirection)
-    extrudeFeature = component.features.extrudeFeatures.add(extrudeInput)
-
     topSketchFeature = component.sketches.add(topPlane)
     topSketchFeature.name = "Honeycomb_CornerTop_" + name
+    topSketchFeature.isComputeDeferred = True
 
     manualPolyCoords = []
 
@@ -144,113 +218,80 @@ def create_quarter_comb(
             coords[1],
         )
 
+    sketchFeature.isComputeDeferred = False
+    topSketchFeature.isComputeDeferred = False
+    profiling.split('sketches')
+
+    return {'type': type, 'name': name, 'center': startingCenterPoint, 'base': sketchFeature, 'top': topSketchFeature}
+
+def model_quarter_comb(
+    component: 'adsk.fusion.Component',
+    sketches: dict
+):
+    name = sketches['name']
+    center = sketches['center']
+    sketchFeature = sketches['base']
+    topSketchFeature = sketches['top']
+
+    #grab profiles and extrude
+    profileCollection = adsk.core.ObjectCollection.create()
+    profileCollection.add(sketchFeature.profiles.item(0))
+    profileCollection.add(sketchFeature.profiles.item(1))
+    profileCollection.add(sketchFeature.profiles.item(3))
+    profileCollection.add(sketchFeature.profiles.item(4))
+
+    extrudeInput = component.features.extrudeFeatures.createInput(profileCollection,
+                                                                  adsk.fusion.FeatureOperations.NewBodyFeatureOperation)
+    extrudeInput.setOneSideExtent(adsk.fusion.DistanceExtentDefinition.create(TOTAL_THICKNESS),
+                                  adsk.fusion.ExtentDirections.PositiveExtentDirection)
+    extrudeFeature = component.features.extrudeFeatures.add(extrudeInput)
+    profiling.split('base tile')
+
     bottomBorderCutFeature = component.features.extrudeFeatures.addSimple(
         topSketchFeature.profiles.item(0),
         adsk.core.ValueInput.createByReal(LIP_DEPTH),
         adsk.fusion.FeatureOperations.CutFeatureOperation
     )
+    profiling.split('lip cut')
 
-    borderBottomChamferEdgeCollection = adsk.core.ObjectCollection.create()
-
-    borderBottomChamferEdgeCollection.add(extrudeFeature.bodies[0].edges.item(12))
-    borderBottomChamferEdgeCollection.add(extrudeFeature.bodies[0].edges.item(13))
-    borderBottomChamferEdgeCollection.add(extrudeFeature.bodies[0].edges.item(14))
-    borderBottomChamferEdgeCollection.add(extrudeFeature.bodies[0].edges.item(15))
+    borderBottomChamferEdgeCollection = TopologyIndex(extrudeFeature.bodies[0], center).collection(LIP_INNER_EDGES)
 
     borderBottomInnerChamferInput = component.features.chamferFeatures.createInput2()
     borderBottomInnerChamferInput.chamferEdgeSets.addTwoDistancesChamferEdgeSet(borderBottomChamferEdgeCollection, INNER_CHAMFER_DISTANCES[0], INNER_CHAMFER_DISTANCES[1], False, True)
     borderBottomInnerChamferFeature = component.features.chamferFeatures.add(borderBottomInnerChamferInput)
 
-    borderBottomChamferEdgeCollection = adsk.core.ObjectCollection.create()
-
-    borderBottomChamferEdgeCollection.add(extrudeFeature.bodies[0].edges.item(13))
-    borderBottomChamferEdgeCollection.add(extrudeFeature.bodies[0].edges.item(16))
-    borderBottomChamferEdgeCollection.add(extrudeFeature.bodies[0].edges.item(25))
-    borderBottomChamferEdgeCollection.add(extrudeFeature.bodies[0].edges.item(27))
+    borderBottomChamferEdgeCollection = TopologyIndex(extrudeFeature.bodies[0], center).collection(BOTTOM_INNER_EDGES)
 
     borderBottomBottomChamferInput = component.features.chamferFeatures.createInput2()
     borderBottomBottomChamferInput.chamferEdgeSets.addTwoDistancesChamferEdgeSet(borderBottomChamferEdgeCollection, BOTTOM_CHAMFER_DISTANCES[0], BOTTOM_CHAMFER_DISTANCES[1], False, True)
     borderBottomBottomChamferFeature = component.features.chamferFeatures.add(borderBottomBottomChamferInput)
+    profiling.split('chamfers')
 
+    cornerBody = extrudeFeature.bodies.item(0)
+    cornerBody.name = "Honeycomb_Corner_" + name
+    return cornerBody
 
+def create_quarter_comb(
+    type: CornerType,
+    topPlane:  'adsk.fusion.ConstructionPlane' ,
+    component: 'adsk.fusion.Component',
+    startingCenterPoint: adsk.core.Point3D
+):
+    return model_quarter_comb(component, sketch_quarter_comb(type, topPlane, component, startingCenterPoint))
 
-    if type == CornerType.BottomRight:
-        cornerBody = extrudeFeature.bodies.item(0)
-        mirrorPlane = cornerBody.faces.item(17)
-
-        entitiesToMirror = adsk.core.ObjectCollection.create()
-        entitiesToMirror.add(cornerBody)
-
-        mirrorInput = component.features.mirrorFeatures.createInput(entitiesToMirror, mirrorPlane)
-        mirrorInput.isCombine = False
-
-        mirrorFeature = component.features.mirrorFeatures.add(mirrorInput)
-
-        #remove body we just mirrored from
-        removeFeatures = component.features.removeFeatures
-        removeFeature = removeFeatures.add(cornerBody)
-
-        #mirror again
-        newCornerBody = mirrorFeature.bodies.item(0)
-        mirrorPlane = newCornerBody.faces.item(20)
-
-        entitiesToMirror = adsk.core.ObjectCollection.create()
-        entitiesToMirror.add(newCornerBody)
-
-        mirrorInput = component.features.mirrorFeatures.createInput(entitiesToMirror, mirrorPlane)
-        mirrorInput.isCombine = False
-
-        mirrorFeature = component.features.mirrorFeatures.add(mirrorInput)
-
-        # remove body we just mirrored from
-        removeFeatures = component.features.removeFeatures
-        removeFeature = removeFeatures.add(newCornerBody)
-    if type == CornerType.TopRight:
-        cornerBody = extrudeFeature.bodies.item(0)
-        debug_selection_set_for_bodies_faces(cornerBody)
-        mirrorPlane = cornerBody.faces.item(20)
-
-        entitiesToMirror = adsk.core.ObjectCollection.create()
-        entitiesToMirror.add(cornerBody)
-
-        mirrorInput = component.features.mirrorFeatures.createInput(entitiesToMirror, mirrorPlane)
-        mirrorInput.isCombine = False
-
-        mirrorFeature = component.features.mirrorFeatures.add(mirrorInput)
-
-        #remove body we just mirrored from
-        removeFeatures = component.features.removeFeatures
-        removeFeature = removeFeatures.add(cornerBody)
-
-def create_half_comb(
+def sketch_half_comb(
     type: BorderType,
     topPlane: 'adsk.fusion.ConstructionPlane',
     component: 'adsk.fusion.Component',
     startingCenterPoint: adsk.core.Point3D
 ):
-    name = ""
-    rotationFactor = 0
-    verticalSplit = False
-
-    if type == BorderType.BOTTOM:
-        name = "Bottom"
-        rotationFactor = 0
-        verticalSplit = False
-    elif type == BorderType.TOP:
-        name = "Top"
-        verticalSplit = False
-        rotationFactor = math.pi
-    elif type == BorderType.LEFT:
-        name = "Left"
-        rotationFactor = 0
-        verticalSplit = True
-    elif type == BorderType.RIGHT:
-        name = "Right"
-        rotationFactor = math.pi
-        verticalSplit = True
+    # only the BOTTOM and LEFT masters are modelled, TOP and RIGHT are turned copies of them
+    verticalSplit = type == BorderType.LEFT
+    name = "Left" if verticalSplit else "Bottom"
 
     sketchFeature = component.sketches.add(component.xYConstructionPlane)
     sketchFeature.name = "Honeycomb_Border_" + name
+    sketchFeature.isComputeDeferred = True
 
     #create border sketch profiles
     innerHexagon = sketchFeature.sketchCurves.sketchLines.addScribedPolygon(startingCenterPoint, 6, math.pi/2, INNER_RADIUS, False)
@@ -314,17 +355,9 @@ def create_half_comb(
         innerLinePoints[1]
     )
 
-    #grab profiles and extrude upwards
-    profileCollection = adsk.core.ObjectCollection.create()
-    profileCollection.add(sketchFeature.profiles.item(2))
-    profileCollection.add(sketchFeature.profiles.item(4))
-
-    extrudeInput = component.features.extrudeFeatures.createInput(profileCollection, adsk.fusion.FeatureOperations.NewBodyFeatureOperation)
-    extrudeInput.setOneSideExtent(adsk.fusion.DistanceExtentDefinition.create(TOTAL_THICKNESS), adsk.fusion.ExtentDirections.PositiveExtentDirection)
-    extrudeFeature = component.features.extrudeFeatures.add(extrudeInput)
-
     topSketchFeature = component.sketches.add(topPlane)
     topSketchFeature.name = "Honeycomb_BorderTop_" + name
+    topSketchFeature.isComputeDeferred = True
 
     topCornerOffsetX = INNER_OFFSET / math.tan(math.pi / 3)
 
@@ -410,83 +443,123 @@ def create_half_comb(
             coords[1],
         )
 
+    sketchFeature.isComputeDeferred = False
+    topSketchFeature.isComputeDeferred = False
+    profiling.split('sketches')
+
+    return {
+        'type': type, 'name': name, 'center': startingCenterPoint, 'base': sketchFeature, 'top': topSketchFeature,
+        'vertical_split': verticalSplit,
+    }
+
+def model_half_comb(
+    component: 'adsk.fusion.Component',
+    sketches: dict
+):
+    name = sketches['name']
+    startingCenterPoint = sketches['center']
+    sketchFeature = sketches['base']
+    topSketchFeature = sketches['top']
+
+    #grab profiles and extrude upwards
+    profileCollection = adsk.core.ObjectCollection.create()
+    profileCollection.add(sketchFeature.profiles.item(2))
+    profileCollection.add(sketchFeature.profiles.item(4))
+
+    extrudeInput = component.features.extrudeFeatures.createInput(profileCollection, adsk.fusion.FeatureOperations.NewBodyFeatureOperation)
+    extrudeInput.setOneSideExtent(adsk.fusion.DistanceExtentDefinition.create(TOTAL_THICKNESS), adsk.fusion.ExtentDirections.PositiveExtentDirection)
+    extrudeFeature = component.features.extrudeFeatures.add(extrudeInput)
+    profiling.split('base tile')
+
     #extrude down to start the lip
     bottomBorderCutFeature = component.features.extrudeFeatures.addSimple(
         topSketchFeature.profiles.item(0),
         adsk.core.ValueInput.createByReal(LIP_DEPTH),
         adsk.fusion.FeatureOperations.CutFeatureOperation
     )
+    profiling.split('lip cut')
     
     #chamfer new inner edge
-    borderBottomChamferEdgeCollection = adsk.core.ObjectCollection.create()
-
-    if verticalSplit:
-        borderBottomChamferEdgeCollection.add(extrudeFeature.bodies[0].edges.item(15))
-        borderBottomChamferEdgeCollection.add(extrudeFeature.bodies[0].edges.item(16))
-        borderBottomChamferEdgeCollection.add(extrudeFeature.bodies[0].edges.item(17))
-        borderBottomChamferEdgeCollection.add(extrudeFeature.bodies[0].edges.item(18))
-        borderBottomChamferEdgeCollection.add(extrudeFeature.bodies[0].edges.item(19))
-    else:
-        borderBottomChamferEdgeCollection.add(extrudeFeature.bodies[0].edges.item(12))
-        borderBottomChamferEdgeCollection.add(extrudeFeature.bodies[0].edges.item(13))
-        borderBottomChamferEdgeCollection.add(extrudeFeature.bodies[0].edges.item(14))
-        borderBottomChamferEdgeCollection.add(extrudeFeature.bodies[0].edges.item(15))
+    borderBottomChamferEdgeCollection = TopologyIndex(extrudeFeature.bodies[0], startingCenterPoint).collection(LIP_INNER_EDGES)
 
     borderBottomInnerChamferInput = component.features.chamferFeatures.createInput2()
     borderBottomInnerChamferInput.chamferEdgeSets.addTwoDistancesChamferEdgeSet(borderBottomChamferEdgeCollection, INNER_CHAMFER_DISTANCES[0], INNER_CHAMFER_DISTANCES[1], False, True)
     borderBottomInnerChamferFeature = component.features.chamferFeatures.add(borderBottomInnerChamferInput)
 
-    borderBottomChamferEdgeCollection = adsk.core.ObjectCollection.create()
-
-    if verticalSplit:
-        borderBottomChamferEdgeCollection.add(extrudeFeature.bodies[0].edges.item(16))
-        borderBottomChamferEdgeCollection.add(extrudeFeature.bodies[0].edges.item(19))
-        borderBottomChamferEdgeCollection.add(extrudeFeature.bodies[0].edges.item(21))
-        borderBottomChamferEdgeCollection.add(extrudeFeature.bodies[0].edges.item(33))
-        borderBottomChamferEdgeCollection.add(extrudeFeature.bodies[0].edges.item(34))
-    else:
-        borderBottomChamferEdgeCollection.add(extrudeFeature.bodies[0].edges.item(13))
-        borderBottomChamferEdgeCollection.add(extrudeFeature.bodies[0].edges.item(16))
-        borderBottomChamferEdgeCollection.add(extrudeFeature.bodies[0].edges.item(25))
-        borderBottomChamferEdgeCollection.add(extrudeFeature.bodies[0].edges.item(27))
+    borderBottomChamferEdgeCollection = TopologyIndex(extrudeFeature.bodies[0], startingCenterPoint).collection(BOTTOM_INNER_EDGES)
 
     borderBottomBottomChamferInput = component.features.chamferFeatures.createInput2()
     borderBottomBottomChamferInput.chamferEdgeSets.addTwoDistancesChamferEdgeSet(borderBottomChamferEdgeCollection, BOTTOM_CHAMFER_DISTANCES[0], BOTTOM_CHAMFER_DISTANCES[1], False, True)
     borderBottomBottomChamferFeature = component.features.chamferFeatures.add(borderBottomBottomChamferInput)
-
-    if rotationFactor != 0:
-        rotationTransform = adsk.core.Matrix3D.create()
-        rotationTransform.setToRotation(rotationFactor, adsk.core.Vector3D.create(0,0,1), startingCenterPoint)
-
-        entities = adsk.core.ObjectCollection.create()
-        entities.add(extrudeFeature.bodies[0])
-        
-        moveFeatureInput =  component.features.moveFeatures.createInput(entities, rotationTransform)
-
-        # Add the move feature to the design
-        component.features.moveFeatures.add(moveFeatureInput)
+    profiling.split('chamfers')
 
     extrudeFeature.bodies[0].name =  "Honeycomb_Border_" + name
     return extrudeFeature.bodies[0]
 
+def create_half_comb(
+    type: BorderType,
+    topPlane: 'adsk.fusion.ConstructionPlane',
+    component: 'adsk.fusion.Component',
+    startingCenterPoint: adsk.core.Point3D
+):
+    return model_half_comb(component, sketch_half_comb(type, topPlane, component, startingCenterPoint))
+
 def duplicate_border_body(
         component: adsk.fusion.Component,
         axis: 'adsk.fusion.ConstructionAxis',
         body: adsk.fusion.BRepBody,
-        quantity: int,
+        quantity,
         distance: adsk.core.ValueInput
 ):
+    # quantity is a count or a ValueInput holding a parameter expression
+    if not isinstance(quantity, adsk.core.ValueInput):
+        quantity = adsk.core.ValueInput.createByReal(quantity)
+
     bottomBorderCollection = adsk.core.ObjectCollection.create()
     bottomBorderCollection.add(body)
 
     bottomBorderPatternInput = component.features.rectangularPatternFeatures.createInput(
         bottomBorderCollection,
         axis,
-        adsk.core.ValueInput.createByReal(quantity),
+        quantity,
         distance,
         adsk.fusion.PatternDistanceType.SpacingPatternDistanceType
     )
 
     bottomBorderPatternInput.setDirectionTwo(component.xConstructionAxis, adsk.core.ValueInput.createByReal(1), adsk.core.ValueInput.createByReal(0.0))
 
-    return component.features.rectangularPatternFeatures.add(bottomBorderPatternInput)
\ No newline at end of file
+    patternFeature = component.features.rectangularPatternFeatures.add(bottomBorderPatternInput)
+    profiling.split('pattern')
+    return patternFeature
+
+def body_center(body: adsk.fusion.BRepBody):
+    box = body.boundingBox
+    return (box.minPoint.x + box.maxPoint.x) / 2, (box.minPoint.y + box.maxPoint.y) / 2
+
+def combine_bodies(
+        component: adsk.fusion.Component,
+        bodies,
+        batchSize: int,
+        log=None
+):
+    """Joins the bodies with combine features over small batches of neighbouring bodies.
+
+    Returns the single body that is left.
+    """
+    def combine(batch):
+        toolBodies = adsk.core.ObjectCollection.create()
+        for body in batch[1:]:
+            toolBodies.add(body)
+
+        combineInput = component.features.combineFeatures.createInput(batch[0], toolBodies)
+        combineInput.isKeepToolBodies = False
+        combineFeature = component.features.combineFeatures.add(combineInput)
+        progress.advance(len(batch) - 1)
+        return combineFeature.bodies.item(0)
+
+    def on_level(level, before, after, seconds):
+        if log is not None:
+            log(f'Combine level {level}: {before} bodies into {after} in {seconds:.2f}s')
+
+    ordered = batching.spatial_order(list(bodies), body_center)
+    return batching.reduce_in_batches(ordered, combine, batchSize, on_level)